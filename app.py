@@ -1,9 +1,8 @@
 from flask import Flask, render_template, jsonify, request, abort, Response
 from flask_cors import CORS
-import requests
 import json
+import logging
 from datetime import datetime, timedelta
-import math
 try:
     from zoneinfo import ZoneInfo
 except Exception:
@@ -12,61 +11,312 @@ import os
 from dotenv import load_dotenv
 import threading
 import time
-from queue import Queue
+import atexit
+import socket
+import uuid
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from news_store import SnapshotStore, EnrichmentCache
+from news_snapshot import NewsSnapshot, EncodedBody, InvalidCursor, RenderCache
+from sse_hub import SSEHub, HubFull
+from bocha_client import BochaClient, BochaError, CircuitBreaker, RateLimiter
+from ingestion import fetch_all, load_plan
+from dedup import collapse_near_duplicates
+from search_index import SearchIndex
+from related import RelatedIndex
+from archive import ArticleArchive, parse_day
+from static_export import export_site
+from refresh_jobs import RefreshJobs
+from llm_budget import TokenBudget, estimate_tokens, page_value
+from llm_output import CATEGORIES, DEFAULT_CATEGORY, TitleIndex, iter_records, normalize_category, parse_records
+from scheduler import AdaptiveCadence, CronSpec, IntervalSpec, RefreshScheduler
+from metrics import Registry, HistogramFamily
+from log_config import configure_logging
+import click
 
 # 加载环境变量
 load_dotenv()
 
+# 日志：LOG_LEVEL（默认 INFO）控制级别，LOG_FORMAT=json 输出结构化日志
+configure_logging(os.getenv('LOG_LEVEL', 'INFO'), os.getenv('LOG_FORMAT', 'text'))
+logger = logging.getLogger('ai_news')
+
 app = Flask(__name__)
 CORS(app)
 
 # 全局变量存储文章数据
 articles_cache = {}
 current_articles = []
-_sse_listeners = set()
+# 当前一代文章快照（预序列化的 JSON、ETag 与压缩体）
+current_snapshot = NewsSnapshot(0, [], None)
+# SSE 广播中心：带序号的环形缓冲区 + Last-Event-ID 补发 + 定期 keepalive
+sse_hub = SSEHub(
+    buffer_size=int(os.getenv('SSE_BUFFER_SIZE', '1000') or 1000),
+    keepalive_seconds=int(os.getenv('SSE_KEEPALIVE_SECONDS', '15') or 15),
+    max_clients=int(os.getenv('SSE_MAX_CLIENTS', '10000') or 10000),
+)
+
+# 指标：/metrics 以 Prometheus 文本格式输出；METRICS_ENABLED=0 时不注册请求钩子与 /metrics
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') != '0'
+metrics_registry = Registry(prefix='ai_news_')
+REFRESH_SECONDS = metrics_registry.histogram('refresh_duration_seconds', '一次完整刷新（抓取 + 加工 + 安装）的耗时')
+REFRESHES = metrics_registry.counter('refreshes_total', '刷新次数（按结果）', ('status',))
+VOLCENGINE_SECONDS = metrics_registry.histogram('volcengine_request_duration_seconds', '火山引擎调用耗时', labelnames=('mode',))
+VOLCENGINE_RETRIES = metrics_registry.counter('volcengine_retries_total', '火山引擎调用重试次数')
+PARSE_SECONDS = metrics_registry.histogram(
+    'llm_parse_duration_seconds', '模型输出解析耗时', buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5))
+LLM_PARSE_ISSUES = metrics_registry.counter('llm_parse_issues_total', '模型输出解析问题（按类型）', ('kind',))
+LLM_TOKENS = metrics_registry.counter('llm_tokens_total', '模型消耗的 token 数', ('kind',))
+ARTICLES_PRODUCED = metrics_registry.counter('articles_produced_total', '加工产出的文章数')
+ARTICLES_DROPPED = metrics_registry.counter('articles_dropped_total', '加工前后被丢弃的网页数（按原因）', ('reason',))
+HTTP_SECONDS = metrics_registry.histogram(
+    'http_request_duration_seconds', '请求处理耗时（按路由）',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5), labelnames=('route', 'method'))
+HTTP_REQUESTS = metrics_registry.counter('http_requests_total', '请求数（按路由与状态码）', ('route', 'method', 'status'))
+
+def _record_llm_call(mode, seconds, usage=None, reservation=None):
+    """记录一次模型调用：耗时、模型返回的 usage（prompt_tokens / completion_tokens），并按实际用量结算预算"""
+    VOLCENGINE_SECONDS.observe(seconds, mode)
+    tokens = {}
+    for kind in ('prompt', 'completion'):
+        value = getattr(usage, f'{kind}_tokens', None) if usage is not None else None
+        if value is None and isinstance(usage, dict):
+            value = usage.get(f'{kind}_tokens')
+        tokens[kind] = value or 0
+        if value:
+            LLM_TOKENS.inc(value, kind)
+    llm_budget.settle(reservation, tokens['prompt'], tokens['completion'], seconds)
+
+# 首页与文章详情页的渲染缓存（按页面 + 快照代号缓存 HTML 及其压缩体）
+html_cache = RenderCache(int(os.getenv('HTML_CACHE_MAX_ENTRIES', '512') or 512))
+# 全文检索倒排索引：快照安装时增量同步（覆盖保留窗口内的全部文章）
+search_index = SearchIndex()
+# 相关文章：基于内容相似度（哈希 TF-IDF + 余弦）的近邻表，每次刷新完成后整体重建
+try:
+    _related_min_score = float(os.getenv('RELATED_MIN_SCORE', '0.1'))
+except ValueError:
+    _related_min_score = 0.1
+related_index = RelatedIndex(
+    top_k=int(os.getenv('RELATED_TOP_K', '3') or 3),
+    min_score=_related_min_score,
+    dims=int(os.getenv('RELATED_VECTOR_DIMS', '4096') or 4096),
+)
 
 def _sse_notify(event_type: str, payload: dict):
     try:
-        message = {"type": event_type, **payload}
-        for q in list(_sse_listeners):
-            try:
-                q.put_nowait(message)
-            except Exception:
-                pass
+        sse_hub.publish(event_type, payload)
     except Exception:
         pass
 
+# 归一化时去掉的跟踪参数
+_TRACKING_PARAMS = ('utm_', 'spm', 'from', 'share', 'fbclid', 'gclid')
+
+def normalize_url(url: str) -> str:
+    """归一化来源 URL：忽略协议、大小写主机名、www 前缀、锚点、跟踪参数和结尾斜杠"""
+    try:
+        parts = urlsplit((url or '').strip())
+    except ValueError:
+        return (url or '').strip()
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('', host, path, urlencode(query), ''))
+
+def make_article_id(url: str, title: str = '') -> str:
+    """由归一化后的来源 URL 计算稳定的文章ID；没有 URL 时退化为标题哈希"""
+    key = normalize_url(url) if url else f"title:{(title or '').strip()}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+def _iter_stream_content(response, collected=None, usage=None):
+    """从流式补全响应中取出文本增量（兼容 Ark / OpenAI 风格的 chunk.choices[0].delta.content）
+
+    usage 为 dict 时，带 usage 的 chunk（通常是最后一个）会被记录到 usage['usage']，
+    结束原因（stop / length 等）记录到 usage['finish_reason']。
+    """
+    for chunk in response:
+        if usage is not None and getattr(chunk, 'usage', None) is not None:
+            usage['usage'] = chunk.usage
+        choices = getattr(chunk, 'choices', None)
+        if not choices:
+            continue
+        if usage is not None and getattr(choices[0], 'finish_reason', None):
+            usage['finish_reason'] = choices[0].finish_reason
+        delta = getattr(choices[0], 'delta', None)
+        text = getattr(delta, 'content', None) if delta is not None else None
+        if text:
+            if collected is not None:
+                collected.append(text)
+            yield text
+
+class SingleFlight:
+    """单飞（single-flight）合并：同一时刻只允许一次刷新在途。
+
+    - 在途期间的并发调用方可以等待同一次结果，或立即拿到上次的快照
+    - 强制刷新之间有最小间隔，间隔内直接返回上次快照
+    - 统计被合并的调用次数，便于观察突发流量
+    """
+
+    def __init__(self, min_interval_seconds=0):
+        self.min_interval_seconds = max(0, min_interval_seconds)
+        self._lock = threading.Lock()
+        self._inflight = None
+        self._last_finished = 0.0
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.throttled = 0
+
+    def run(self, fn, fallback, force=False, wait=True):
+        """执行 fn；已有在途调用时合并到同一次执行。fallback 返回上次的快照。"""
+        with self._lock:
+            self.calls += 1
+            flight = self._inflight
+            if flight is None:
+                if (force and self._last_finished
+                        and time.monotonic() - self._last_finished < self.min_interval_seconds):
+                    self.throttled += 1
+                    return fallback()
+                flight = self._inflight = {'done': threading.Event(), 'result': None}
+                leader = True
+                self.executions += 1
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            if not wait:
+                return fallback()
+            flight['done'].wait()
+            result = flight['result']
+            return fallback() if result is None else result
+
+        try:
+            flight['result'] = fn()
+            return flight['result']
+        finally:
+            with self._lock:
+                self._inflight = None
+                self._last_finished = time.monotonic()
+            flight['done'].set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'throttled': self.throttled,
+                'in_flight': self._inflight is not None,
+            }
+
 # 配置博查AI API（不提供默认值，避免泄露）
 BOCHA_API_KEY = os.getenv('BOCHA_API_KEY')
+BOCHA_API_URL = os.getenv('BOCHA_API_URL', 'https://api.bochaai.com/v1/web-search')
 
 # 配置火山引擎 API（不提供默认值，避免泄露）
 VOLCENGINE_API_KEY = os.getenv("VOLCENGINE_API_KEY")
 VOLCENGINE_ENDPOINT_ID = os.getenv("VOLCENGINE_ENDPOINT_ID")
 
+# 本地快照存储（重启后直接加载上次成功的新闻数据）
+NEWS_DATA_DIR = os.getenv('NEWS_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+try:
+    snapshot_store = SnapshotStore(os.path.join(NEWS_DATA_DIR, 'news.sqlite3'))
+except Exception as e:
+    logger.warning("本地快照存储初始化失败，将仅使用内存缓存: %s", e)
+    snapshot_store = None
+
+# 静态导出目录：配置后每次成功刷新都会把整站导出到该目录（current 符号链接指向最新一版）
+STATIC_EXPORT_DIR = os.getenv('STATIC_EXPORT_DIR', '')
+STATIC_EXPORT_KEEP = int(os.getenv('STATIC_EXPORT_KEEP', '3') or 3)
+
+# 文章历史归档：按天分区的 JSONL + 索引，刷新后追加新文章
+try:
+    article_archive = ArticleArchive(os.path.join(NEWS_DATA_DIR, 'archive'))
+except Exception as e:
+    logger.warning("文章归档初始化失败，将不保留历史文章: %s", e)
+    article_archive = None
+
+# 火山引擎加工备忘录：按 URL + 摘要缓存生成结果，连续刷新时只加工新网页
+try:
+    enrichment_cache = EnrichmentCache(
+        os.path.join(NEWS_DATA_DIR, 'news.sqlite3'),
+        ttl_seconds=max(1, int(os.getenv('VOLCENGINE_MEMO_TTL_HOURS', '72') or 72)) * 3600,
+        max_entries=int(os.getenv('VOLCENGINE_MEMO_MAX_ENTRIES', '5000') or 5000),
+    )
+except Exception as e:
+    logger.warning("加工备忘录初始化失败，将每次完整调用模型: %s", e)
+    enrichment_cache = None
+
+# 火山引擎 token 预算：发送前估算并截断/舍弃网页，按小时/天限制 token 与请求数（0 表示不限）
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+llm_budget = TokenBudget(
+    prompt_max_tokens=int(os.getenv('VOLCENGINE_PROMPT_MAX_TOKENS', '8000') or 0),
+    summary_max_chars=int(os.getenv('VOLCENGINE_SUMMARY_MAX_CHARS', '600') or 0),
+    refresh_max_tokens=int(os.getenv('VOLCENGINE_REFRESH_MAX_TOKENS', '0') or 0),
+    hourly_tokens=int(os.getenv('VOLCENGINE_HOURLY_TOKENS', '0') or 0),
+    daily_tokens=int(os.getenv('VOLCENGINE_DAILY_TOKENS', '0') or 0),
+    hourly_requests=int(os.getenv('VOLCENGINE_HOURLY_REQUESTS', '0') or 0),
+    daily_requests=int(os.getenv('VOLCENGINE_DAILY_REQUESTS', '0') or 0),
+    price_prompt_per_1k=_env_float('VOLCENGINE_PRICE_PROMPT_PER_1K', 0.0),
+    price_completion_per_1k=_env_float('VOLCENGINE_PRICE_COMPLETION_PER_1K', 0.0),
+    store=snapshot_store,
+)
+
 # 初始化火山引擎客户端
 try:
     from volcengine.ark import Ark
     client = Ark(api_key=VOLCENGINE_API_KEY)
-    print(f"火山引擎客户端初始化成功，使用端点: {VOLCENGINE_ENDPOINT_ID}")
+    logger.info("火山引擎客户端初始化成功，使用端点: %s", VOLCENGINE_ENDPOINT_ID)
 except ImportError:
     try:
         from volcenginesdkarkruntime import Ark
         client = Ark(api_key=VOLCENGINE_API_KEY)
-        print(f"火山引擎客户端初始化成功，使用端点: {VOLCENGINE_ENDPOINT_ID}")
+        logger.info("火山引擎客户端初始化成功，使用端点: %s", VOLCENGINE_ENDPOINT_ID)
     except ImportError:
         client = None
-        print("未检测到可用的火山引擎SDK，请检查依赖安装")
+        logger.warning("未检测到可用的火山引擎SDK，请检查依赖安装")
 except Exception as e:
-    print(f"火山引擎客户端初始化失败: {e}")
+    logger.error("火山引擎客户端初始化失败: %s", e)
     client = None
 
 class BochaNewsService:
     def __init__(self):
         self.api_key = BOCHA_API_KEY
-        self.headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json'
-        }
+        # 多路查询扇出：抓取计划（NEWS_INGESTION_PLAN 指向 JSON 文件，未配置时用默认计划）与并发度
+        self.ingestion_plan = load_plan(os.getenv('NEWS_INGESTION_PLAN'))
+        self.ingestion_parallel = max(1, self._parse_int(os.getenv('BOCHA_MAX_PARALLEL', '4'), 4))
+        self.last_ingest_stats = None
+        # 近重复合并的 Jaccard 阈值（0 表示关闭）
+        try:
+            self.dedup_threshold = min(1.0, max(0.0, float(os.getenv('NEWS_DEDUP_THRESHOLD', '0.5'))))
+        except ValueError:
+            self.dedup_threshold = 0.5
+        # 博查上游客户端：keep-alive 连接池、连接/读取超时分离、抖动退避重试、熔断与限速
+        self.bocha_client = BochaClient(
+            self.api_key,
+            BOCHA_API_URL,
+            connect_timeout=self._parse_int(os.getenv('BOCHA_CONNECT_TIMEOUT', '5'), 5),
+            read_timeout=self._parse_int(os.getenv('BOCHA_READ_TIMEOUT', '30'), 30),
+            max_retries=max(0, self._parse_int(os.getenv('BOCHA_MAX_RETRIES', '3'), 3)),
+            breaker=CircuitBreaker(
+                failure_threshold=self._parse_int(os.getenv('BOCHA_BREAKER_THRESHOLD', '5'), 5),
+                reset_seconds=self._parse_int(os.getenv('BOCHA_BREAKER_RESET_SECONDS', '120'), 120),
+            ),
+            pool_size=self.ingestion_parallel,
+            rate_limiter=RateLimiter(float(os.getenv('BOCHA_RATE_PER_SECOND', '2') or 0),
+                                     burst=self.ingestion_parallel),
+        )
         # 后台刷新配置（起始时间与间隔小时），通过环境变量设置
         # 支持三种方式：
         # 1) NEWS_REFRESH_START_TIME=HH:MM（优先）
@@ -87,12 +337,82 @@ class BochaNewsService:
         self.refresh_interval_hours = max(1, self._parse_int(os.getenv('NEWS_REFRESH_INTERVAL_HOURS', '4'), 4))
         # 时区（可选）。例如：Asia/Shanghai、UTC
         self.refresh_tz_name = os.getenv('NEWS_REFRESH_TZ')
+        # 文章保留窗口（小时）：刷新时未再出现的旧文章保留到超过该窗口才移除
+        self.retention_hours = max(0, self._parse_int(os.getenv('NEWS_RETENTION_HOURS', '24'), 24))
+        # 火山引擎分块并发加工：每块 K 个网页、线程池大小、单块额外重试次数
+        self.enrich_chunk_size = max(1, self._parse_int(os.getenv('VOLCENGINE_CHUNK_SIZE', '10'), 10))
+        self.enrich_max_workers = max(1, self._parse_int(os.getenv('VOLCENGINE_MAX_WORKERS', '4'), 4))
+        self.enrich_chunk_retries = max(0, self._parse_int(os.getenv('VOLCENGINE_CHUNK_RETRIES', '1'), 1))
+        # 流式输出：逐条解析并推送，首批标题无需等待整段补全
+        self.enrich_stream = os.getenv('VOLCENGINE_STREAM', '1') != '0'
+        # 加工中途的部分发布最多每 N 秒一次（每次都要重建快照、同步检索索引，并使 ETag 与页面缓存失效）；0 表示逐条发布
+        self.partial_publish_seconds = max(0.0, _env_float('NEWS_PARTIAL_PUBLISH_SECONDS', 0.25))
         self.refresh_tz = None
         if self.refresh_tz_name and ZoneInfo is not None:
             try:
                 self.refresh_tz = ZoneInfo(self.refresh_tz_name)
             except Exception:
                 self.refresh_tz = None
+        # 单飞合并：同一时刻只允许一次刷新在途；强制刷新之间至少间隔 N 秒
+        self.refresh_min_interval_seconds = max(0, self._parse_int(os.getenv('NEWS_REFRESH_MIN_INTERVAL_SECONDS', '60'), 60))
+        self._refresh_flight = SingleFlight(self.refresh_min_interval_seconds)
+        # 多进程共享（gunicorn 多 worker）：通过本地快照库的租约选出唯一的刷新 worker，
+        # 其它 worker 轮询快照代号获取新数据，不调用上游
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.shared_poll_seconds = max(1, self._parse_int(os.getenv('NEWS_SHARED_POLL_SECONDS', '5'), 5))
+        self.leader_lease_seconds = max(self.shared_poll_seconds * 3,
+                                        self._parse_int(os.getenv('NEWS_LEADER_LEASE_SECONDS', '30'), 30))
+        self.is_leader = False
+        self.coordinator_running = False
+        self.snapshot_generation = 0
+        self._snapshot_loaded = threading.Event()
+        self._sync_lock = threading.Lock()
+        # 非刷新 worker 上的刷新请求写入共享库，由刷新 worker 每 N 秒领取、合并为一次刷新执行；
+        # 提交方只有限地等待：冷启动取数最多等 NEWS_FOLLOWER_WAIT_SECONDS，同步刷新接口最多等 NEWS_FOLLOWER_REFRESH_WAIT_SECONDS
+        self.refresh_request_poll_seconds = max(1, self._parse_int(os.getenv('NEWS_REFRESH_REQUEST_POLL_SECONDS', '1'), 1))
+        self.follower_wait_seconds = max(0, self._parse_int(os.getenv('NEWS_FOLLOWER_WAIT_SECONDS', '5'), 5))
+        self.follower_refresh_wait_seconds = max(0, self._parse_int(os.getenv('NEWS_FOLLOWER_REFRESH_WAIT_SECONDS', '30'), 30))
+        self._serving_requests = False
+        self._install_lock = threading.Lock()
+        self._generation = 0
+        # JSON API 的浏览器/CDN 缓存时间（秒），配合 ETag 做条件请求
+        self.api_max_age = max(0, self._parse_int(os.getenv('NEWS_API_MAX_AGE', '30'), 30))
+        # 过期后仍可先用旧响应、同时在后台重新验证的时间窗口（stale-while-revalidate，秒）
+        self.api_stale_seconds = max(0, self._parse_int(os.getenv('NEWS_API_STALE_SECONDS', '300'), 300))
+        # 最近一次刷新的结果（状态、新文章数），供调度器调整节奏
+        self.last_refresh_outcome = None
+        self.scheduler = self._build_scheduler()
+
+    def _build_scheduler(self):
+        """后台刷新调度：NEWS_REFRESH_CRON（优先）或“起始时间 + 间隔小时”，带抖动、补跑与自适应节奏"""
+        spec = IntervalSpec(self.refresh_interval_hours * 3600, self.refresh_start_hour, self.refresh_start_minute)
+        cron = os.getenv('NEWS_REFRESH_CRON')
+        if cron:
+            try:
+                spec = CronSpec(cron)
+            except ValueError as e:
+                logger.warning("NEWS_REFRESH_CRON 无效，改用间隔调度: %s", e)
+        cadence = None
+        if os.getenv('NEWS_REFRESH_ADAPTIVE', '1') != '0':
+            period = spec.period_seconds(self._now_dt())
+            min_minutes = max(1, self._parse_int(os.getenv('NEWS_REFRESH_ADAPTIVE_MIN_MINUTES', '30'), 30))
+            try:
+                max_factor = float(os.getenv('NEWS_REFRESH_ADAPTIVE_MAX_FACTOR', '4'))
+            except ValueError:
+                max_factor = 4.0
+            cadence = AdaptiveCadence(
+                min_factor=min(1.0, min_minutes * 60 / period),
+                max_factor=max_factor,
+                busy_threshold=self._parse_int(os.getenv('NEWS_REFRESH_ADAPTIVE_BUSY_ARTICLES', '10'), 10),
+            )
+        return RefreshScheduler(
+            spec,
+            self._scheduled_refresh,
+            now=self._now_dt,
+            last_run=self._last_refresh_dt,
+            jitter_seconds=max(0, self._parse_int(os.getenv('NEWS_REFRESH_JITTER_SECONDS', '120'), 120)),
+            cadence=cadence,
+        )
     
     # ==== 时间工具：按照配置时区返回当前时间 ====
     def _now_dt(self):
@@ -101,112 +421,142 @@ class BochaNewsService:
     def _now_str(self):
         return self._now_dt().strftime('%Y-%m-%d %H:%M:%S')
     
-    def get_ai_news(self, force_refresh=False):
-        """获取今日AI咨询"""
-        global current_articles
-        
+    def get_ai_news(self, force_refresh=False, wait=True):
+        """获取今日AI咨询（单飞合并：并发调用只触发一次上游请求）
+
+        wait=False 时若已有刷新在途，直接返回上次的快照而不等待。
+        """
+        return self._refresh_flight.run(
+            self._fetch_ai_news,
+            fallback=lambda: current_articles,
+            force=force_refresh,
+            wait=wait,
+        )
+
+    def refresh_stats(self):
+        """单飞合并统计（调用次数、实际执行次数、被合并/节流的调用数）与加工备忘录命中统计"""
+        stats = self._refresh_flight.stats()
+        if enrichment_cache is not None:
+            stats['enrichment_cache'] = enrichment_cache.stats()
+        stats['bocha'] = self.bocha_client.stats()
+        stats['ingestion'] = self.last_ingest_stats
+        stats['related'] = related_index.stats()
+        stats['html_cache'] = html_cache.stats()
+        stats['scheduler'] = self.scheduler.stats()
+        stats['llm_budget'] = llm_budget.stats()
+        return stats
+
+    def _fetch_ai_news(self):
+        """实际调用博查 + 火山引擎获取新闻（只应由 get_ai_news 调度）"""
+        started = time.perf_counter()
+        status = 'error'
+        outcome = {}
+        known_ids = set(articles_cache)
+        llm_budget.begin_refresh()
         try:
-            print("正在调用博查AI API获取AI新闻...")
-            current_date = self._now_dt().strftime("%Y-%m-%d")
-            
-            # 使用include参数指定搜索网站范围
-            include_sites = "sohu.com|news.ifeng.com|36kr.com|techcrunch.com|venturebeat.com|theverge.com|arstechnica.com|zdnet.com"
-            exclude_sites = "tech.gmw.cn|m.gmw.cn"
-            # 构建查询
-            query = f"全球范围内关于AI人工智能的最新动态新闻，重点关注具有行业影响力的技术突破、产品发布、行业趋势、投资融资和政策法规等方面的内容"
-            
-            print(f"执行查询: {query}")
-            
-            # 调用博查Web Search API
-            url = 'https://api.bochaai.com/v1/web-search'
-            data = {
-                "query": query,
-                "freshness": "oneDay",
-                "summary": True,
-                "count": 50,
-                "exclude_sites": exclude_sites
-            }
-            
-            response = requests.post(url, headers=self.headers, json=data, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                news_data = self.parse_bocha_response(result)
-                if news_data and len(news_data) > 0:
-                    current_articles = news_data
-                    self.update_articles_cache(news_data)
-                    print(f"API调用成功，返回 {len(news_data)} 条新闻数据")
-                    _sse_notify("news_updated", {"last_update": self._now_str(), "count": len(news_data)})
-                    return news_data
-                else:
-                    print("API调用成功但未获取到有效新闻数据")
-                    current_articles = []
-                    self.update_articles_cache([])
-                    return []
-            else:
-                print(f"API调用失败: {response.status_code}")
-                current_articles = []
-                return []
-                
+            # 按抓取计划并发发出多路查询（通用/指定站点/分类/多页），合并后按 URL 去重
+            tasks = self.ingestion_plan
+            self._report_progress('searching', queries=len(tasks))
+            logger.info("开始刷新：执行抓取计划 %d 个查询，并发 %d", len(tasks), self.ingestion_parallel)
+            try:
+                webpages, ingest_stats = fetch_all(
+                    self.bocha_client, tasks, max_parallel=self.ingestion_parallel, key=normalize_url
+                )
+            except BochaError as e:
+                # 上游失败时保留上一份有效数据，不清空页面
+                logger.error("博查API调用失败: %s", e)
+                status = 'upstream_error'
+                outcome['error'] = str(e)
+                return current_articles
+            logger.info("抓取完成：%d 条结果，去重后 %d 条（失败查询 %d/%d）",
+                        ingest_stats['raw_pages'], ingest_stats['unique_pages'],
+                        ingest_stats['failed'], ingest_stats['tasks'])
+            self.last_ingest_stats = ingest_stats
+            # 近重复合并：多站点转载的同一新闻只保留一篇送去加工，其它来源记为 alternates
+            if self.dedup_threshold > 0:
+                webpages, dedup_stats = collapse_near_duplicates(webpages, threshold=self.dedup_threshold)
+                ingest_stats['dedup'] = dedup_stats
+                ARTICLES_DROPPED.inc(dedup_stats['input'] - dedup_stats['output'], 'duplicate')
+                logger.info("近重复合并：%d -> %d 条（%d 个转载簇，耗时 %ss）",
+                            dedup_stats['input'], dedup_stats['output'],
+                            dedup_stats['clusters'], dedup_stats['seconds'])
+            result = {'data': {'webPages': {'value': webpages}}}
+
+            # 分块完成即发布：读请求和 SSE 订阅者不必等整批加工结束
+            news_data = self.parse_bocha_response(result, on_partial=self.install_articles)
+            if not news_data:
+                logger.warning("API调用成功但未获取到有效新闻数据")
+            ARTICLES_PRODUCED.inc(len(news_data or []))
+            # 增量合并：新增文章 + 保留窗口内的旧文章
+            self._report_progress('publishing', articles=len(news_data or []))
+            merged, delta = self.install_articles(news_data or [], final=True)
+            outcome.update(count=len(merged), added=len(delta['added']), removed=len(delta['removed']),
+                           new_articles=sum(1 for item in news_data or [] if item.get('id') not in known_ids))
+            if news_data:
+                self.save_snapshot(merged)
+                # 归档合并后的版本：已存在的文章保留首次出现时的 created_at，按原日期去重
+                fresh_ids = {item.get('id') for item in news_data}
+                self.archive_articles([a for a in merged if a.get('id') in fresh_ids])
+                self.export_static()
+                logger.info("刷新完成：本次 %d 条新闻，当前共 %d 条（移除 %d 条），耗时 %.2fs",
+                            len(news_data), len(merged), len(delta['removed']), time.perf_counter() - started)
+            status = 'ok' if news_data else 'empty'
+            return merged
+
         except Exception as e:
-            print(f"API调用失败: {e}")
-            current_articles = []
-            return []
+            logger.exception("刷新失败")
+            outcome['error'] = str(e)
+            return current_articles
+        finally:
+            REFRESH_SECONDS.observe(time.perf_counter() - started)
+            REFRESHES.inc(1, status)
+            outcome['llm'] = llm_budget.refresh_usage()
+            self.last_refresh_outcome = dict(outcome, status=status)
+            self._report_progress('done' if status in ('ok', 'empty') else 'failed', status=status, **outcome)
+
+    def _report_progress(self, stage, **info):
+        """向异步刷新任务上报阶段与进度（searching / enriching / publishing，done / failed 结束）"""
+        try:
+            refresh_jobs.progress(stage, **info)
+        except Exception as e:
+            logger.debug("上报刷新进度失败: %s", e)
     
-    def parse_bocha_response(self, api_response):
-        """批量用火山引擎处理所有新闻，筛选、提炼、生成结构化AI新闻"""
+    # 批量加工的系统提示词（每个分块共用）
+    BATCH_SYSTEM_PROMPT = (
+        "你是一个专业的AI新闻编辑，负责对AI相关新闻进行筛选、提炼和专业化加工。"
+        "请根据以下原始新闻内容，筛选出与AI相关且有价值的新闻，去除无关内容。"
+        "每条新闻请根据其摘要内容自动生成一个吸引人且与AI强相关的标题（不要直接使用原文标题），让用户一看就知道和AI有关并有兴趣点击。"
+        "摘要部分请对原文summary进行总结和概括。"
+        "每条新闻请严格输出如下格式："
+        "原始序号：[数字]"
+        "标题：[自动生成的AI相关标题]"
+        "摘要：[对summary的总结概括]"
+        "分类：[技术突破/产品发布/行业动态/投资融资/政策法规]"
+        "请输出多条新闻时，每条新闻之间用两个换行分隔。"
+    )
+
+    def parse_bocha_response(self, api_response, on_partial=None):
+        """批量用火山引擎处理所有新闻，筛选、提炼、生成结构化AI新闻
+
+        on_partial(news_list) 会在每个分块完成后以“已完成分块的有序结果”回调，便于提前发布。
+        """
         try:
-            print(f"开始解析API响应，响应类型: {type(api_response)}")
             if 'data' in api_response and 'webPages' in api_response['data']:
                 webpages = api_response['data']['webPages']['value']
-                print(f"找到webPages数据，包含{len(webpages)}个项目")
-                
-                # 1. 拼接所有原始新闻内容
-                all_raw_news = []
-                for i, page in enumerate(webpages):
-                    title = page.get('name', '')
-                    summary = page.get('summary', '')
-                    all_raw_news.append(f"原始内容{i+1}：\n标题：{title}\n内容：{summary}")
-                all_raw_text = '\n\n'.join(all_raw_news)
+                logger.debug("待加工网页 %d 条", len(webpages))
                 
-                # 2. 一次性调用火山引擎
                 if client:
-                    system_prompt = (
-                        "你是一个专业的AI新闻编辑，负责对AI相关新闻进行筛选、提炼和专业化加工。"
-                        "请根据以下原始新闻内容，筛选出与AI相关且有价值的新闻，去除无关内容。"
-                        "每条新闻请根据其摘要内容自动生成一个吸引人且与AI强相关的标题（不要直接使用原文标题），让用户一看就知道和AI有关并有兴趣点击。"
-                        "摘要部分请对原文summary进行总结和概括。"
-                        "每条新闻请严格输出如下格式："
-                        "原始序号：[数字]"
-                        "标题：[自动生成的AI相关标题]"
-                        "摘要：[对summary的总结概括]"
-                        "分类：[技术突破/产品发布/行业动态/投资融资/政策法规]"
-                        "请输出多条新闻时，每条新闻之间用两个换行分隔。"
-                    )
-                    user_prompt = (
-                        f"请根据以下原始新闻内容，筛选、提炼并生成结构化AI新闻，去除无关内容。\n\n"
-                        f"{all_raw_text}\n\n"
-                        f"请严格按照如下格式输出：\n"
-                        f"原始序号：[数字]\n标题：[自动生成的AI相关标题]\n摘要：[对summary的总结概括]\n分类：[技术突破/产品发布/行业动态/投资融资/政策法规]"
-                        f"\n多条新闻之间用两个换行分隔。"
-                    )
-                    print("批量调用火山引擎...输入内容长度:", len(all_raw_text))
-                    volcengine_result = self.generate_with_volcengine_batch(system_prompt, user_prompt)
-                    print("火山引擎批量返回：", volcengine_result[:500])
-                    # 3. 解析火山引擎返回的多条新闻
-                    news_list = self.parse_volcengine_batch_response(volcengine_result, webpages)
-                    print(f"批量解析后news_list长度: {len(news_list)}")
-                    for idx, item in enumerate(news_list):
-                        print(f"news_list[{idx}]: {item}")
+                    news_list = self.enrich_pages(webpages, on_partial=on_partial)
+                    logger.info("加工完成：%d 条网页得到 %d 条新闻", len(webpages), len(news_list))
                     return news_list
                 else:
-                    print("未检测到火山引擎SDK，直接返回原始新闻")
+                    logger.warning("未检测到火山引擎SDK，直接返回原始新闻")
                     # 兼容：直接返回原始新闻
                     news_list = []
                     current_time = self._now_dt()
                     for i, page in enumerate(webpages):
                         news_item = {
-                            'id': str(i + 1),
+                            'id': make_article_id(page.get('url', ''), page.get('name', '')),
                             'title': page.get('name', ''),
                             'url': page.get('url', ''),
                             'summary': page.get('summary', ''),
@@ -216,20 +566,303 @@ class BochaNewsService:
                             'created_at': current_time.strftime('%Y-%m-%d %H:%M:%S')
                         }
                         news_list.append(news_item)
+                    self._attach_alternates(news_list, self._alternates_index(webpages))
                     return news_list
             else:
-                print("API响应格式不符合预期")
+                logger.warning("API响应格式不符合预期")
                 return []
-        except Exception as e:
-            print(f"解析响应失败: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("解析响应失败")
             return []
 
-    def generate_with_volcengine_batch(self, system_prompt, user_prompt):
-        """批量调用火山引擎"""
+    @staticmethod
+    def _alternates_index(webpages):
+        return {normalize_url(p.get('url', '')): p['alternates'] for p in webpages if p.get('alternates')}
+
+    @staticmethod
+    def _attach_alternates(news_list, alternates):
+        """把近重复合并时记录的其它转载来源带到加工后的文章上（alternate_sources）"""
+        if not alternates:
+            return
+        for item in news_list:
+            found = alternates.get(normalize_url(item.get('url', '')))
+            if found:
+                item['alternate_sources'] = [
+                    {'url': alt['url'], 'source': alt.get('siteName') or '未知来源'} for alt in found
+                ]
+
+    def enrich_pages(self, webpages, on_partial=None):
+        """把网页按 enrich_chunk_size 分块，在有界线程池中并发调用火山引擎
+
+        - 先查加工备忘录，命中的网页直接复用上次的标题/摘要/分类，只把未命中的送给模型
+        - 原始序号保持全局编号，解析时仍按序号映射回 webpages
+        - 每个分块独立重试，单块失败不影响其它分块
+        - 结果按网页的原始顺序合并
+        - 中途结果经 on_partial 发布，最多每 partial_publish_seconds 秒一次，期间到达的结果由下一次发布一并带上
+        """
+        position = {}
+        for i, page in enumerate(webpages):
+            position.setdefault(normalize_url(page.get('url', '')), i)
+        memo_keys = [self._memo_key(page) for page in webpages]
+        cached = {}
+        if enrichment_cache is not None:
+            try:
+                cached = enrichment_cache.get_many(memo_keys)
+            except Exception as e:
+                logger.warning("读取加工备忘录失败: %s", e)
+        alternates = self._alternates_index(webpages)
+        cached_items = []
+        for i, page in enumerate(webpages):
+            hit = cached.get(memo_keys[i])
+            if hit and hit['title']:
+                cached_items.append(self._news_item_from_memo(page, hit))
+        self._attach_alternates(cached_items, alternates)
+        pending = [i for i, key in enumerate(memo_keys) if key not in cached]
+        logger.info("加工备忘录命中 %d/%d，需调用模型 %d 条", len(webpages) - len(pending), len(webpages), len(pending))
+        # 预算：超出本轮/每小时/每天剩余额度时舍弃价值最低的网页，改走简化处理
+        kept, dropped = llm_budget.select(
+            [estimate_tokens(webpages[i].get('name', '')) + estimate_tokens(webpages[i].get('summary', '')[:llm_budget.summary_max_chars or None])
+             for i in pending],
+            [page_value(webpages[i], i) for i in pending],
+            self.enrich_chunk_size,
+            estimate_tokens(self.BATCH_SYSTEM_PROMPT) + 200,
+        )
+        if dropped:
+            dropped_indices = [pending[n] for n in dropped]
+            pending = [pending[n] for n in sorted(kept)]
+            cached_items.extend(self._fallback_items(webpages, dropped_indices))
+            logger.warning("模型预算不足：%d 条网页改用简化处理，%d 条送去模型", len(dropped_indices), len(pending))
+
+        size = self.enrich_chunk_size
+        chunks = [pending[start:start + size] for start in range(0, len(pending), size)]
+        lock = threading.Lock()
+        # 流式模式下分块尚未结束时逐条到达的结果（live），分块结束后以最终结果（done）为准
+        live = {n: [] for n in range(len(chunks))}
+        done = {}
+
+        def ordered():
+            items = list(cached_items)
+            for n in range(len(chunks)):
+                items.extend(done[n] if n in done else live[n])
+            return sorted(items, key=lambda item: position.get(normalize_url(item['url']), len(webpages)))
+
+        # 部分发布的节流状态：last 为上次发布时间，dirty 表示有尚未发布的结果，timer 为待执行的延迟发布
+        publish_lock = threading.Lock()
+        throttle = {'last': 0.0, 'dirty': False, 'timer': None, 'closed': False}
+
+        def flush():
+            # publish_lock 保证各次发布按顺序安装，较旧的结果不会覆盖较新的
+            with publish_lock:
+                with lock:
+                    throttle['timer'] = None
+                    if throttle['closed'] or not throttle['dirty']:
+                        return
+                    throttle['dirty'] = False
+                    throttle['last'] = time.monotonic()
+                    partial = ordered()
+                if on_partial:
+                    try:
+                        on_partial(partial)
+                    except Exception as e:
+                        logger.warning("发布分块结果失败: %s", e)
+
+        def publish():
+            """有新结果时调用：距上次发布已满间隔则立即发布，否则安排一次延迟发布"""
+            with lock:
+                throttle['dirty'] = True
+                if throttle['timer'] is not None:
+                    return
+                delay = throttle['last'] + self.partial_publish_seconds - time.monotonic()
+                if delay > 0:
+                    timer = throttle['timer'] = threading.Timer(delay, flush)
+                    timer.daemon = True
+                    timer.start()
+                    return
+                # 先占下本次发布的时间点，同时到达的其它结果改走延迟发布
+                throttle['last'] = time.monotonic()
+            flush()
+
+        def close():
+            # 最终结果由调用方安装：取消尚未执行的延迟发布，并等待正在进行的发布结束
+            with publish_lock:
+                with lock:
+                    throttle['closed'] = True
+                    timer = throttle['timer']
+            if timer is not None:
+                timer.cancel()
+            return ordered()
+
+        def on_item_for(n):
+            def on_item(item):
+                self._attach_alternates([item], alternates)
+                with lock:
+                    live[n].append(item)
+                publish()
+            return on_item
+
+        self._report_progress('enriching', pages=len(webpages), memo_hits=len(webpages) - len(pending),
+                              chunks=len(chunks), chunks_done=0)
+        if cached_items and chunks:
+            publish()
+        if not chunks:
+            return close()
+
+        workers = min(self.enrich_max_workers, len(chunks))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='enrich') as pool:
+            futures = {
+                pool.submit(self._enrich_chunk, webpages, indices, on_item_for(n)): n
+                for n, indices in enumerate(chunks)
+            }
+            for future in as_completed(futures):
+                n = futures[future]
+                try:
+                    items = future.result()
+                except Exception as e:
+                    logger.error("火山引擎分块 %d/%d 处理失败: %s", n + 1, len(chunks), e)
+                    items = []
+                self._attach_alternates(items, alternates)
+                with lock:
+                    # 流式模式下逐条结果已发布过，只有最终结果与之不同（例如整块改走简化处理）时才需要再发布
+                    changed = not self.enrich_stream or len(items) != len(live[n])
+                    done[n] = items
+                    articles = len(cached_items) + sum(len(done[m]) if m in done else len(live[m]) for m in live)
+                self._report_progress('enriching', chunks_done=len(done), articles=articles)
+                logger.debug("火山引擎分块 %d/%d 完成，得到 %d 条", n + 1, len(chunks), len(items))
+                if items and changed:
+                    publish()
+        return close()
+
+    @staticmethod
+    def _memo_key(page):
+        """加工备忘录的键：归一化 URL + 原始摘要的哈希（摘要变化时重新加工）"""
+        raw = f"{normalize_url(page.get('url', ''))}\n{page.get('summary', '')}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _news_item_from_memo(self, page, memo):
+        current_time = self._now_dt()
+        url = page.get('url', '')
+        return {
+            'id': make_article_id(url, memo['title']),
+            'title': memo['title'],
+            'url': url,
+            'summary': memo['summary'],
+            'source': page.get('siteName', '未知来源'),
+            'time': current_time.strftime('%Y-%m-%d %H:%M'),
+            'category': memo['category'] or '技术突破',
+            'created_at': current_time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def _remember_chunk(self, webpages, indices, news_list, complete=True):
+        """把分块结果写入加工备忘录；模型未输出的网页记为“无关”，下次同样跳过
+
+        complete=False（输出中途断开或被截断）时只记下实际收到的结果，
+        未输出的网页不能断定为无关，不写入备忘录，下次刷新重新加工。
+        """
+        if enrichment_cache is None:
+            return
+        by_url = {normalize_url(item['url']): item for item in news_list if item['url']}
+        entries = {}
+        for i in indices:
+            page = webpages[i]
+            item = by_url.get(normalize_url(page.get('url', '')))
+            if item:
+                entries[self._memo_key(page)] = {
+                    'title': item['title'], 'summary': item['summary'], 'category': item['category']
+                }
+            elif complete:
+                entries[self._memo_key(page)] = {'title': '', 'summary': '', 'category': ''}
+        try:
+            enrichment_cache.put_many(entries)
+        except Exception as e:
+            logger.warning("写入加工备忘录失败: %s", e)
+
+    def _enrich_chunk(self, webpages, indices, on_item=None):
+        """加工单个分块；返回内容为空或无法解析出任何标题时整块重试
+
+        流式模式下每解析出一条完整新闻就调用 on_item(item)。
+        摘要按预算截断后再拼入提示词；预算额度不足时整块改走简化处理。
+        """
+        def build_prompt(summaries):
+            raw_text = '\n\n'.join(
+                f"原始内容{i + 1}：\n标题：{webpages[i].get('name', '')}\n内容：{summary}"
+                for i, summary in zip(indices, summaries)
+            )
+            return (
+                f"请根据以下原始新闻内容，筛选、提炼并生成结构化AI新闻，去除无关内容。\n\n"
+                f"{raw_text}\n\n"
+                f"请严格按照如下格式输出：\n"
+                f"原始序号：[数字]\n标题：[自动生成的AI相关标题]\n摘要：[对summary的总结概括]\n分类：[技术突破/产品发布/行业动态/投资融资/政策法规]"
+                f"\n多条新闻之间用两个换行分隔。"
+            )
+
+        overhead = estimate_tokens(self.BATCH_SYSTEM_PROMPT) + estimate_tokens(build_prompt([''] * len(indices)))
+        summaries = llm_budget.fit_summaries([webpages[i].get('summary', '') for i in indices], overhead)
+        user_prompt = build_prompt(summaries)
+        reservation = llm_budget.acquire(estimate_tokens(self.BATCH_SYSTEM_PROMPT) + estimate_tokens(user_prompt))
+        if reservation is None:
+            logger.warning("模型 token/请求配额不足，分块（原始序号 %d-%d）改用简化处理", indices[0] + 1, indices[-1] + 1)
+            return self._fallback_items(webpages, indices)
+        # 本分块网页的二元组索引只建一次；重试只在没有产出任何文章（也就没有占用网页）时发生，可以复用
+        title_index = TitleIndex(webpages, indices)
+        for attempt in range(self.enrich_chunk_retries + 1):
+            logger.debug("调用火山引擎分块（原始序号 %d-%d），输入长度 %d", indices[0] + 1, indices[-1] + 1, len(user_prompt))
+            if self.enrich_stream:
+                news_list = []
+                records = []
+
+                def on_record(record):
+                    records.append(record)
+                    parse_started = time.perf_counter()
+                    item = self._news_item_from_record(record, webpages, title_index)
+                    PARSE_SECONDS.observe(time.perf_counter() - parse_started)
+                    if item:
+                        news_list.append(item)
+                        if on_item:
+                            on_item(item)
+
+                _, complete = self.generate_with_volcengine_stream(
+                    self.BATCH_SYSTEM_PROMPT, user_prompt, on_record, reservation)
+            else:
+                volcengine_result, complete = self.generate_with_volcengine_batch(
+                    self.BATCH_SYSTEM_PROMPT, user_prompt, reservation)
+                parse_started = time.perf_counter()
+                records = parse_records(volcengine_result) if volcengine_result else []
+                news_list = self._news_items_from_records(records, webpages, indices, title_index)
+                PARSE_SECONDS.observe(time.perf_counter() - parse_started)
+            if len(news_list) < len(records):
+                # 有记录解析失败或对应不到网页：无法确定未输出的网页是否真的无关
+                complete = False
+            if news_list:
+                self._remember_chunk(webpages, indices, news_list, complete)
+                ARTICLES_DROPPED.inc(max(0, len(indices) - len(news_list)), 'irrelevant')
+                return news_list
+            logger.warning("分块结果为空或格式异常（尝试 %d/%d）", attempt + 1, self.enrich_chunk_retries + 1)
+            if attempt < self.enrich_chunk_retries:
+                VOLCENGINE_RETRIES.inc()
+        return []
+
+    def _fallback_items(self, webpages, indices):
+        """预算不足、未送去模型的网页改用简化处理（不写入加工备忘录，额度恢复后下次刷新重新加工）"""
+        blocks = []
+        for i in indices:
+            page = webpages[i]
+            text = self.simple_text_processing(f"标题：{page.get('name', '')}\n{page.get('summary', '')}")
+            if text:
+                blocks.append(f"原始序号：{i + 1}\n{text}")
+        llm_budget.record_fallback(len(indices))
+        return self.parse_volcengine_batch_response('\n\n'.join(blocks), webpages, indices)
+
+    def generate_with_volcengine_batch(self, system_prompt, user_prompt, reservation=None):
+        """批量调用火山引擎（reservation 为预算预占，按响应 usage 结算）
+
+        返回 (文本, complete)：complete 为 False 表示输出因长度上限（finish_reason == 'length'）被截断。
+        """
         max_retries = 3
         for attempt in range(max_retries):
+            if not llm_budget.attempt(reservation):
+                logger.warning("模型请求数配额已用完，停止重试")
+                break
+            started = time.perf_counter()
             try:
                 response = client.chat.completions.create(
                     model=VOLCENGINE_ENDPOINT_ID,
@@ -239,119 +872,466 @@ class BochaNewsService:
                     ],
                     stream=False
                 )
+                _record_llm_call('batch', time.perf_counter() - started, getattr(response, 'usage', None), reservation)
                 if response and hasattr(response, 'choices') and response.choices:
-                    return response.choices[0].message.content
+                    choice = response.choices[0]
+                    if getattr(choice, 'finish_reason', None) == 'length':
+                        logger.warning("火山引擎批量输出因长度上限被截断")
+                        return choice.message.content, False
+                    return choice.message.content, True
+            except Exception as e:
+                _record_llm_call('batch', time.perf_counter() - started, reservation=reservation)
+                logger.warning("火山引擎批量API调用失败 (尝试 %d/%d): %s", attempt + 1, max_retries, e)
+                if attempt < max_retries - 1:
+                    VOLCENGINE_RETRIES.inc()
+                    time.sleep(2 ** attempt)
+        return "", False
+
+    def generate_with_volcengine_stream(self, system_prompt, user_prompt, on_record, reservation=None):
+        """流式调用火山引擎：边接收 token 边解析，每得到一条完整记录就调用 on_record(record)
+
+        尚未产出任何记录时失败会重试；已产出部分结果后失败则保留已有结果直接返回。
+        返回 (文本, complete)：complete 表示输出正常结束（没有中途断开，也没有因长度上限被截断）。
+        """
+        max_retries = 3
+        for attempt in range(max_retries):
+            if not llm_budget.attempt(reservation):
+                logger.warning("模型请求数配额已用完，停止重试")
+                break
+            collected = []
+            usage = {}
+            emitted = 0
+            started = time.perf_counter()
+            try:
+                response = client.chat.completions.create(
+                    model=VOLCENGINE_ENDPOINT_ID,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                for record in iter_records(_iter_stream_content(response, collected, usage)):
+                    emitted += 1
+                    on_record(record)
+                if usage.get('finish_reason') == 'length':
+                    logger.warning("火山引擎流式输出因长度上限被截断，已收到 %d 条记录", emitted)
+                    return ''.join(collected), False
+                return ''.join(collected), True
             except Exception as e:
-                print(f"火山引擎批量API调用失败 (尝试 {attempt + 1}/3): {e}")
+                logger.warning("火山引擎流式API调用失败 (尝试 %d/%d): %s", attempt + 1, max_retries, e)
+                if emitted:
+                    return ''.join(collected), False
                 if attempt < max_retries - 1:
+                    VOLCENGINE_RETRIES.inc()
                     time.sleep(2 ** attempt)
-        return ""
+            finally:
+                _record_llm_call('stream', time.perf_counter() - started, usage.get('usage'), reservation)
+        return "", False
+
+    def parse_volcengine_batch_response(self, response_text, webpages, indices=None, title_index=None):
+        """解析火山引擎批量返回的多条新闻，返回新闻列表（只含能对应到网页的记录）
 
-    def parse_volcengine_batch_response(self, response_text, webpages):
-        """解析火山引擎批量返回的多条新闻，返回新闻列表，优先用原始序号匹配url/source"""
+        indices 为本次送去模型的网页下标（默认全部）；按标题模糊匹配时只在其中查找。
+        """
         if not response_text:
             return []
-        import re
-        blocks = [b.strip() for b in response_text.strip().split('\n\n') if b.strip()]
-        news_list = []
-        current_time = self._now_dt()
-        for idx, block in enumerate(blocks):
-            title, summary, category, raw_index = None, None, None, None
-            for line in block.split('\n'):
-                line = line.strip()
-                if line.startswith('原始序号：') or line.startswith('原始序号:'):
-                    raw_index = re.sub(r'[^0-9]', '', line)
-                elif line.startswith('标题：') or line.startswith('标题:'):
-                    title = line.split('：', 1)[-1].split(':', 1)[-1].strip()
-                elif line.startswith('摘要：') or line.startswith('摘要:'):
-                    summary = line.split('：', 1)[-1].split(':', 1)[-1].strip()
-                elif line.startswith('分类：') or line.startswith('分类:'):
-                    category = line.split('：', 1)[-1].split(':', 1)[-1].strip()
-            # 去除分类中括号
-            if category:
-                category = category.strip('[]').strip()
-            # 优先用原始序号匹配url/source
-            url = ''
-            source = ''
-            if raw_index and raw_index.isdigit():
-                idx0 = int(raw_index) - 1
-                if 0 <= idx0 < len(webpages):
-                    url = webpages[idx0].get('url', '')
-                    source = webpages[idx0].get('siteName', '未知来源')
-            # 兼容：如果没有原始序号，尝试用标题模糊匹配
-            if not url:
-                for page in webpages:
-                    if title and title in page.get('name', ''):
-                        url = page.get('url', '')
-                        source = page.get('siteName', '未知来源')
-                        break
-            news_item = {
-                'id': str(idx + 1),
-                'title': title or '',
-                'url': url,
-                'summary': summary or '',
-                'source': source,
-                'time': current_time.strftime('%Y-%m-%d %H:%M'),
-                'category': category or '技术突破',
-                'created_at': current_time.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            news_list.append(news_item)
-        return news_list
+        return self._news_items_from_records(parse_records(response_text), webpages, indices, title_index)
+
+    def _news_items_from_records(self, records, webpages, indices=None, title_index=None):
+        if title_index is None:
+            title_index = TitleIndex(webpages, indices)
+        # 先处理序号有效且内容吻合的记录，其余记录再按标题匹配（只在未被占用的网页中查找），结果保持输出顺序
+        items = [None] * len(records)
+        positions = [None] * len(records)
+        deferred = []
+        now = self._now_dt()
+        for n, record in enumerate(records):
+            if record['title'] and title_index.verified(record['index'], record['title'], record['summary']):
+                items[n] = self._news_item_from_record(record, webpages, title_index, verified=True, now=now)
+                positions[n] = record['index'] - 1
+            else:
+                deferred.append(n)
+        hints = self._neighbor_hints(positions) if deferred else None
+        for n in deferred:
+            # 第一遍未通过核对的记录之后也不会通过（占用只增不减），不再重复核对
+            items[n] = self._news_item_from_record(records[n], webpages, title_index, verified=False, now=now,
+                                                   hints=hints[n])
+        return [item for item in items if item]
+
+    @staticmethod
+    def _neighbor_hints(positions):
+        """每条记录前后最近一条已对应记录的相邻网页下标（模型通常按输入顺序输出，先核对这两个网页）"""
+        hints = [[] for _ in positions]
+        last = None
+        for n, pos in enumerate(positions):
+            if last is not None:
+                hints[n].append(last + 1)
+            if pos is not None:
+                last = pos
+        last = None
+        for n in range(len(positions) - 1, -1, -1):
+            if last is not None and last - 1 not in hints[n]:
+                hints[n].append(last - 1)
+            if positions[n] is not None:
+                last = positions[n]
+        return hints
+
+    def _news_item_from_record(self, record, webpages, title_index, verified=None, now=None, hints=()):
+        """把一条解析记录对应回网页：优先用原始序号；序号缺失、越界、重复或与内容对不上时按标题模糊匹配，
+        仍无法对应的丢弃"""
+        title = record['title']
+        if not title:
+            LLM_PARSE_ISSUES.inc(1, 'missing_title')
+            return None
+        index = record['index']
+        if verified is None:
+            verified = title_index.verified(index, title, record['summary'])
+        if verified:
+            pos = index - 1
+        else:
+            if index is None:
+                kind = 'missing_index'
+            elif index - 1 not in title_index:
+                kind = 'bad_index'
+            elif index - 1 in title_index.claimed:
+                kind = 'duplicate_index'
+            else:
+                kind = 'mismatched_index'
+            LLM_PARSE_ISSUES.inc(1, kind)
+            pos, score = title_index.match(title, record['summary'], hints)
+            if pos is not None:
+                LLM_PARSE_ISSUES.inc(1, 'fuzzy_matched')
+            else:
+                # 序号对应的网页内容对不上、也找不到足够接近的网页时同样丢弃：按序号硬对应会给出错误的来源链接
+                LLM_PARSE_ISSUES.inc(1, 'unmatched')
+                logger.debug("无法对应到网页的模型输出（最高匹配得分 %.2f）: %s", score, title)
+                return None
+        title_index.claim(pos)
+        category = normalize_category(record['category'])
+        if category is None:
+            LLM_PARSE_ISSUES.inc(1, 'invalid_category')
+            category = DEFAULT_CATEGORY
+        page = webpages[pos]
+        url = page.get('url', '')
+        created_at = (now or self._now_dt()).strftime('%Y-%m-%d %H:%M:%S')
+        return {
+            'id': make_article_id(url, title),
+            'title': title,
+            'url': url,
+            'summary': record['summary'],
+            'source': page.get('siteName', '未知来源'),
+            'time': created_at[:16],
+            'category': category,
+            'created_at': created_at
+        }
     
     # 已移除未使用的工具方法：clean_summary / deduplicate_news / categorize_news
     
-    def update_articles_cache(self, articles):
-        """更新文章缓存"""
-        global articles_cache
-        articles_cache.clear()
-        for article in articles:
-            articles_cache[article['id']] = article
+    def merge_articles(self, news_data):
+        """把本次结果与已有文章增量合并（按稳定ID）
+
+        - 新文章排在前面；已存在的文章保留首次出现时的内容，仅更新 last_seen
+        - 本次未出现的旧文章保留到 last_seen 超过 retention_hours 后移除
+        """
+        now = self._now_dt().replace(tzinfo=None)
+        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
+        cutoff = now - timedelta(hours=self.retention_hours)
+        merged = []
+        seen = set()
+        for item in news_data:
+            aid = item.get('id')
+            if not aid or aid in seen:
+                continue
+            seen.add(aid)
+            existing = articles_cache.get(aid)
+            article = dict(existing) if existing else dict(item)
+            if item.get('alternate_sources'):
+                article['alternate_sources'] = item['alternate_sources']
+            article['last_seen'] = now_str
+            merged.append(article)
+        for article in current_articles:
+            aid = article.get('id')
+            if not aid or aid in seen:
+                continue
+            try:
+                last_seen = datetime.strptime(article.get('last_seen') or article.get('created_at', ''), '%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                continue
+            if last_seen >= cutoff:
+                seen.add(aid)
+                merged.append(article)
+        return merged
+
+    def install_articles(self, news_data, final=False):
+        """增量合并并安装一批文章，推送增量；返回 (合并后的列表, 增量)
+
+        final=True 表示本轮刷新的最终结果：先重建相关文章近邻表再安装快照，
+        分块发布的中间结果沿用上一轮的近邻表。
+        """
+        global current_articles
+        with self._install_lock:
+            merged = self.merge_articles(news_data)
+            if final:
+                self._rebuild_related(merged)
+            current_articles = merged
+            delta = self.update_articles_cache(merged, self._now_str())
+        self._publish_delta(delta)
+        return merged, delta
+
+    def update_articles_cache(self, articles, last_update=None):
+        """更新文章缓存并生成新一代快照，返回与上一版相比的增量 {'added': [文章], 'removed': [ID]}
+
+        last_update 为这批数据的生成时间（而非请求时间），客户端据此判断内容是否变化。
+        """
+        global articles_cache, current_snapshot
+        self._generation += 1
+        snapshot = NewsSnapshot(self._generation, articles, last_update or self._now_str())
+        new_cache = snapshot.by_id
+        added = [article for aid, article in new_cache.items() if aid not in articles_cache]
+        removed = [aid for aid in articles_cache if aid not in new_cache]
+        # 整体替换而非原地清空，读请求不会看到半更新的缓存
+        articles_cache = new_cache
+        current_snapshot = snapshot
+        try:
+            search_index.sync(articles)
+        except Exception as e:
+            logger.warning("更新检索索引失败: %s", e)
+        return {'added': added, 'removed': removed}
+
+    def _rebuild_related(self, articles):
+        try:
+            related_index.rebuild(articles)
+        except Exception as e:
+            logger.warning("重建相关文章近邻表失败: %s", e)
+
+    def _publish_delta(self, delta):
+        """通过 SSE 推送逐篇增量（article_added / article_removed），最后推送 news_updated 汇总"""
+        for article in delta['added']:
+            _sse_notify("article_added", {"article": article})
+        for aid in delta['removed']:
+            _sse_notify("article_removed", {"id": aid})
+        _sse_notify("news_updated", {
+            "last_update": current_snapshot.last_update,
+            "generation": current_snapshot.generation,
+            "count": len(current_articles),
+            "added": len(delta['added']),
+            "removed": len(delta['removed']),
+            "delta": True,
+        })
     
+    def save_snapshot(self, articles):
+        """把本次成功的结果原子写入本地快照"""
+        if snapshot_store is None:
+            return
+        try:
+            self.snapshot_generation = snapshot_store.save(articles, current_snapshot.last_update or self._now_str())
+        except Exception as e:
+            logger.warning("写入本地快照失败: %s", e)
+
+    def archive_articles(self, articles):
+        """把本次加工得到的文章追加到按天分区的历史归档（已归档的文章不会重复写入）"""
+        if article_archive is None:
+            return
+        try:
+            written = article_archive.append(articles, fallback_day=self._now_dt().strftime('%Y-%m-%d'))
+            if written:
+                logger.info("已归档 %d 篇新文章", written)
+        except Exception as e:
+            logger.warning("写入文章归档失败: %s", e)
+
+    def export_static(self):
+        """配置了 STATIC_EXPORT_DIR 时，把本次结果导出为静态站点"""
+        if not STATIC_EXPORT_DIR:
+            return
+        try:
+            stats = run_static_export()
+            logger.info("静态导出完成：%d 个文件 -> %s（%ss）", stats['files'], stats['path'], stats['seconds'])
+        except Exception as e:
+            logger.error("静态导出失败: %s", e)
+
+    def load_snapshot(self, notify=False):
+        """启动时加载最近一次快照，返回加载的文章数。notify=True 时推送与上一版的增量"""
+        global current_articles
+        if snapshot_store is None:
+            return 0
+        try:
+            snapshot = snapshot_store.load_latest()
+        except Exception as e:
+            logger.warning("读取本地快照失败: %s", e)
+            return 0
+        if not snapshot or not snapshot['articles']:
+            return 0
+        current_articles = snapshot['articles']
+        self._rebuild_related(current_articles)
+        delta = self.update_articles_cache(current_articles, snapshot['created_at'])
+        if notify:
+            self._publish_delta(delta)
+        self.snapshot_generation = snapshot['generation']
+        self._snapshot_loaded.set()
+        logger.info("已加载本地快照：%d 条新闻（保存于 %s）", len(current_articles), snapshot['created_at'])
+        return len(current_articles)
+
+    def sync_snapshot(self):
+        """发现其它 worker 写入了更新的快照代号时加载它，并通知本进程的 SSE 订阅者"""
+        if snapshot_store is None:
+            return False
+        # 协调线程与请求线程都会调用，加锁避免同一份快照重复加载、重复推送
+        with self._sync_lock:
+            generation = snapshot_store.latest_generation()
+            if generation <= self.snapshot_generation:
+                return False
+            return self.load_snapshot(notify=True) > 0
+
+    def delegates_refresh(self):
+        """多 worker 部署且本进程不持有租约时，刷新必须交给刷新 worker，本进程不调用上游"""
+        return self.coordinator_running and not self.is_leader
+
+    @staticmethod
+    def _wait_until(done, timeout, interval=0.5):
+        """轮询 done() 直到返回真值，最多等待 timeout 秒；返回是否等到"""
+        deadline = time.monotonic() + timeout
+        while not done():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+        return True
+
+    def ensure_articles(self):
+        """返回当前文章；本进程为空时依次尝试：本地快照 -> 短暂等待刷新 worker -> 自己调用上游（仅刷新 worker）"""
+        if current_articles:
+            return current_articles
+        if self.load_snapshot():
+            return current_articles
+        if self.delegates_refresh():
+            # 非刷新 worker 不调用上游：刷新 worker 没有快照时启动即补跑一次，这里只短暂等它写入第一份快照，
+            # 不长时间占用请求线程；仍没有数据时返回空列表，新数据就绪后经 SSE 推送
+            self._wait_until(lambda: self.sync_snapshot() or bool(current_articles), self.follower_wait_seconds)
+            return current_articles
+        return self.get_ai_news()
+
+    def refresh(self, wait=True):
+        """强制刷新的统一入口（/api/refresh 与异步刷新任务）
+
+        单进程或本进程是刷新 worker 时直接执行；否则把请求写入共享库交给刷新 worker，
+        wait=True 时最多等待 follower_refresh_wait_seconds 秒，随后返回本进程同步到的最新快照。
+        """
+        if not self.delegates_refresh():
+            return self.get_ai_news(force_refresh=True, wait=wait)
+        request_id = uuid.uuid4().hex[:12]
+        snapshot_store.request_refresh(request_id)
+        logger.info("已把刷新请求 %s 提交给刷新 worker", request_id)
+        if wait:
+            finished = self._wait_until(lambda: snapshot_store.refresh_request_finished(request_id),
+                                        self.follower_refresh_wait_seconds)
+            if not finished:
+                logger.info("刷新请求 %s 在 %ds 内未完成，先返回当前快照", request_id, self.follower_refresh_wait_seconds)
+        self.sync_snapshot()
+        return current_articles
+
     def start_background_refresh(self):
-        """启动后台刷新任务"""
-        refresh_thread = threading.Thread(target=self._background_refresh_worker, daemon=True)
-        refresh_thread.start()
-        print(
-            f"后台刷新任务已启动：起始时间={str(self.refresh_start_hour).zfill(2)}:"
-            f"{str(self.refresh_start_minute).zfill(2)}，间隔={self.refresh_interval_hours} 小时"
-        )
-    
-    def _background_refresh_worker(self):
-        """后台刷新工作线程（按起始点与间隔调度）"""
+        """启动后台刷新任务
+
+        有本地快照库时先参与选主：只有持有租约的 worker 运行刷新线程，
+        其它 worker 只同步快照。没有快照库时按单进程方式直接刷新。
+        """
+        if snapshot_store is None:
+            self.is_leader = True
+            self._start_refresh_threads()
+        elif not self.coordinator_running:
+            self.coordinator_running = True
+            threading.Thread(target=self._shared_cache_worker, daemon=True).start()
+            atexit.register(self._release_leadership)
+        atexit.register(self.scheduler.stop)
+
+    def _start_refresh_threads(self):
+        # 先对外提供已有快照；距上次成功刷新已错过时间点（或从未刷新）时调度器会立即补跑一次
+        if self.scheduler.start():
+            logger.info("后台刷新调度已启动：%s", self.scheduler.spec.describe())
+
+    def _shared_cache_worker(self):
+        """多进程协调线程：续租/竞选刷新 worker，并同步其它 worker 写入的新快照；
+        刷新 worker 另外每 refresh_request_poll_seconds 秒领取其它 worker 提交的刷新请求"""
+        next_lease = 0.0
         while True:
             try:
-                # 计算距离下一次刷新时间
-                sleep_seconds = self._seconds_until_next_refresh()
-                hours_left = max(0.0, sleep_seconds / 3600.0)
-                print(f"后台刷新：距离下一次刷新约 {hours_left:.2f} 小时")
-                time.sleep(sleep_seconds)
-                print("执行后台刷新...")
-                self.get_ai_news()
+                if time.monotonic() >= next_lease:
+                    next_lease = time.monotonic() + self.shared_poll_seconds
+                    leader = snapshot_store.try_acquire_lease('refresh', self.instance_id, self.leader_lease_seconds)
+                    if leader != self.is_leader:
+                        logger.info("刷新 worker 角色变更：%s（%s）", 'leader' if leader else 'follower', self.instance_id)
+                    self.is_leader = leader
+                    # 只有持有租约的 worker 运行调度器；失去租约时立即停止等待
+                    if leader and not self.scheduler.running:
+                        self._start_refresh_threads()
+                    elif not leader and self.scheduler.running:
+                        self.scheduler.stop()
+                    self.sync_snapshot()
+                if self.is_leader:
+                    self._serve_refresh_requests()
+                # 其它 worker 执行的刷新任务的进度同样推送给本进程的 SSE 订阅者
+                refresh_jobs.relay()
             except Exception as e:
-                print(f"后台刷新任务错误: {e}")
-                time.sleep(60)
-
-    def _seconds_until_next_refresh(self) -> int:
-        """计算距离下一次刷新的秒数。按每日 refresh_start_hour 为基点，每隔 refresh_interval_hours 小时一次。"""
-        now = datetime.now(self.refresh_tz) if self.refresh_tz else datetime.now()
-        today_base = now.replace(
-            hour=self.refresh_start_hour,
-            minute=self.refresh_start_minute,
-            second=0,
-            microsecond=0
-        )
-        interval_sec = max(1, int(self.refresh_interval_hours * 3600))
+                logger.error("多进程协调任务错误: %s", e)
+            time.sleep(min(self.refresh_request_poll_seconds, self.shared_poll_seconds))
 
-        if now <= today_base:
-            next_time = today_base
-        else:
-            elapsed = (now - today_base).total_seconds()
-            cycles = math.ceil(elapsed / interval_sec)
-            next_time = today_base + timedelta(seconds=cycles * interval_sec)
+    def _serve_refresh_requests(self):
+        """刷新 worker：领取其它 worker 提交的刷新请求，合并为一次强制刷新在后台执行（上一次未结束时不领取）"""
+        if self._serving_requests:
+            return
+        request_ids = snapshot_store.claim_refresh_requests(self.instance_id, self.leader_lease_seconds * 4)
+        if not request_ids:
+            return
+        self._serving_requests = True
+        threading.Thread(target=self._run_refresh_requests, args=(request_ids,),
+                         name='refresh-request', daemon=True).start()
+
+    def _run_refresh_requests(self, request_ids):
+        logger.info("执行其它 worker 提交的刷新请求：%s", ', '.join(request_ids))
+        # 请求来自异步刷新任务时接手同一个任务ID，进度写回共享库
+        job_id = refresh_jobs.adopt(request_ids)
+        try:
+            self.get_ai_news(force_refresh=True)
+        except Exception as e:
+            logger.error("执行刷新请求失败: %s", e)
+            refresh_jobs.progress('failed', error=str(e))
+        finally:
+            if job_id:
+                refresh_jobs.settle(job_id)
+            self._serving_requests = False
+            try:
+                snapshot_store.finish_refresh_requests(request_ids)
+            except Exception as e:
+                logger.warning("标记刷新请求完成失败: %s", e)
+
+    def _release_leadership(self):
+        if snapshot_store is not None and self.is_leader:
+            try:
+                snapshot_store.release_lease('refresh', self.instance_id)
+            except Exception:
+                pass
+
+    def _scheduled_refresh(self):
+        """调度器触发的刷新；返回本轮结果，本进程已不是刷新 worker 时返回 None（跳过）"""
+        if not self.is_leader:
+            logger.info("本进程已不是刷新 worker，跳过本次刷新")
+            return None
+        logger.info("执行后台刷新")
+        self.get_ai_news()
+        return self.last_refresh_outcome
 
-        # 最小睡眠 60 秒，避免频繁循环
-        sleep_seconds = int(max(60, (next_time - now).total_seconds()))
-        return sleep_seconds
+    def _last_refresh_dt(self):
+        """上次成功刷新的时间（取共享快照库中最新快照的写入时间，其它 worker 的刷新也算）"""
+        if snapshot_store is None:
+            return None
+        saved_ts = snapshot_store.latest_saved_ts()
+        if not saved_ts:
+            return None
+        if self.refresh_tz:
+            return datetime.fromtimestamp(saved_ts, self.refresh_tz)
+        return datetime.fromtimestamp(saved_ts)
 
     @staticmethod
     def _parse_int(value: str, default: int) -> int:
@@ -363,7 +1343,7 @@ class BochaNewsService:
     def generate_with_volcengine(self, context):
         """使用火山引擎对内容进行二次加工"""
         if not VOLCENGINE_API_KEY:
-            print("未设置 VOLCENGINE_API_KEY 环境变量")
+            logger.warning("未设置 VOLCENGINE_API_KEY 环境变量")
             return self.simple_text_processing(context)
 
         system_prompt = (
@@ -386,6 +1366,7 @@ class BochaNewsService:
             "   分类：[生成的分类]"
         )
 
+        context = llm_budget.fit_summaries([context], estimate_tokens(system_prompt) + 100)[0]
         user_prompt = (
             f"请对以下AI相关新闻内容进行二次加工，生成标题、摘要和分类：\n\n"
             f"原始内容：{context}\n\n"
@@ -395,11 +1376,21 @@ class BochaNewsService:
             f"分类：[技术突破/产品发布/行业动态/投资融资/政策法规]"
         )
 
+        reservation = llm_budget.acquire(estimate_tokens(system_prompt) + estimate_tokens(user_prompt))
+        if reservation is None:
+            logger.warning("模型 token/请求配额不足，使用简化处理")
+            llm_budget.record_fallback(1)
+            return self.simple_text_processing(context)
+
         # 重试机制
         max_retries = 3
         for attempt in range(max_retries):
+            if not llm_budget.attempt(reservation):
+                logger.warning("模型请求数配额已用完，停止重试")
+                break
+            started = time.perf_counter()
             try:
-                print(f"火山引擎API调用尝试 {attempt + 1}/{max_retries}")
+                logger.debug("火山引擎API调用尝试 %d/%d", attempt + 1, max_retries)
                 response = client.chat.completions.create(
                     model=VOLCENGINE_ENDPOINT_ID,
                     messages=[
@@ -408,27 +1399,29 @@ class BochaNewsService:
                     ],
                     stream=False
                 )
-                
+                _record_llm_call('single', time.perf_counter() - started, getattr(response, 'usage', None), reservation)
+
                 if response and hasattr(response, 'choices') and response.choices:
                     result = response.choices[0].message.content
-                    print(f"火山引擎API调用成功，响应长度: {len(result)}")
+                    logger.debug("火山引擎API调用成功，响应长度: %d", len(result))
                     return result
                 else:
-                    print(f"火山引擎API响应格式异常: {response}")
+                    logger.warning("火山引擎API响应格式异常: %s", response)
                     if attempt < max_retries - 1:
                         time.sleep(2 ** attempt)  # 指数退避
                         continue
                     
             except Exception as e:
-                print(f"火山引擎 API 调用失败 (尝试 {attempt + 1}/{max_retries}): {e}")
+                _record_llm_call('single', time.perf_counter() - started, reservation=reservation)
+                logger.warning("火山引擎 API 调用失败 (尝试 %d/%d): %s", attempt + 1, max_retries, e)
                 if attempt < max_retries - 1:
                     time.sleep(2 ** attempt)  # 指数退避
                     continue
                 else:
-                    print(f"所有重试都失败了，使用简化处理")
+                    logger.warning("所有重试都失败了，使用简化处理")
                     break
         
-        print(f"上下文长度: {len(context)}")
+        logger.debug("上下文长度: %d", len(context))
         return self.simple_text_processing(context)
 
     def simple_text_processing(self, context):
@@ -460,6 +1453,8 @@ class BochaNewsService:
             
             for line in lines:
                 line = line.strip()
+                if line.startswith(("标题:", "标题：")):
+                    continue
                 if line and len(line) > 10 and line not in seen_lines:
                     seen_lines.add(line)
                     content_lines.append(line)
@@ -478,57 +1473,300 @@ class BochaNewsService:
             return f"标题：{title}\n摘要：{summary}\n分类：{category}"
             
         except Exception as e:
-            print(f"简化文本处理失败: {e}")
+            logger.warning("简化文本处理失败: %s", e)
             return None
 
     # 已移除未使用的解析方法：parse_volcengine_response
 
 # 初始化服务
 bocha_service = BochaNewsService()
+bocha_service.load_snapshot()
+
+# 异步刷新任务：POST /api/refresh 立即返回任务ID，阶段进度与完成事件经 SSE 推送
+refresh_jobs = RefreshJobs(
+    bocha_service.refresh,
+    store=snapshot_store,
+    on_change=lambda event_type, job: _sse_notify(event_type, {'job': job}),
+    delegate=bocha_service.delegates_refresh,
+)
+
+# 其它组件自带的统计在采集时读取，不在热路径上额外计数
+metrics_registry.register('bocha_request_duration_seconds', '博查调用耗时',
+                          HistogramFamily(histogram=bocha_service.bocha_client.latency))
+metrics_registry.callback('bocha_retries_total', '博查调用重试次数', 'counter',
+                          lambda: bocha_service.bocha_client.stats()['retries'])
+metrics_registry.callback('bocha_responses_total', '博查响应数（按状态码）', 'counter',
+                          lambda: bocha_service.bocha_client.stats()['status_counts'], ('status',))
+metrics_registry.callback('bocha_circuit_open', '博查熔断器是否打开', 'gauge',
+                          lambda: int(bocha_service.bocha_client.breaker.state != 'closed'))
+metrics_registry.callback('enrichment_cache_lookups_total', '加工备忘录查询数（按结果）', 'counter',
+                          lambda: enrichment_cache and {'hit': enrichment_cache.hits, 'miss': enrichment_cache.misses},
+                          ('result',))
+metrics_registry.callback('html_cache_lookups_total', '页面渲染缓存查询数（按结果）', 'counter',
+                          lambda: {'hit': html_cache.hits, 'miss': html_cache.misses}, ('result',))
+metrics_registry.callback('sse_clients', '当前 SSE 连接数', 'gauge', lambda: sse_hub.clients)
+metrics_registry.callback('sse_events_published_total', '已发布的 SSE 事件数', 'counter', lambda: sse_hub.published)
+metrics_registry.callback('sse_clients_evicted_total', '因消费过慢被断开的 SSE 连接数', 'counter', lambda: sse_hub.evicted)
+metrics_registry.callback('sse_clients_rejected_total', '因连接数超限被拒绝的 SSE 连接数', 'counter',
+                          lambda: sse_hub.rejected)
+metrics_registry.callback('llm_budget_fallback_pages_total', '因 token/请求配额不足改用简化处理的网页数', 'counter',
+                          lambda: llm_budget.fallback_pages)
+metrics_registry.callback('llm_cost_total', '按 VOLCENGINE_PRICE_* 估算的模型调用费用', 'counter', lambda: llm_budget.cost)
+metrics_registry.callback('articles_current', '当前快照中的文章数', 'gauge', lambda: len(current_articles))
+
+if METRICS_ENABLED:
+    @app.before_request
+    def _start_timer():
+        request.environ['ai_news.started'] = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = request.environ.get('ai_news.started')
+        if started is not None:
+            # 按路由模板（而非具体 URL）聚合，避免文章ID造成标签爆炸
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_SECONDS.observe(time.perf_counter() - started, route, request.method)
+            HTTP_REQUESTS.inc(1, route, request.method, response.status_code)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus 指标"""
+        return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+# 首页服务端渲染的首屏条数与字段，也是 /api/news/<分类>/<页>.json 卡片分页的每页条数与字段
+INDEX_PAGE_SIZE = 60
+INDEX_CARD_FIELDS = ('id', 'title', 'summary', 'source', 'category', 'time', 'url')
+
+def _index_page(snapshot):
+    """首页 HTML（服务端渲染首屏资讯，同一代快照只渲染一次）"""
+    def render():
+        page, next_cursor, _ = snapshot.query(limit=INDEX_PAGE_SIZE)
+        initial = {
+            'data': [{f: article[f] for f in INDEX_CARD_FIELDS if f in article} for article in page],
+            'next_cursor': next_cursor,
+            'last_update': snapshot.last_update,
+        }
+        return render_template('index.html', initial=initial)
+
+    return html_cache.get_or_render('index', snapshot.generation, render)
+
+def _article_page(snapshot, article):
+    """文章详情页 HTML（按文章ID + 快照代号缓存）"""
+    return html_cache.get_or_render(('article', article['id']), snapshot.generation,
+                                    lambda: render_template('article.html', article=article))
+
+def _article_body(snapshot, article):
+    return snapshot.cached_body(('article', article['id']), lambda: {
+        'success': True,
+        'data': article
+    })
+
+def _related_body(snapshot, current_article):
+    article_id = current_article['id']
+
+    def build():
+        # 预计算的内容相似度近邻（已按相似度降序、过滤低于阈值的文章）
+        neighbors = related_index.neighbors(article_id) or []
+        related_articles = [snapshot.by_id[rid] for rid, _ in neighbors if rid in snapshot.by_id]
+        if not related_articles:
+            # 本轮刷新尚未完成时新出现的文章、或没有足够相似的文章：退化为同分类推荐
+            current_category = current_article.get('category', '')
+            for aid, article in snapshot.by_id.items():
+                if aid != article_id and article.get('category') == current_category:
+                    related_articles.append(article)
+                    if len(related_articles) >= related_index.top_k:
+                        break
+        return {
+            'success': True,
+            'data': related_articles
+        }
+
+    return snapshot.cached_body(('related', article_id), build)
 
 @app.route('/')
 def index():
     """首页"""
-    return render_template('index.html')
+    return _encoded_response(_index_page(current_snapshot), max_age=0, mimetype='text/html')
 
 @app.route('/article/<article_id>')
 def article_detail(article_id):
     """文章详情页"""
-    article = articles_cache.get(article_id)
+    snapshot = current_snapshot
+    article = snapshot.by_id.get(article_id)
     if not article:
         abort(404)
-    return render_template('article.html', article=article)
+    return _encoded_response(_article_page(snapshot, article), max_age=0, mimetype='text/html')
+
+def _cache_headers(max_age=None):
+    """预编码响应体共用的缓存头（Flask 路由与 asgi.py 共用）"""
+    max_age = bocha_service.api_max_age if max_age is None else max_age
+    cache_control = f'public, max-age={max_age}'
+    if max_age and bocha_service.api_stale_seconds:
+        cache_control += f', stale-while-revalidate={bocha_service.api_stale_seconds}'
+    return {
+        'Cache-Control': cache_control,
+        'Vary': 'Accept-Encoding',
+        'X-News-Generation': str(current_snapshot.generation),
+    }
+
+def _choose_encoding(body, accept_encodings):
+    """按 Accept-Encoding 选择预压缩体，返回 (字节, 编码或 None)"""
+    for candidate in ('br', 'gzip'):
+        if accept_encodings[candidate]:
+            encoded = body.encoded(candidate)
+            if encoded is not None:
+                return encoded, candidate
+    return body.raw, None
+
+def _encoded_response(body, max_age=None, mimetype='application/json'):
+    """返回预编码的响应体（默认 JSON）：支持 If-None-Match（304）、Cache-Control 与 br/gzip 压缩体"""
+    headers = _cache_headers(max_age)
+    if request.if_none_match.contains_weak(body.etag):
+        response = Response(status=304, headers=headers)
+        response.set_etag(body.etag, weak=True)
+        return response
+    data, encoding = _choose_encoding(body, request.accept_encodings)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    response = Response(data, mimetype=mimetype, headers=headers)
+    response.set_etag(body.etag, weak=True)
+    return response
+
+# /api/news 的分页/过滤/投影参数；请求中带任意一个时走分页查询
+_NEWS_QUERY_PARAMS = ('limit', 'cursor', 'category', 'source', 'since', 'until', 'fields')
+NEWS_PAGE_SIZE = 50
+NEWS_PAGE_MAX = 200
 
 @app.route('/api/news')
 def get_news():
-    """获取新闻列表API"""
+    """获取新闻列表API（每代快照只序列化一次，支持条件请求）
+
+    不带参数时返回全部文章；带参数时按发布时间倒序分页：
+    ?limit=&cursor=&category=&source=&since=&until=&fields=id,title,category
+    """
     try:
         if not current_articles:
-            # 如果没有缓存数据，获取新数据
-            bocha_service.get_ai_news()
-        
+            # 如果没有缓存数据：先读共享快照，必要时再获取新数据
+            bocha_service.ensure_articles()
+        if not any(name in request.args for name in _NEWS_QUERY_PARAMS):
+            return _encoded_response(current_snapshot.list_body)
+        return _news_page(current_snapshot)
+    except Exception as e:
         return jsonify({
-            'success': True,
-            'data': current_articles,
-            'count': len(current_articles),
-            'last_update': bocha_service._now_str()
-        })
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _news_page(snapshot):
+    try:
+        body = _news_page_body(snapshot, request.args)
+    except InvalidCursor:
+        return jsonify({
+            'success': False,
+            'error': '无效的分页游标'
+        }), 400
+    return _encoded_response(body)
+
+def _news_page_body(snapshot, args):
+    """分页查询的响应体（args 为查询参数映射）；游标无效时抛出 InvalidCursor"""
+    try:
+        limit = min(max(int(args.get('limit', NEWS_PAGE_SIZE)), 1), NEWS_PAGE_MAX)
+    except ValueError:
+        limit = NEWS_PAGE_SIZE
+    page, next_cursor, total = snapshot.query(
+        category=args.get('category') or None,
+        source=args.get('source') or None,
+        since=args.get('since') or None,
+        until=args.get('until') or None,
+        cursor=args.get('cursor') or None,
+        limit=limit,
+    )
+    fields = [f.strip() for f in (args.get('fields') or '').split(',') if f.strip()]
+    if fields:
+        page = [{f: article[f] for f in fields if f in article} for article in page]
+    return EncodedBody.from_json({
+        'success': True,
+        'data': page,
+        'count': len(page),
+        'total': total,
+        'next_cursor': next_cursor,
+        'last_update': snapshot.last_update,
+    })
+
+# 卡片列表的路径式分页：/api/news/<分类或 all>/<first 或上一页的 next_cursor>.json
+NEWS_CARDS_ALL = 'all'
+NEWS_CARDS_FIRST = 'first'
+
+def _news_cards_body(snapshot, category, page):
+    """等价于 ?limit=INDEX_PAGE_SIZE&fields=<卡片字段>&category=&cursor= 的分页响应体"""
+    return _news_page_body(snapshot, {
+        'limit': INDEX_PAGE_SIZE,
+        'fields': ','.join(INDEX_CARD_FIELDS),
+        'category': '' if category == NEWS_CARDS_ALL else category,
+        'cursor': '' if page == NEWS_CARDS_FIRST else page,
+    })
+
+@app.route('/api/news/<category>/<page>.json')
+def get_news_cards(category, page):
+    """首页卡片列表分页（static/js/app.js 使用）
+
+    参数都在路径里而不在查询串里：静态导出为每个分类预生成整条翻页链，nginx 按路径直接返回文件；
+    文件不存在（例如导出切换后还在用旧游标）时回源到这里，按当前快照计算。
+    """
+    try:
+        if not current_articles:
+            bocha_service.ensure_articles()
+        body = _news_cards_body(current_snapshot, category, page)
+    except InvalidCursor:
+        return jsonify({
+            'success': False,
+            'error': '无效的分页游标'
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
+    return _encoded_response(body)
+
+@app.route('/api/refresh', methods=['POST'])
+def start_refresh_job():
+    """提交异步刷新任务，立即返回任务ID（已有任务在途时返回该任务）
+
+    刷新期间读接口继续返回上一版快照；进度见 /api/refresh/<job_id> 或 SSE 的
+    refresh_progress / refresh_complete 事件。
+    """
+    job, created = refresh_jobs.start()
+    response = jsonify({'success': True, 'job': job, 'created': created})
+    response.status_code = 202
+    response.headers['Location'] = f"/api/refresh/{job['id']}"
+    return response
+
+@app.route('/api/refresh/<job_id>')
+def refresh_job_status(job_id):
+    """刷新任务状态：state（queued/running/done/failed）、当前阶段与进度"""
+    job = refresh_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': '刷新任务不存在或已过期'}), 404
+    response = jsonify({'success': True, 'job': job})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 @app.route('/api/refresh')
 def refresh_news():
-    """刷新新闻API"""
+    """同步刷新新闻API（保留兼容；前端改用 POST 提交异步任务）"""
     try:
-        news_data = bocha_service.get_ai_news(force_refresh=True)
+        # ?wait=0：已有刷新在途时不等待，直接返回当前快照
+        wait = request.args.get('wait', '1') != '0'
+        # 多 worker 时由持有租约的刷新 worker 执行，本 worker 只有限地等待结果
+        news_data = bocha_service.refresh(wait=wait)
         return jsonify({
             'success': True,
             'data': news_data,
             'count': len(news_data),
-            'last_update': bocha_service._now_str()
+            'last_update': current_snapshot.last_update or bocha_service._now_str(),
+            'refresh_stats': bocha_service.refresh_stats()
         })
     except Exception as e:
         return jsonify({
@@ -540,17 +1778,15 @@ def refresh_news():
 def get_article(article_id):
     """获取单篇文章详情API"""
     try:
-        article = articles_cache.get(article_id)
+        snapshot = current_snapshot
+        article = snapshot.by_id.get(article_id)
         if not article:
             return jsonify({
                 'success': False,
                 'error': '文章不存在'
             }), 404
         
-        return jsonify({
-            'success': True,
-            'data': article
-        })
+        return _encoded_response(_article_body(snapshot, article))
     except Exception as e:
         return jsonify({
             'success': False,
@@ -561,26 +1797,48 @@ def get_article(article_id):
 def get_related_articles(article_id):
     """获取相关文章API"""
     try:
-        current_article = articles_cache.get(article_id)
+        snapshot = current_snapshot
+        current_article = snapshot.by_id.get(article_id)
         if not current_article:
             return jsonify({
                 'success': False,
                 'error': '文章不存在'
             }), 404
         
-        # 简单的相关文章推荐：基于分类
-        related_articles = []
-        current_category = current_article.get('category', '')
-        
-        for aid, article in articles_cache.items():
-            if aid != article_id and article.get('category') == current_category:
-                related_articles.append(article)
-                if len(related_articles) >= 3:  # 最多返回3篇相关文章
-                    break
-        
+        return _encoded_response(_related_body(snapshot, current_article))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/search')
+def search_news():
+    """全文检索API：?q=关键词&limit=条数（BM25 排序）"""
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({
+            'success': False,
+            'error': '缺少查询参数 q'
+        }), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    try:
+        if not current_articles:
+            bocha_service.ensure_articles()
+        snapshot = current_snapshot
+        results = []
+        for aid, score in search_index.search(query, limit):
+            article = snapshot.by_id.get(aid)
+            if article:
+                results.append({**article, 'score': round(score, 4)})
         return jsonify({
             'success': True,
-            'data': related_articles
+            'query': query,
+            'data': results,
+            'count': len(results)
         })
     except Exception as e:
         return jsonify({
@@ -588,6 +1846,70 @@ def get_related_articles(article_id):
             'error': str(e)
         }), 500
 
+def _stream_json_array(head, items, tail='}'):
+    """流式输出 JSON：head + [原始 JSON 字节, ...] + tail，不在内存中拼出整个响应"""
+    yield head.encode('utf-8') + b'['
+    first = True
+    for item in items:
+        yield item if first else b',' + item
+        first = False
+    yield b']' + tail.encode('utf-8')
+
+@app.route('/api/archive')
+def archive_days():
+    """历史归档：不带参数时列出已有日期；?start=YYYY-MM-DD&end=YYYY-MM-DD 时流式返回区间内的文章"""
+    if article_archive is None:
+        return jsonify({
+            'success': False,
+            'error': '文章归档未启用'
+        }), 503
+    if 'start' not in request.args and 'end' not in request.args:
+        return jsonify({
+            'success': True,
+            'data': article_archive.days()
+        })
+    start = parse_day(request.args.get('start'))
+    end = parse_day(request.args.get('end') or request.args.get('start'))
+    if start is None or end is None or start > end:
+        return jsonify({
+            'success': False,
+            'error': '日期格式应为 YYYY-MM-DD，且 start 不晚于 end'
+        }), 400
+    head = json.dumps({'success': True, 'start': start.isoformat(), 'end': end.isoformat()})[:-1] + ',"data":'
+    items = article_archive.iter_range(start.isoformat(), end.isoformat())
+    return Response(_stream_json_array(head, items), mimetype='application/json')
+
+@app.route('/api/archive/<day>')
+def archive_day(day):
+    """某一天的历史文章（流式输出，支持 ?offset=&limit= 分页）"""
+    if article_archive is None:
+        return jsonify({
+            'success': False,
+            'error': '文章归档未启用'
+        }), 503
+    if parse_day(day) is None:
+        return jsonify({
+            'success': False,
+            'error': '日期格式应为 YYYY-MM-DD'
+        }), 400
+    total = len(article_archive.index(day))
+    if not total:
+        return jsonify({
+            'success': False,
+            'error': '该日期没有归档'
+        }), 404
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'offset / limit 必须为整数'
+        }), 400
+    head = json.dumps({'success': True, 'date': day, 'total': total, 'offset': offset})[:-1] + ',"data":'
+    items = article_archive.iter_day(day, offset=offset, limit=limit)
+    return Response(_stream_json_array(head, items), mimetype='application/json')
+
 @app.errorhandler(404)
 def not_found(error):
     """404错误处理"""
@@ -595,29 +1917,64 @@ def not_found(error):
 
 @app.route('/api/stream')
 def stream():
-    """服务端事件流（SSE）：后端刷新后立即通知前端。"""
-    def event_stream():
-        q = Queue(maxsize=10)
-        _sse_listeners.add(q)
+    """服务端事件流（SSE）：后端刷新后立即通知前端。
+
+    支持 Last-Event-ID（请求头，或 EventSource 手动重连时的 ?last_event_id=）补发错过的事件。
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
         # 连接建立时发送一次心跳
-        yield f"data: {json.dumps({'type':'heartbeat','ts': bocha_service._now_str()})}\n\n"
-        try:
-            while True:
-                msg = q.get()
-                yield f"data: {json.dumps(msg)}\n\n"
-        except GeneratorExit:
-            pass
-        finally:
-            try:
-                _sse_listeners.discard(q)
-            except Exception:
-                pass
+        events = sse_hub.stream(last_event_id, hello={'type': 'heartbeat', 'ts': bocha_service._now_str()})
+    except HubFull:
+        return jsonify({'success': False, 'error': '连接数已达上限'}), 503
     headers = {
         'Cache-Control': 'no-cache',
         'Connection': 'keep-alive',
         'X-Accel-Buffering': 'no'
     }
-    return Response(event_stream(), mimetype='text/event-stream', headers=headers)
+    return Response(events, mimetype='text/event-stream', headers=headers)
+
+def _static_export_files(snapshot):
+    """静态导出的全部文件：(相对路径, EncodedBody)，与在线接口共用同一份预编码响应体"""
+    yield 'index.html', _index_page(snapshot)
+    yield 'api/news.json', snapshot.list_body
+    # 卡片列表：每个分类从第一页起沿 next_cursor 导出整条翻页链
+    for category in (NEWS_CARDS_ALL,) + CATEGORIES:
+        page = NEWS_CARDS_FIRST
+        while page:
+            body = _news_cards_body(snapshot, category, page)
+            yield f'api/news/{category}/{page}.json', body
+            page = json.loads(body.raw)['next_cursor']
+    for article in snapshot.articles:
+        aid = article['id']
+        yield f'article/{aid}/index.html', _article_page(snapshot, article)
+        yield f'api/article/{aid}.json', _article_body(snapshot, article)
+        yield f'api/related-articles/{aid}.json', _related_body(snapshot, article)
+
+def run_static_export(out_root=None):
+    """把当前快照导出为静态站点并原子切换 current，返回统计信息"""
+    out_root = out_root or STATIC_EXPORT_DIR
+    snapshot = current_snapshot
+    now = time.time()
+    version = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}{int(now * 1000) % 1000:03d}-g{snapshot.generation}"
+    with app.test_request_context('/'):
+        return export_site(
+            out_root,
+            _static_export_files(snapshot),
+            version,
+            static_dir=app.static_folder,
+            keep=STATIC_EXPORT_KEEP,
+        )
+
+@app.cli.command('static-export')
+@click.option('--out', 'out_root', default=None, help='导出目录（默认 STATIC_EXPORT_DIR 或 ./dist）')
+def static_export_command(out_root):
+    """把最近一次快照导出为静态站点"""
+    if not current_articles:
+        click.echo('没有可导出的文章（本地快照为空），请先运行一次刷新')
+        raise SystemExit(1)
+    stats = run_static_export(out_root or STATIC_EXPORT_DIR or 'dist')
+    click.echo(f"已导出 {stats['files']} 个文件到 {stats['path']}（{stats['seconds']}s）")
 
 if __name__ == '__main__':
     # 启动后台刷新任务
@@ -0,0 +1,138 @@
+"""文章历史归档：按天分区的 JSONL 文件 + 每天一份紧凑索引
+
+目录结构（NEWS_DATA_DIR/archive/）：
+- YYYY-MM-DD.jsonl  当天首次出现的文章，每行一篇（UTF-8 JSON）
+- YYYY-MM-DD.idx    每行 "文章ID<TAB>字节偏移<TAB>字节长度"，与 jsonl 一一对应
+
+- 每篇文章按 created_at 的日期归档一次（同一 ID 不会重复写入）
+- 先写数据行、再写索引行：异常中断时最多留下一行未被索引的数据，读取以索引为准
+- 读取时按索引偏移定位后逐行读出原始字节，不解析、不整体加载，浏览长时间段的历史也只占用常数内存
+"""
+import json
+import os
+import re
+import threading
+from datetime import date
+
+_DAY_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def parse_day(value):
+    """校验并解析 'YYYY-MM-DD'，非法时返回 None"""
+    if not value or not _DAY_RE.match(value):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class ArticleArchive:
+    def __init__(self, root, seen_days=3):
+        self.root = root
+        self.seen_days = max(1, seen_days)
+        self._lock = threading.Lock()
+        # 最近几天已归档的文章ID（写入去重用），按需从索引文件加载
+        self._seen = {}
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, day, ext):
+        return os.path.join(self.root, f"{day}.{ext}")
+
+    def _seen_ids(self, day):
+        ids = self._seen.get(day)
+        if ids is None:
+            ids = {entry[0] for entry in self.index(day)}
+            self._seen[day] = ids
+            for stale in sorted(self._seen)[:-self.seen_days]:
+                del self._seen[stale]
+        return ids
+
+    def append(self, articles, fallback_day=None):
+        """归档尚未写入过的文章，返回新写入的篇数"""
+        by_day = {}
+        for article in articles:
+            aid = article.get('id')
+            if not aid:
+                continue
+            day = (article.get('created_at') or '')[:10]
+            if not parse_day(day):
+                day = fallback_day or date.today().isoformat()
+            by_day.setdefault(day, []).append(article)
+        written = 0
+        with self._lock:
+            for day, items in sorted(by_day.items()):
+                seen = self._seen_ids(day)
+                fresh = [a for a in items if a['id'] not in seen]
+                if not fresh:
+                    continue
+                with open(self._path(day, 'jsonl'), 'ab') as data, open(self._path(day, 'idx'), 'a', encoding='utf-8') as idx:
+                    offset = data.seek(0, os.SEEK_END)
+                    entries = []
+                    for article in fresh:
+                        line = json.dumps(article, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                        data.write(line + b'\n')
+                        entries.append(f"{article['id']}\t{offset}\t{len(line)}\n")
+                        offset += len(line) + 1
+                        seen.add(article['id'])
+                    data.flush()
+                    idx.writelines(entries)
+                written += len(fresh)
+        return written
+
+    def index(self, day):
+        """读取某天的索引，返回 [(文章ID, 偏移, 长度), ...]；没有归档时返回 []"""
+        entries = []
+        try:
+            with open(self._path(day, 'idx'), encoding='utf-8') as idx:
+                for line in idx:
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) == 3 and parts[1].isdigit() and parts[2].isdigit():
+                        entries.append((parts[0], int(parts[1]), int(parts[2])))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _day_names(self):
+        return sorted(
+            day for day, _, ext in (name.partition('.') for name in os.listdir(self.root))
+            if ext == 'idx' and parse_day(day)
+        )
+
+    def days(self):
+        """已有归档的日期列表（升序），附带文章数与数据文件大小"""
+        result = []
+        for day in self._day_names():
+            with open(self._path(day, 'idx'), 'rb') as idx:
+                count = sum(1 for _ in idx)
+            try:
+                size = os.path.getsize(self._path(day, 'jsonl'))
+            except OSError:
+                size = 0
+            result.append({'date': day, 'count': count, 'bytes': size})
+        return result
+
+    def iter_day(self, day, offset=0, limit=None):
+        """按归档顺序逐篇产出某天文章的原始 JSON 字节（不含换行）"""
+        entries = self.index(day)[max(0, offset):]
+        if limit is not None:
+            entries = entries[:max(0, limit)]
+        if not entries:
+            return
+        with open(self._path(day, 'jsonl'), 'rb') as data:
+            data.seek(entries[0][1])
+            position = entries[0][1]
+            for _, start, length in entries:
+                if start != position:
+                    data.seek(start)
+                # 连同换行符一起读出，下一条通常紧随其后，无需再 seek
+                line = data.read(length + 1)[:length]
+                position = start + length + 1
+                if len(line) == length:
+                    yield line
+
+    def iter_range(self, start, end):
+        """按日期升序逐篇产出 [start, end] 区间内的文章原始字节（start / end 为 'YYYY-MM-DD'）"""
+        for day in self._day_names():
+            if start <= day <= end:
+                yield from self.iter_day(day)
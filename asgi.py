@@ -0,0 +1,335 @@
+"""ASGI 入口：/api/news（含 /api/news/<分类>/<页>.json）、/api/article/<id>、/api/stream 在事件循环中直接处理
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --timeout-graceful-shutdown 5
+    gunicorn -k uvicorn.workers.UvicornWorker -w 1 asgi:application
+
+- 这些热点接口直接读取 app 模块的当前快照（预编码的 JSON、ETag 与压缩体），与 Flask 路由共用
+  _cache_headers / _choose_encoding / _news_page_body，响应头、条件请求与分页参数完全一致；不经过 Flask，不占线程
+- SSE 连接使用 SSEHub.astream()：空闲连接只占一个协程与一个断开监听任务，单进程可挂上万个连接；
+  客户端断开时立即取消订阅并释放名额
+- 其它路由（首页、详情页、刷新任务、检索、归档、/metrics 等）通过内置的 WSGI 适配器交给 Flask 应用，
+  在 ASGI_WSGI_THREADS（默认 8）个线程中执行
+- lifespan 启动时调用 start_background_refresh()，与 gunicorn.conf.py 的 post_worker_init 一致
+- 不依赖 asgiref 等额外包；ASGI 服务器（uvicorn / hypercorn）需另行安装
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+import app as news_app
+from news_snapshot import InvalidCursor
+from sse_hub import HubFull
+
+ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '8') or 8)
+
+_executor = ThreadPoolExecutor(max_workers=max(1, ASGI_WSGI_THREADS), thread_name_prefix='asgi-wsgi')
+
+
+class _Request:
+    __slots__ = ('scope', 'method', 'path', 'headers', '_args')
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.method = scope['method']
+        self.path = scope['path']
+        headers = {}
+        for name, value in scope.get('headers') or ():
+            name, value = name.decode('latin-1').lower(), value.decode('latin-1')
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+        self.headers = headers
+        self._args = None
+
+    @property
+    def args(self):
+        if self._args is None:
+            query = (self.scope.get('query_string') or b'').decode('utf-8', 'replace')
+            self._args = MultiDict(parse_qsl(query, keep_blank_values=True))
+        return self._args
+
+
+# ==== 原生路由 ====
+def _json(status, payload):
+    # 与 jsonify 的输出一致（非调试模式下为紧凑格式）
+    data = (news_app.app.json.dumps(payload, separators=(',', ':')) + '\n').encode('utf-8')
+    return status, {'Content-Type': 'application/json'}, data
+
+
+def _encoded(request, body):
+    """与 app._encoded_response 相同的缓存头、If-None-Match（304）与 br/gzip 选择"""
+    headers = news_app._cache_headers()
+    headers['ETag'] = quote_etag(body.etag, weak=True)
+    if parse_etags(request.headers.get('if-none-match')).contains_weak(body.etag):
+        return 304, headers, b''
+    data, encoding = news_app._choose_encoding(body, parse_accept_header(request.headers.get('accept-encoding')))
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    headers['Content-Type'] = 'application/json'
+    return 200, headers, data
+
+
+async def _get_news(request):
+    try:
+        if not news_app.current_articles:
+            # 本进程还没有文章：读共享快照或等待刷新可能阻塞，放到线程池中执行
+            await asyncio.get_running_loop().run_in_executor(_executor, news_app.bocha_service.ensure_articles)
+        snapshot = news_app.current_snapshot
+        if not any(name in request.args for name in news_app._NEWS_QUERY_PARAMS):
+            return _encoded(request, snapshot.list_body)
+        try:
+            body = news_app._news_page_body(snapshot, request.args)
+        except InvalidCursor:
+            return _json(400, {'success': False, 'error': '无效的分页游标'})
+        return _encoded(request, body)
+    except Exception as e:
+        return _json(500, {'success': False, 'error': str(e)})
+
+
+async def _get_news_cards(request, category, page):
+    try:
+        if not news_app.current_articles:
+            await asyncio.get_running_loop().run_in_executor(_executor, news_app.bocha_service.ensure_articles)
+        try:
+            body = news_app._news_cards_body(news_app.current_snapshot, category, page)
+        except InvalidCursor:
+            return _json(400, {'success': False, 'error': '无效的分页游标'})
+        return _encoded(request, body)
+    except Exception as e:
+        return _json(500, {'success': False, 'error': str(e)})
+
+
+async def _get_article(request, article_id):
+    try:
+        snapshot = news_app.current_snapshot
+        article = snapshot.by_id.get(article_id)
+        if not article:
+            return _json(404, {'success': False, 'error': '文章不存在'})
+        return _encoded(request, news_app._article_body(snapshot, article))
+    except Exception as e:
+        return _json(500, {'success': False, 'error': str(e)})
+
+
+def _route(request):
+    """返回 (路由模板, 处理函数, 参数)；不是原生处理的请求返回 None"""
+    method, path = request.method, request.path
+    if method not in ('GET', 'HEAD'):
+        return None
+    if path == '/api/news':
+        return '/api/news', _get_news, ()
+    if path.startswith('/api/news/') and path.endswith('.json'):
+        parts = path[len('/api/news/'):-len('.json')].split('/')
+        if len(parts) == 2 and all(parts):
+            return '/api/news/<category>/<page>.json', _get_news_cards, tuple(parts)
+        return None
+    if path.startswith('/api/article/'):
+        article_id = path[len('/api/article/'):]
+        if article_id and '/' not in article_id:
+            return '/api/article/<article_id>', _get_article, (article_id,)
+        return None
+    if path == '/api/stream' and method == 'GET':
+        return '/api/stream', None, ()
+    return None
+
+
+async def _start(send, request, route, started, status, headers):
+    """发送响应头（补上 CORS 头，与 flask_cors 默认配置一致）并记录请求指标"""
+    origin = request.headers.get('origin')
+    if origin:
+        headers['Access-Control-Allow-Origin'] = origin
+        headers['Vary'] = f"{headers['Vary']}, Origin" if 'Vary' in headers else 'Origin'
+    else:
+        headers['Access-Control-Allow-Origin'] = '*'
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in headers.items()],
+    })
+    if news_app.METRICS_ENABLED:
+        news_app.HTTP_SECONDS.observe(time.perf_counter() - started, route, request.method)
+        news_app.HTTP_REQUESTS.inc(1, route, request.method, status)
+
+
+async def _respond(send, request, route, started, status, headers, data):
+    if status != 304:
+        headers['Content-Length'] = len(data)
+    await _start(send, request, route, started, status, headers)
+    await send({'type': 'http.response.body', 'body': b'' if request.method == 'HEAD' else data})
+
+
+# ==== SSE ====
+async def _wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def _pump(events, send):
+    async for frame in events:
+        await send({'type': 'http.response.body', 'body': frame.encode('utf-8'), 'more_body': True})
+    # 订阅被 hub 结束（消费过慢收到 resync）
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _stream(request, receive, send, started):
+    last_event_id = request.headers.get('last-event-id') or request.args.get('last_event_id')
+    try:
+        # 连接建立时发送一次心跳
+        events = await news_app.sse_hub.astream(last_event_id, hello={
+            'type': 'heartbeat', 'ts': news_app.bocha_service._now_str()})
+    except HubFull:
+        status, headers, data = _json(503, {'success': False, 'error': '连接数已达上限'})
+        await _respond(send, request, '/api/stream', started, status, headers, data)
+        return
+    headers = {
+        'Content-Type': 'text/event-stream; charset=utf-8',
+        'Cache-Control': 'no-cache',
+        'Connection': 'keep-alive',
+        'X-Accel-Buffering': 'no',
+    }
+    await _start(send, request, '/api/stream', started, 200, headers)
+    pump = asyncio.ensure_future(_pump(events, send))
+    disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await asyncio.wait((pump, disconnect), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (pump, disconnect):
+            task.cancel()
+        await asyncio.gather(pump, disconnect, return_exceptions=True)
+        await events.aclose()
+
+
+# ==== 其它路由：交给 Flask ====
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def _environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': (scope.get('query_string') or b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers') or ():
+        key = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _run_wsgi(environ, send, loop):
+    """在线程池中执行 Flask 应用，响应按块经事件循环发出"""
+    def emit(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    state = {'start': None, 'sent': False}
+
+    def write(data):
+        if not state['sent']:
+            emit(state['start'])
+            state['sent'] = True
+        if data:
+            emit({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and state['sent']:
+            raise exc_info[1].with_traceback(exc_info[2])
+        state['start'] = {
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+        }
+        return write
+
+    result = news_app.app(environ, start_response)
+    try:
+        for chunk in result:
+            if chunk:
+                write(chunk)
+        write(b'')
+        emit({'type': 'http.response.body', 'body': b''})
+    finally:
+        close = getattr(result, 'close', None)
+        if close is not None:
+            close()
+
+
+async def _wsgi(scope, receive, send):
+    body = await _read_body(receive)
+    if body is None:
+        return
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_executor, _run_wsgi, _environ(scope, body), send, loop)
+
+
+# ==== 入口 ====
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                news_app.bocha_service.start_background_refresh()
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            _executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        # 不提供 WebSocket
+        await send({'type': 'websocket.close'})
+        return
+    request = _Request(scope)
+    matched = _route(request)
+    if matched is None:
+        await _wsgi(scope, receive, send)
+        return
+    started = time.perf_counter()
+    route, handler, params = matched
+    if handler is None:
+        await _stream(request, receive, send, started)
+        return
+    status, headers, data = await handler(request, *params)
+    await _respond(send, request, route, started, status, headers, data)
@@ -0,0 +1,385 @@
+"""整站基准：离线替身上游下的刷新耗时、解析吞吐、/api/news 并发与 SSE 扇出延迟
+
+    python benchmarks/bench_app.py [--fixture recorded.json] [--only refresh,parser,api,sse] [--out result.json]
+
+- refresh：本地博查替身（HTTP）+ 火山引擎替身，完整跑 get_ai_news（首轮为冷备忘录，之后为热备忘录），
+  记录总耗时与首个分块发布耗时
+- parser：parse_volcengine_batch_response 处理大段合成输出（含一定比例缺少原始序号、需按标题匹配的块）
+- api：本进程内的多线程 WSGI 服务 + 并发客户端，统计 RPS 与延迟分位数（客户端与服务端共享 GIL，
+  数值用于前后对比，不代表多 worker 部署的绝对吞吐）
+- sse：SSEHub 上挂 N 个订阅者（线程生成器 / asyncio 生成器），发布带时间戳的事件，统计送达延迟
+
+结果以 JSON 输出到 stdout（以及 --out 指定的文件），便于按提交追踪回归。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upstream_stubs import FakeArkClient, StubBochaServer, load_fixture, synthetic_fixture  # noqa: E402
+
+
+def _percentiles(samples, points=(50, 95, 99)):
+    if not samples:
+        return {f'p{p}_ms': None for p in points}
+    ordered = sorted(samples)
+    result = {}
+    for p in points:
+        index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+        result[f'p{p}_ms'] = round(ordered[index] * 1000, 3)
+    result['max_ms'] = round(ordered[-1] * 1000, 3)
+    return result
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+# ==== 刷新 ====
+def bench_refresh(app_module, stub, fake, runs):
+    service = app_module.bocha_service
+    original_install = service.install_articles
+    results = []
+    for run in range(runs):
+        first_partial = []
+        started = time.perf_counter()
+
+        def install(news_data, final=False):
+            if not final and not first_partial:
+                first_partial.append(time.perf_counter() - started)
+            return original_install(news_data, final=final)
+
+        service.install_articles = install
+        bocha_before, llm_before = stub.requests, fake.calls
+        try:
+            articles = service.get_ai_news(force_refresh=True)
+        finally:
+            del service.install_articles
+        elapsed = time.perf_counter() - started
+        ingest = service.last_ingest_stats or {}
+        results.append({
+            'run': run + 1,
+            'memo': 'cold' if run == 0 else 'warm',
+            'seconds': round(elapsed, 4),
+            'first_partial_seconds': round(first_partial[0], 4) if first_partial else None,
+            'articles': len(articles),
+            'unique_pages': ingest.get('unique_pages'),
+            'pages_after_dedup': (ingest.get('dedup') or {}).get('output'),
+            'bocha_requests': stub.requests - bocha_before,
+            'llm_calls': fake.calls - llm_before,
+        })
+    return results
+
+
+# ==== 解析 ====
+def _parser_corpus(size, fallback_ratio, seed):
+    rng = random.Random(seed)
+    webpages = [{
+        'name': f"第{i}条 AI 新闻原始标题 {rng.getrandbits(32):x}",
+        'url': f"https://news.example.com/{i}",
+        'siteName': 'example',
+        'summary': '摘要' * 40,
+    } for i in range(size)]
+    blocks = []
+    for i, page in enumerate(webpages):
+        summary = '。'.join('大模型推理成本持续下降' for _ in range(rng.randint(3, 8)))
+        if rng.random() < fallback_ratio:
+            # 缺少原始序号，标题取原文标题的一部分，走按标题模糊匹配的路径
+            blocks.append(f"标题：{page['name'][:12]}\n摘要：{summary}\n分类：行业动态")
+        else:
+            blocks.append(f"原始序号：{i + 1}\n标题：AI新闻标题{i}\n摘要：{summary}\n分类：[技术突破]")
+    return webpages, '\n\n'.join(blocks)
+
+
+def bench_parser(app_module, sizes, fallback_ratio, seed, repeat=3):
+    service = app_module.bocha_service
+    results = []
+    for size in sizes:
+        webpages, text = _parser_corpus(size, fallback_ratio, seed)
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            items = service.parse_volcengine_batch_response(text, webpages)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        size_mb = len(text.encode('utf-8')) / 1e6
+        results.append({
+            'blocks': size,
+            'fallback_ratio': fallback_ratio,
+            'input_mb': round(size_mb, 3),
+            'items': len(items),
+            'seconds': round(best, 5),
+            'blocks_per_second': round(size / best) if best else None,
+            'mb_per_second': round(size_mb / best, 2) if best else None,
+        })
+    return results
+
+
+# ==== /api/news ====
+def _load(url, concurrency, duration, headers=None):
+    import requests
+    latencies = [[] for _ in range(concurrency)]
+    statuses = {}
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    barrier = threading.Barrier(concurrency)
+
+    def worker(slot):
+        session = requests.Session()
+        barrier.wait()
+        samples = latencies[slot]
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = session.get(url, headers=headers, timeout=10)
+                response.content
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            samples.append(time.perf_counter() - started)
+            with lock:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    samples = [s for slot in latencies for s in slot]
+    return dict({
+        'requests': len(samples),
+        'rps': round(len(samples) / elapsed, 1) if elapsed else None,
+        'errors': errors[0],
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+    }, **_percentiles(samples))
+
+
+def bench_api(app_module, concurrency_levels, duration):
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        import requests
+        etag = requests.get(f"{base}/api/news").headers.get('ETag')
+        category = next((a.get('category') for a in app_module.current_articles if a.get('category')), '技术突破')
+        cases = [
+            ('full', '/api/news', {'Accept-Encoding': 'gzip'}),
+            ('not_modified', '/api/news', {'If-None-Match': etag or '', 'Accept-Encoding': 'gzip'}),
+            ('page', f'/api/news?limit=20&category={category}&fields=id,title,summary', {'Accept-Encoding': 'gzip'}),
+        ]
+        results = []
+        for concurrency in concurrency_levels:
+            for name, path, headers in cases:
+                result = _load(base + path, concurrency, duration, headers)
+                results.append(dict({'case': name, 'path': path, 'concurrency': concurrency}, **result))
+        return results
+    finally:
+        server.shutdown()
+
+
+# ==== SSE 扇出 ====
+def _event_times(frame):
+    """从一段 SSE 文本中取出 bench 事件的发送时间戳"""
+    for line in frame.split('\n'):
+        if line.startswith('data: ') and '"bench"' in line:
+            yield json.loads(line[6:])['sent']
+
+
+def _publish_events(hub, events, interval):
+    for n in range(events):
+        hub.publish('bench', {'bench': n, 'sent': time.perf_counter()})
+        time.sleep(interval)
+
+
+def _wait_clients(hub, listeners, timeout=30):
+    deadline = time.monotonic() + timeout
+    while hub.clients < listeners and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return hub.clients
+
+
+def _sse_result(mode, listeners, events, connected, delays, per_event_max, elapsed):
+    flat = [d for ds in delays for d in ds]
+    return dict({
+        'mode': mode,
+        'listeners': listeners,
+        'connected': connected,
+        'events': events,
+        'deliveries': len(flat),
+        'expected_deliveries': listeners * events,
+        'seconds': round(elapsed, 4),
+        'fanout_complete_ms_avg': round(sum(per_event_max) / len(per_event_max) * 1000, 3) if per_event_max else None,
+    }, **_percentiles(flat))
+
+
+def _per_event_max(delays, events):
+    worst = [0.0] * events
+    for listener in delays:
+        for n, delay in enumerate(listener[:events]):
+            worst[n] = max(worst[n], delay)
+    return worst
+
+
+def bench_sse_threads(listeners, events, interval):
+    from sse_hub import SSEHub
+    hub = SSEHub(buffer_size=max(100, events * 2), keepalive_seconds=5, max_clients=listeners)
+    delays = [[] for _ in range(listeners)]
+
+    def listen(slot):
+        stream = hub.stream()
+        for frame in stream:
+            now = time.perf_counter()
+            delays[slot].extend(now - sent for sent in _event_times(frame))
+            if len(delays[slot]) >= events:
+                stream.close()
+                return
+
+    threads = [threading.Thread(target=listen, args=(slot,), daemon=True) for slot in range(listeners)]
+    for thread in threads:
+        thread.start()
+    connected = _wait_clients(hub, listeners)
+    started = time.perf_counter()
+    _publish_events(hub, events, interval)
+    for thread in threads:
+        thread.join(timeout=30)
+    elapsed = time.perf_counter() - started
+    return _sse_result('thread', listeners, events, connected, delays, _per_event_max(delays, events), elapsed)
+
+
+def bench_sse_async(listeners, events, interval):
+    from sse_hub import SSEHub
+    hub = SSEHub(buffer_size=max(100, events * 2), keepalive_seconds=5, max_clients=listeners)
+    delays = [[] for _ in range(listeners)]
+
+    async def listen(slot):
+        stream = await hub.astream()
+        try:
+            async for frame in stream:
+                now = time.perf_counter()
+                delays[slot].extend(now - sent for sent in _event_times(frame))
+                if len(delays[slot]) >= events:
+                    return
+        finally:
+            await stream.aclose()
+
+    async def main():
+        tasks = [asyncio.ensure_future(listen(slot)) for slot in range(listeners)]
+        connected = await asyncio.get_running_loop().run_in_executor(None, _wait_clients, hub, listeners)
+        started = time.perf_counter()
+        publisher = threading.Thread(target=_publish_events, args=(hub, events, interval))
+        publisher.start()
+        await asyncio.wait(tasks, timeout=30)
+        publisher.join()
+        return connected, time.perf_counter() - started
+
+    connected, elapsed = asyncio.run(main())
+    return _sse_result('async', listeners, events, connected, delays, _per_event_max(delays, events), elapsed)
+
+
+# ==== 入口 ====
+def _prepare_app(args, fixture, stub):
+    """在导入 app 之前设置环境变量：上游指向替身、数据目录用临时目录、关闭限速与节流"""
+    data_dir = tempfile.mkdtemp(prefix='ai-news-bench-')
+    os.environ.update({
+        'BOCHA_API_KEY': 'bench',
+        'BOCHA_API_URL': stub.url,
+        'BOCHA_RATE_PER_SECOND': '0',
+        'NEWS_DATA_DIR': data_dir,
+        'NEWS_REFRESH_MIN_INTERVAL_SECONDS': '0',
+        'STATIC_EXPORT_DIR': '',
+        'LOG_LEVEL': os.getenv('BENCH_LOG_LEVEL', 'WARNING'),
+    })
+    os.environ.setdefault('VOLCENGINE_ENDPOINT_ID', 'bench')
+    import app as app_module
+    fake = FakeArkClient(fixture, latency=args.llm_latency, chars_per_second=args.llm_chars_per_second)
+    app_module.client = fake
+    return app_module, fake, data_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixture', help='录制的夹具文件（默认按默认抓取计划合成）')
+    parser.add_argument('--pages', type=int, default=400, help='合成夹具的网页数')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--only', default='refresh,parser,api,sse')
+    parser.add_argument('--out', help='同时把结果写入该文件')
+    parser.add_argument('--bocha-latency', type=float, default=0.3, help='博查替身每次响应前的等待（秒）')
+    parser.add_argument('--bocha-jitter', type=float, default=0.2)
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='火山引擎替身首 token 前的等待（秒）')
+    parser.add_argument('--llm-chars-per-second', type=float, default=2000, help='火山引擎替身输出速度，0 为瞬时')
+    parser.add_argument('--refresh-runs', type=int, default=2)
+    parser.add_argument('--parser-sizes', default='1000,5000')
+    parser.add_argument('--parser-fallback-ratio', type=float, default=0.05)
+    parser.add_argument('--api-concurrency', default='1,16,64')
+    parser.add_argument('--api-duration', type=float, default=3.0)
+    parser.add_argument('--sse-listeners', type=int, default=1000)
+    parser.add_argument('--sse-events', type=int, default=20)
+    parser.add_argument('--sse-interval', type=float, default=0.05)
+    parser.add_argument('--sse-modes', default='thread,async')
+    args = parser.parse_args()
+    sections = set(args.only.split(','))
+
+    fixture = load_fixture(args.fixture) if args.fixture else synthetic_fixture(args.pages, args.seed)
+    stub = StubBochaServer(fixture, latency=args.bocha_latency, jitter=args.bocha_jitter).start()
+    app_module, fake, data_dir = _prepare_app(args, fixture, stub)
+
+    results = {}
+    try:
+        if 'refresh' in sections or 'api' in sections:
+            results['refresh'] = bench_refresh(app_module, stub, fake, max(1, args.refresh_runs))
+        if 'parser' in sections:
+            results['parser'] = bench_parser(app_module, [int(n) for n in args.parser_sizes.split(',')],
+                                             args.parser_fallback_ratio, args.seed)
+        if 'api' in sections:
+            results['api'] = bench_api(app_module, [int(n) for n in args.api_concurrency.split(',')],
+                                       args.api_duration)
+        if 'sse' in sections:
+            runners = {'thread': bench_sse_threads, 'async': bench_sse_async}
+            results['sse'] = [
+                runners[mode](args.sse_listeners, args.sse_events, args.sse_interval)
+                for mode in args.sse_modes.split(',') if mode in runners
+            ]
+    finally:
+        stub.stop()
+
+    report = {
+        'benchmark': 'app',
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'fixture': args.fixture or f"synthetic:{args.pages}:{args.seed}",
+            'data_dir': data_dir,
+            'args': {k: v for k, v in vars(args).items() if k not in ('out',)},
+        },
+        'results': results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
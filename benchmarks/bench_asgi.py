@@ -0,0 +1,340 @@
+"""ASGI 入口（asgi.py）的 SSE 承载测试：单进程挂 N 个并发 SSE 连接
+
+    python benchmarks/bench_asgi.py [--listeners 10000] [--events 10] [--out result.json]
+    python benchmarks/bench_asgi.py --url http://127.0.0.1:5000 --listeners 10000 --hold 30
+
+- 默认（进程内）：直接以 ASGI 协议调用 asgi.application，不经过网络与 ASGI 服务器，测的是应用本身：
+  N 个连接全部建立后由后台线程（与刷新线程相同的位置）发布带时间戳的事件，统计送达延迟分位数；
+  在这 N 个连接挂着时、以及扇出进行中请求 /api/news，统计延迟（每个请求作为新任务排队，包含等待事件循环的时间）；
+  最后全部断开，检查订阅名额是否都已释放，并记录每个连接的内存开销
+- --url：对已启动的 ASGI 服务（uvicorn asgi:application）建立 N 个真实 TCP 连接，统计收到首个心跳的连接数、
+  --hold 秒后仍保持的连接数与此时 /api/news 的延迟（需要足够的文件描述符上限；服务端的 SSE_MAX_CLIENTS 需不小于 N）
+
+有连接未建立、未保持或断开后名额未释放时以非零状态退出。结果以 JSON 输出。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_app import _event_times, _git_revision, _percentiles, _per_event_max, _publish_events  # noqa: E402
+from upstream_stubs import FakeArkClient, StubBochaServer, synthetic_fixture  # noqa: E402
+
+
+def _rss_mb():
+    """当前常驻内存（Linux 读 /proc，其它平台退回峰值）"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def _raise_nofile(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed and (hard == resource.RLIM_INFINITY or hard > soft):
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+# ==== 进程内 ====
+def _prepare_app(args):
+    """在导入 app 之前设置环境变量：上游指向替身、连接上限放宽到 N 之上，然后完成一次刷新"""
+    fixture = synthetic_fixture(args.pages, args.seed)
+    stub = StubBochaServer(fixture, latency=0, jitter=0).start()
+    os.environ.update({
+        'BOCHA_API_KEY': 'bench',
+        'BOCHA_API_URL': stub.url,
+        'BOCHA_RATE_PER_SECOND': '0',
+        'NEWS_DATA_DIR': tempfile.mkdtemp(prefix='ai-news-bench-'),
+        'NEWS_REFRESH_MIN_INTERVAL_SECONDS': '0',
+        'STATIC_EXPORT_DIR': '',
+        'SSE_MAX_CLIENTS': str(args.listeners + 100),
+        'SSE_BUFFER_SIZE': str(max(1000, args.events * 2)),
+        'LOG_LEVEL': os.getenv('BENCH_LOG_LEVEL', 'WARNING'),
+    })
+    os.environ.setdefault('VOLCENGINE_ENDPOINT_ID', 'bench')
+    import app as app_module
+    import asgi
+    app_module.client = FakeArkClient(fixture, latency=0, chars_per_second=0)
+    try:
+        app_module.bocha_service.get_ai_news(force_refresh=True)
+    finally:
+        stub.stop()
+    return app_module, asgi
+
+
+def _scope(path, query=b'', headers=()):
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+        'method': 'GET', 'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': query,
+        'headers': list(headers), 'server': ('127.0.0.1', 5000), 'client': ('127.0.0.1', 0),
+    }
+
+
+async def _request(application, path, query=b''):
+    """进程内发起一次普通请求，返回 (状态码, 字节数)"""
+    received = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    status, size = [], 0
+
+    async def receive():
+        if received:
+            return received.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal size
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        else:
+            size += len(message.get('body', b''))
+
+    await application(_scope(path, query), receive, send)
+    return status[0], size
+
+
+async def _sse_client(application, slot, events, delays, statuses, disconnect):
+    async def receive():
+        await disconnect[slot]
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses[slot] = message['status']
+            return
+        now = time.perf_counter()
+        delays[slot].extend(now - sent for sent in _event_times(message.get('body', b'').decode('utf-8')))
+        if len(delays[slot]) >= events and not disconnect[slot].done():
+            disconnect[slot].set_result(None)
+
+    await application(_scope('/api/stream', headers=[(b'accept', b'text/event-stream')]), receive, send)
+
+
+async def _api_latency(application, requests, pause=0.0):
+    samples, statuses = [], {}
+    for _ in range(requests):
+        started = time.perf_counter()
+        # 作为新任务提交：计时包含在事件循环中排队的时间
+        status, _ = await asyncio.ensure_future(_request(application, '/api/news'))
+        samples.append(time.perf_counter() - started)
+        statuses[status] = statuses.get(status, 0) + 1
+        if pause:
+            await asyncio.sleep(pause)
+    return dict({'requests': requests, 'statuses': statuses}, **_percentiles(samples))
+
+
+async def _wait_for(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    return predicate()
+
+
+def bench_inprocess(args):
+    app_module, asgi = _prepare_app(args)
+    hub = app_module.sse_hub
+    listeners, events = args.listeners, args.events
+    delays = [[] for _ in range(listeners)]
+    statuses = [None] * listeners
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        disconnect = [loop.create_future() for _ in range(listeners)]
+        baseline = await _api_latency(asgi.application, args.api_requests)
+        rss_before = _rss_mb()
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(_sse_client(asgi.application, slot, events, delays, statuses, disconnect))
+                 for slot in range(listeners)]
+        await _wait_for(lambda: hub.clients >= listeners, args.timeout)
+        connect_seconds = time.perf_counter() - started
+        connected = hub.clients
+        rss_connected = _rss_mb()
+        under_load = await _api_latency(asgi.application, args.api_requests)
+
+        published = time.perf_counter()
+        publisher = threading.Thread(target=_publish_events, args=(hub, events, args.interval))
+        publisher.start()
+        during = asyncio.ensure_future(_api_latency(asgi.application, args.api_requests, args.interval / 4))
+        await asyncio.wait(tasks, timeout=args.timeout)
+        await loop.run_in_executor(None, publisher.join)
+        fanout_seconds = time.perf_counter() - published
+        during = await during
+
+        # 未收齐事件的连接也主动断开，然后检查订阅名额是否全部释放
+        for future in disconnect:
+            if not future.done():
+                future.set_result(None)
+        await asyncio.wait(tasks, timeout=args.timeout)
+        released = await _wait_for(lambda: hub.clients == 0, 5)
+        return {
+            'connect_seconds': round(connect_seconds, 3),
+            'connected': connected,
+            'status_200': sum(1 for status in statuses if status == 200),
+            'rss_mb_before': round(rss_before, 1),
+            'rss_mb_connected': round(rss_connected, 1),
+            'kb_per_connection': round((rss_connected - rss_before) * 1000 / max(1, connected), 2),
+            'fanout_seconds': round(fanout_seconds, 3),
+            'api_news_idle': baseline,
+            'api_news_with_listeners': under_load,
+            'api_news_during_fanout': during,
+            'clients_after_disconnect': hub.clients,
+            'released': released,
+            'unfinished_tasks': sum(1 for task in tasks if not task.done()),
+        }
+
+    result = asyncio.run(main())
+    flat = [d for ds in delays for d in ds]
+    per_event = _per_event_max(delays, events)
+    result.update({
+        'mode': 'inprocess',
+        'listeners': listeners,
+        'events': events,
+        'deliveries': len(flat),
+        'expected_deliveries': listeners * events,
+        'fanout_complete_ms_avg': round(sum(per_event) / len(per_event) * 1000, 3) if per_event else None,
+    })
+    result.update(_percentiles(flat))
+    result['ok'] = (result['connected'] >= listeners and result['deliveries'] == result['expected_deliveries']
+                    and result['released'] and not result['unfinished_tasks'])
+    return result
+
+
+# ==== 真实连接 ====
+async def _open_stream(host, port, netloc, timeout):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    writer.write(f"GET /api/stream HTTP/1.1\r\nHost: {netloc}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    status = (await asyncio.wait_for(reader.readline(), timeout)).split()
+    if len(status) < 2 or status[1] != b'200':
+        writer.close()
+        raise ConnectionError(b' '.join(status[1:]).decode() or 'no response')
+    received = b''
+    while b'"heartbeat"' not in received:
+        chunk = await asyncio.wait_for(reader.read(4096), timeout)
+        if not chunk:
+            raise ConnectionError('closed before heartbeat')
+        received = received[-64:] + chunk
+    return reader, writer
+
+
+async def _drain(reader):
+    """持续读取（keepalive 与事件），返回连接被关闭的时间"""
+    while await reader.read(4096):
+        pass
+    return time.monotonic()
+
+
+async def _http_get(host, port, netloc, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {netloc}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    status = (await reader.readline()).split()[1].decode()
+    while await reader.read(65536):
+        pass
+    writer.close()
+    return status
+
+
+def bench_url(args):
+    parts = urlsplit(args.url)
+    host, port = parts.hostname, parts.port or 80
+    nofile = _raise_nofile(args.listeners + 256)
+
+    async def main():
+        semaphore = asyncio.Semaphore(args.connect_concurrency)
+        errors = {}
+
+        async def open_one():
+            async with semaphore:
+                try:
+                    return await _open_stream(host, port, parts.netloc, args.timeout)
+                except (OSError, ConnectionError, asyncio.TimeoutError) as e:
+                    key = type(e).__name__ + (f": {e}" if isinstance(e, ConnectionError) else '')
+                    errors[key] = errors.get(key, 0) + 1
+                    return None
+
+        started = time.perf_counter()
+        streams = [s for s in await asyncio.gather(*(open_one() for _ in range(args.listeners))) if s]
+        connect_seconds = time.perf_counter() - started
+        drains = [asyncio.ensure_future(_drain(reader)) for reader, _ in streams]
+        await asyncio.sleep(args.hold)
+        held = sum(1 for task in drains if not task.done())
+
+        samples, statuses = [], {}
+        for _ in range(args.api_requests):
+            t0 = time.perf_counter()
+            status = await _http_get(host, port, parts.netloc, '/api/news')
+            samples.append(time.perf_counter() - t0)
+            statuses[status] = statuses.get(status, 0) + 1
+
+        for task in drains:
+            task.cancel()
+        for _, writer in streams:
+            writer.close()
+        return {
+            'mode': 'url',
+            'url': args.url,
+            'listeners': args.listeners,
+            'nofile_limit': nofile,
+            'connect_seconds': round(connect_seconds, 3),
+            'connected': len(streams),
+            'connect_errors': errors,
+            'hold_seconds': args.hold,
+            'held': held,
+            'api_news_with_listeners': dict({'requests': args.api_requests, 'statuses': statuses},
+                                            **_percentiles(samples)),
+            'ok': held >= args.listeners,
+        }
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--listeners', type=int, default=10000, help='并发 SSE 连接数')
+    parser.add_argument('--events', type=int, default=10, help='进程内模式发布的事件数')
+    parser.add_argument('--interval', type=float, default=0.2, help='事件发布间隔（秒）')
+    parser.add_argument('--api-requests', type=int, default=200, help='测 /api/news 延迟的请求数')
+    parser.add_argument('--pages', type=int, default=400, help='合成夹具的网页数（决定快照大小）')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--url', help='对已启动的 ASGI 服务建立真实连接（如 http://127.0.0.1:5000）')
+    parser.add_argument('--hold', type=float, default=30, help='--url 模式下连接保持的秒数')
+    parser.add_argument('--connect-concurrency', type=int, default=500, help='--url 模式下同时发起的连接数')
+    parser.add_argument('--out', help='同时把结果写入该文件')
+    args = parser.parse_args()
+
+    result = bench_url(args) if args.url else bench_inprocess(args)
+    report = {
+        'benchmark': 'asgi',
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': {k: v for k, v in vars(args).items() if k not in ('out',)},
+        },
+        'results': result,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+    if not result['ok']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""近重复检测基准：合成语料上的耗时与准确率
+
+    python benchmarks/bench_dedup.py [--sizes 1000,5000,10000] [--seed 7]
+
+每条合成新闻随机生成中英混排的标题与摘要，其中一部分被“转载”为 1~3 个变体
+（改写标题前缀、替换少量字词、截断结尾），据此统计成对的精确率与召回率。结果以 JSON 输出。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import collapse_near_duplicates, find_clusters, page_text  # noqa: E402
+
+CHARS = "人工智能大模型发布推出公司融资亿元技术突破芯片算力开源训练推理数据安全监管政策行业合作平台用户产品应用研究团队性能提升成本降低市场全球中国美国科技企业"
+WORDS = ["OpenAI", "GPT", "Nvidia", "GPU", "agent", "LLM", "Google", "Gemini", "API", "benchmark"]
+SITES = ["sohu.com", "news.ifeng.com", "36kr.com", "techcrunch.com", "theverge.com"]
+
+
+def _sentence(rng, n):
+    parts = []
+    for _ in range(n):
+        parts.append(rng.choice(WORDS) + " " if rng.random() < 0.08 else rng.choice(CHARS))
+    return ''.join(parts)
+
+
+def _variant(rng, page, site):
+    summary = list(page['summary'])
+    for _ in range(max(1, len(summary) // 40)):
+        summary[rng.randrange(len(summary))] = rng.choice(CHARS)
+    cut = rng.randint(0, len(summary) // 10)
+    return {
+        'name': rng.choice(["快讯：", "重磅！", "", "【AI】"]) + page['name'][:len(page['name']) - rng.randint(0, 3)],
+        'summary': ''.join(summary[:len(summary) - cut]),
+        'url': f"https://{site}/a/{rng.getrandbits(40):x}",
+        'siteName': site,
+    }
+
+
+def make_corpus(size, seed=7, dup_ratio=0.3):
+    """返回 (webpages, 真实的重复组标签列表)"""
+    rng = random.Random(seed)
+    pages, labels = [], []
+    story = 0
+    while len(pages) < size:
+        base = {
+            'name': _sentence(rng, rng.randint(12, 24)),
+            'summary': _sentence(rng, rng.randint(120, 260)),
+            'url': f"https://{rng.choice(SITES)}/a/{rng.getrandbits(40):x}",
+            'siteName': rng.choice(SITES),
+        }
+        pages.append(base)
+        labels.append(story)
+        if rng.random() < dup_ratio:
+            for _ in range(rng.randint(1, 3)):
+                if len(pages) >= size:
+                    break
+                pages.append(_variant(rng, base, rng.choice(SITES)))
+                labels.append(story)
+        story += 1
+    order = list(range(len(pages)))
+    rng.shuffle(order)
+    return [pages[i] for i in order], [labels[i] for i in order]
+
+
+def _pairs(groups):
+    pairs = set()
+    for members in groups:
+        members = sorted(members)
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                pairs.add((members[x], members[y]))
+    return pairs
+
+
+def run(size, seed=7, threshold=0.5):
+    pages, labels = make_corpus(size, seed)
+    truth = {}
+    for i, label in enumerate(labels):
+        truth.setdefault(label, []).append(i)
+    true_pairs = _pairs(g for g in truth.values() if len(g) > 1)
+
+    started = time.perf_counter()
+    clusters = find_clusters([page_text(p) for p in pages], threshold=threshold)
+    elapsed = time.perf_counter() - started
+    found_pairs = _pairs(clusters)
+    hit = len(true_pairs & found_pairs)
+    _, stats = collapse_near_duplicates(pages, threshold=threshold)
+    return {
+        'size': size,
+        'seconds': round(elapsed, 4),
+        'pages_per_second': round(size / elapsed) if elapsed else None,
+        'precision': round(hit / len(found_pairs), 4) if found_pairs else 1.0,
+        'recall': round(hit / len(true_pairs), 4) if true_pairs else 1.0,
+        'output_pages': stats['output'],
+        'clusters': stats['clusters'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,5000,10000')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--threshold', type=float, default=0.5)
+    args = parser.parse_args()
+    results = [run(int(n), args.seed, args.threshold) for n in args.sizes.split(',')]
+    print(json.dumps({'benchmark': 'dedup', 'results': results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
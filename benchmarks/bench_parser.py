@@ -0,0 +1,273 @@
+"""模型批量输出解析的模糊测试与基准：畸形输出下的正确率、流式与整段解析一致性、吞吐
+
+    python benchmarks/bench_parser.py [--seeds 200] [--pages 10] [--sizes 1000,5000] [--out result.json]
+
+按合成网页生成“模型输出”（标题与摘要为改写后的版本），再随机注入实际见过的偏差：
+缺少/写错/重复原始序号、摘要内部空行、Markdown 列表与加粗、半角冒号、字段顺序颠倒、
+分类带括号或多选或不在 5 个取值内、前后多余说明文字、CRLF 换行、末尾一条被截断。
+
+- fuzz：每个种子一个分块（--pages 个网页），检查不变量——不抛异常；每条结果都有标题、
+  URL 属于本分块、分类合法、URL 不重复；按任意位置切分后流式解析的结果与整段解析一致。
+  统计结果对应到正确网页的比例，并与旧解析逻辑（按空行切块 + 标题子串匹配）对比
+- throughput：大段输出（含一定比例缺少序号的记录）的解析吞吐；网页的二元组索引在装入网页时
+  构建一次（index_seconds 单列），不计入每次解析的耗时
+
+有不变量被破坏时以非零状态退出。结果以 JSON 输出。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_dedup import CHARS, make_corpus  # noqa: E402
+from llm_output import CATEGORIES, TitleIndex, iter_records, parse_records  # noqa: E402
+
+MALFORMATIONS = ('missing_index', 'bad_index', 'duplicate_index', 'blank_line_in_summary', 'markdown',
+                 'halfwidth_colon', 'field_order', 'category_noise', 'invalid_category')
+
+
+def _prepare_app():
+    os.environ.update({
+        'NEWS_DATA_DIR': tempfile.mkdtemp(prefix='ai-news-bench-'),
+        'STATIC_EXPORT_DIR': '',
+        'LOG_LEVEL': os.getenv('BENCH_LOG_LEVEL', 'WARNING'),
+    })
+    import app as app_module
+    return app_module
+
+
+def _rewrite(rng, text, keep):
+    """模拟模型改写：保留前 keep 比例的内容并替换少量字"""
+    chars = list(text[:max(8, int(len(text) * keep))])
+    for _ in range(max(1, len(chars) // 12)):
+        chars[rng.randrange(len(chars))] = rng.choice(CHARS)
+    return ''.join(chars)
+
+
+def _render(rng, truth, count, rate):
+    """把真实记录渲染成带偏差的模型输出；返回 (文本, 每条注入的偏差)"""
+    blocks, applied = [], []
+    for n, (pos, title, summary, category) in enumerate(truth):
+        kinds = {kind for kind in MALFORMATIONS if rng.random() < rate}
+        colon = ':' if 'halfwidth_colon' in kinds else '：'
+        if 'blank_line_in_summary' in kinds:
+            cut = len(summary) // 2
+            summary = f"{summary[:cut]}\n\n{summary[cut:]}"
+        if 'invalid_category' in kinds:
+            category = rng.choice(['其他', '综合资讯', 'Product'])
+        elif 'category_noise' in kinds:
+            category = rng.choice([f"[{category}]", f"【{category}】", f"{category}/{rng.choice(CATEGORIES)}",
+                                   f"{category}。"])
+        index = pos + 1
+        if 'bad_index' in kinds:
+            index = count + rng.randint(1, 50)
+        elif 'duplicate_index' in kinds and n:
+            index = truth[n - 1][0] + 1
+        fields = [('标题', title), ('摘要', summary), ('分类', category)]
+        if 'field_order' in kinds:
+            fields = [fields[0], fields[2], fields[1]]
+        if 'missing_index' not in kinds:
+            fields.insert(0, ('原始序号', f"[{index}]" if rng.random() < 0.3 else str(index)))
+        if 'markdown' in kinds:
+            lines = [f"- **{name}**{colon}{value}" for name, value in fields]
+        else:
+            lines = [f"{name}{colon}{value}" for name, value in fields]
+        blocks.append('\n'.join(lines))
+        applied.append(sorted(kinds))
+    text = '\n\n'.join(blocks)
+    if rng.random() < rate:
+        text = f"以下是筛选后的AI新闻：\n\n{text}\n\n以上为全部结果。"
+    if rng.random() < rate:
+        text = text.replace('\n', '\r\n')
+    return text, applied
+
+
+def _truth(rng, webpages, relevant_ratio=0.8):
+    truth = []
+    for pos, page in enumerate(webpages):
+        if rng.random() < relevant_ratio:
+            truth.append((pos, 'AI快讯：' + _rewrite(rng, page['name'], 0.8),
+                          _rewrite(rng, page['summary'], 0.4), rng.choice(CATEGORIES)))
+    return truth
+
+
+def legacy_parse(response_text, webpages, make_id):
+    """旧解析逻辑（按空行切块、逐行前缀匹配、标题子串匹配），用于对比"""
+    now = time.localtime()
+    blocks = [b.strip() for b in response_text.strip().split('\n\n') if b.strip()]
+    items = []
+    for block in blocks:
+        title, summary, category, raw_index = None, None, None, None
+        for line in block.split('\n'):
+            line = line.strip()
+            if line.startswith('原始序号：') or line.startswith('原始序号:'):
+                raw_index = re.sub(r'[^0-9]', '', line)
+            elif line.startswith('标题：') or line.startswith('标题:'):
+                title = line.split('：', 1)[-1].split(':', 1)[-1].strip()
+            elif line.startswith('摘要：') or line.startswith('摘要:'):
+                summary = line.split('：', 1)[-1].split(':', 1)[-1].strip()
+            elif line.startswith('分类：') or line.startswith('分类:'):
+                category = line.split('：', 1)[-1].split(':', 1)[-1].strip()
+        if category:
+            category = category.strip('[]').strip()
+        url = ''
+        if raw_index and raw_index.isdigit() and 0 <= int(raw_index) - 1 < len(webpages):
+            url = webpages[int(raw_index) - 1].get('url', '')
+        if not url:
+            for page in webpages:
+                if title and title in page.get('name', ''):
+                    url = page.get('url', '')
+                    break
+        items.append({
+            'id': make_id(url, title),
+            'title': title or '',
+            'url': url,
+            'summary': summary or '',
+            'category': category or '技术突破',
+            'time': time.strftime('%Y-%m-%d %H:%M', now),
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S', now),
+        })
+    return items
+
+
+def _score(items, truth, webpages):
+    expected = {title: webpages[pos]['url'] for pos, title, _, _ in truth}
+    correct = sum(1 for item in items if expected.get(item['title']) == item['url'])
+    return {
+        'expected': len(truth),
+        'items': len(items),
+        'correct': correct,
+        'wrong_url': sum(1 for item in items if item['title'] in expected and item['url']
+                         and expected[item['title']] != item['url']),
+        'empty_title': sum(1 for item in items if not item['title']),
+        'empty_url': sum(1 for item in items if not item['url']),
+        'invalid_category': sum(1 for item in items if item['category'] not in CATEGORIES),
+    }
+
+
+def _split_randomly(rng, text):
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, 24)
+        yield text[pos:pos + step]
+        pos += step
+
+
+def fuzz(app_module, seeds, pages, rate, truncate_ratio=0.2):
+    service = app_module.bocha_service
+    totals = {'new': {}, 'legacy': {}}
+    violations = []
+    corpus, _ = make_corpus(seeds * pages, seed=11, dup_ratio=0)
+    for seed in range(seeds):
+        rng = random.Random(seed)
+        webpages = corpus[seed * pages:(seed + 1) * pages]
+        truth = _truth(rng, webpages)
+        text, _ = _render(rng, truth, len(webpages), rate)
+        if rng.random() < truncate_ratio:
+            # 输出被截断：最后一条缺少分类或只剩半个摘要
+            text = text[:len(text) - rng.randint(1, 30)]
+        try:
+            items = service.parse_volcengine_batch_response(text, webpages)
+        except Exception as e:  # noqa: BLE001
+            violations.append({'seed': seed, 'error': repr(e)})
+            continue
+        urls = {page['url'] for page in webpages}
+        for item in items:
+            if not item['title'] or item['url'] not in urls or item['category'] not in CATEGORIES:
+                violations.append({'seed': seed, 'item': item})
+        if len({item['url'] for item in items}) != len(items):
+            violations.append({'seed': seed, 'error': 'duplicate url'})
+        streamed = list(iter_records(_split_randomly(rng, text)))
+        if streamed != parse_records(text):
+            violations.append({'seed': seed, 'error': 'stream/batch mismatch'})
+        for name, result in (('new', items), ('legacy', legacy_parse(text, webpages, app_module.make_article_id))):
+            for key, value in _score(result, truth, webpages).items():
+                totals[name][key] = totals[name].get(key, 0) + value
+    for stats in totals.values():
+        stats['accuracy'] = round(stats['correct'] / stats['expected'], 4) if stats.get('expected') else None
+    return {'seeds': seeds, 'pages': pages, 'malformation_rate': rate, 'results': totals,
+            'violations': len(violations), 'violation_samples': violations[:5]}
+
+
+def throughput(app_module, sizes, rate, seed, repeat=3):
+    service = app_module.bocha_service
+    results = []
+    for size in sizes:
+        rng = random.Random(seed)
+        webpages, _ = make_corpus(size, seed=seed, dup_ratio=0)
+        truth = _truth(rng, webpages, relevant_ratio=1.0)
+        text, _ = _render(rng, truth, len(webpages), rate)
+        legacy = lambda text, webpages: legacy_parse(text, webpages, app_module.make_article_id)  # noqa: E731
+        started = time.perf_counter()
+        title_index = TitleIndex(webpages)
+        index_seconds = time.perf_counter() - started
+
+        def parse_new(text, webpages):
+            title_index.claimed.clear()
+            return service.parse_volcengine_batch_response(text, webpages, title_index=title_index)
+        for name, parse in (('new', parse_new), ('legacy', legacy)):
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                items = parse(text, webpages)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            size_mb = len(text.encode('utf-8')) / 1e6
+            results.append({
+                'parser': name,
+                'records': size,
+                'malformation_rate': rate,
+                'input_mb': round(size_mb, 3),
+                'items': len(items),
+                'accuracy': round(_score(items, truth, webpages)['correct'] / len(truth), 4),
+                'seconds': round(best, 5),
+                'index_seconds': round(index_seconds, 5) if name == 'new' else None,
+                'records_per_second': round(size / best) if best else None,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seeds', type=int, default=200, help='模糊测试的分块数')
+    parser.add_argument('--pages', type=int, default=10, help='每个分块的网页数（与 VOLCENGINE_CHUNK_SIZE 对应）')
+    parser.add_argument('--rate', type=float, default=0.15, help='每种偏差注入到每条记录的概率')
+    parser.add_argument('--sizes', default='1000,5000', help='吞吐测试的记录数')
+    parser.add_argument('--throughput-rate', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--out', help='同时把结果写入该文件')
+    args = parser.parse_args()
+
+    app_module = _prepare_app()
+    results = {
+        'fuzz': fuzz(app_module, args.seeds, args.pages, args.rate),
+        'throughput': throughput(app_module, [int(n) for n in args.sizes.split(',')], args.throughput_rate, args.seed),
+    }
+    report = {
+        'benchmark': 'parser',
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': {k: v for k, v in vars(args).items() if k not in ('out',)},
+        },
+        'results': results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+    if results['fuzz']['violations']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""全文检索基准：索引同步与查询延迟
+
+    python benchmarks/bench_search.py [--sizes 5000,20000] [--queries 200] [--repeat 3] [--seed 7]
+
+语料复用 bench_dedup 的合成新闻（字表较小，常见二元组的倒排表很长，接近最坏情况）。
+
+- full_sync：空索引一次同步全部文章
+- partial_sync：在已有索引上追加 10 篇新文章（模拟加工中途的部分发布）的单次同步耗时
+- first_query：部分同步后第一次查询（查询缓存已失效）
+- single / multi：随机抽取文章标题中的 1 个二元组 / 3~6 个字的片段作为查询，
+  不经过查询缓存，每个查询重复 --repeat 次取最小值（排除调度与 GC 抖动），统计 p50/p99 毫秒
+
+结果以 JSON 输出。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_dedup import make_corpus  # noqa: E402
+from search_index import SearchIndex, tokenize  # noqa: E402
+
+
+def _articles(size, seed):
+    pages, _ = make_corpus(size, seed=seed, dup_ratio=0)
+    return [{'id': f'a{i}', 'title': page['name'], 'summary': page['summary']} for i, page in enumerate(pages)]
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 3)  # noqa: E731
+    return {'p50_ms': pick(0.5), 'p99_ms': pick(0.99), 'max_ms': round(samples[-1] * 1000, 3)}
+
+
+def _query_latency(index, queries, repeat=1):
+    samples = []
+    for query in queries:
+        best = None
+        for _ in range(repeat):
+            index._cache.clear()
+            started = time.perf_counter()
+            index.search(query, 20)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        samples.append(best)
+    return _percentiles(samples)
+
+
+def run(size, queries, seed=7, repeat=3):
+    rng = random.Random(seed)
+    articles = _articles(size + 10 * 20, seed)
+    base, extra = articles[:size], articles[size:]
+    index = SearchIndex()
+
+    started = time.perf_counter()
+    index.sync(base)
+    full_sync = time.perf_counter() - started
+
+    titles = [article['title'] for article in base]
+    singles = [rng.choice(tokenize(rng.choice(titles))) for _ in range(queries)]
+    multis = []
+    for _ in range(queries):
+        title = rng.choice(titles)
+        start = rng.randrange(max(1, len(title) - 6))
+        multis.append(title[start:start + rng.randint(3, 6)])
+    # 先各跑一遍，排除首次构建的开销
+    _query_latency(index, singles[:20] + multis[:20])
+
+    partial, first_query = [], []
+    current = list(base)
+    for n in range(20):
+        current.extend(extra[n * 10:(n + 1) * 10])
+        started = time.perf_counter()
+        index.sync(current)
+        partial.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        index.search(singles[n], 20)
+        first_query.append(time.perf_counter() - started)
+    return {
+        'size': size,
+        'full_sync_seconds': round(full_sync, 3),
+        'partial_sync': _percentiles(partial),
+        'first_query': _percentiles(first_query),
+        'single': _query_latency(index, singles, repeat),
+        'multi': _query_latency(index, multis, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='5000,20000')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    results = [run(int(n), args.queries, args.seed, args.repeat) for n in args.sizes.split(',')]
+    print(json.dumps({'benchmark': 'search', 'results': results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
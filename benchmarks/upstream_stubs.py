@@ -0,0 +1,265 @@
+"""博查 / 火山引擎的本地替身：回放录制的上游数据，延迟可配置
+
+- StubBochaServer：本地 HTTP 服务，按请求体回放录制的 webPages 响应（通过 BOCHA_API_URL 指向它）
+- FakeArkClient：替换 app.client，接口与 Ark SDK 的 chat.completions.create 一致（含 stream=True），
+  按提示词中的网页标题回放录制的加工结果
+- 夹具（fixture）为 JSON 文件：
+    {"bocha": [{"request": {...请求体}, "response": {...博查响应}}],
+     "completions": {"网页标题": "标题：...\\n摘要：...\\n分类：..."}}
+  completions 中没有的网页视为模型判定无关、不输出
+
+录制真实上游（需要 BOCHA_API_KEY / VOLCENGINE_API_KEY 等环境变量）：
+
+    python benchmarks/upstream_stubs.py record --out benchmarks/fixtures/recorded.json
+
+未提供夹具时由 synthetic_fixture() 按默认抓取计划合成（含转载变体，覆盖近重复合并路径）。
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_dedup import make_corpus  # noqa: E402
+from ingestion import CATEGORY_QUERIES, default_plan  # noqa: E402
+
+_PROMPT_PAGE_RE = re.compile(r'原始内容(\d+)：\n标题：(.*)')
+_OUTPUT_INDEX_RE = re.compile(r'原始序号[：:]\s*\[?(\d+)')
+
+
+def _request_key(payload):
+    return json.dumps(payload, ensure_ascii=False, sort_keys=True)
+
+
+def synthetic_fixture(size=400, seed=7, relevant_ratio=0.8):
+    """按默认抓取计划合成夹具：size 个网页分配到各查询，每页最多 count 条"""
+    rng = random.Random(seed)
+    pages, _ = make_corpus(size, seed)
+    tasks = default_plan()
+    bocha = []
+    per_task = -(-len(pages) // len(tasks))
+    for n, task in enumerate(tasks):
+        payload = task.payload()
+        chunk = pages[n * per_task:(n + 1) * per_task]
+        # 少量结果在不同查询间重复出现，覆盖按 URL 去重
+        if n and chunk:
+            chunk = chunk + rng.sample(pages[:n * per_task], min(3, n * per_task))
+        chunk = chunk[:payload['count']]
+        bocha.append({'request': payload, 'response': {'data': {'webPages': {'value': chunk}}}})
+    categories = list(CATEGORY_QUERIES)
+    completions = {}
+    for page in pages:
+        if rng.random() < relevant_ratio:
+            completions[page['name']] = (
+                f"标题：AI快讯：{page['name'][:30]}\n"
+                f"摘要：{page['summary'][:120]}\n"
+                f"分类：{rng.choice(categories)}"
+            )
+    return {'bocha': bocha, 'completions': completions}
+
+
+def load_fixture(path):
+    with open(path, encoding='utf-8') as f:
+        fixture = json.load(f)
+    fixture.setdefault('bocha', [])
+    fixture.setdefault('completions', {})
+    return fixture
+
+
+class StubBochaServer:
+    """本地博查替身；未录制的请求返回空结果（与真实接口无结果时一致）"""
+
+    def __init__(self, fixture, latency=0.0, jitter=0.0, host='127.0.0.1', port=0):
+        self.responses = {
+            _request_key(entry['request']): json.dumps(entry['response'], ensure_ascii=False).encode('utf-8')
+            for entry in fixture.get('bocha', [])
+        }
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    payload = {}
+                with stub._lock:
+                    stub.requests += 1
+                delay = stub.latency + (random.uniform(0, stub.jitter) if stub.jitter else 0)
+                if delay:
+                    time.sleep(delay)
+                body = stub.responses.get(_request_key(payload), b'{"code":200,"data":{"webPages":{"value":[]}}}')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/web-search"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeArkClient:
+    """火山引擎替身：client.chat.completions.create(model, messages, stream=False, **kw)
+
+    latency 为首个 token 前的等待；chars_per_second > 0 时按该速度流式吐出（模拟生成耗时）。
+    """
+
+    STREAM_CHUNK_CHARS = 8
+
+    def __init__(self, fixture, latency=0.0, chars_per_second=0):
+        self.completions_by_title = fixture.get('completions', {})
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def render(self, user_prompt):
+        blocks = []
+        for index, title in _PROMPT_PAGE_RE.findall(user_prompt):
+            body = self.completions_by_title.get(title.strip())
+            if body:
+                blocks.append(f"原始序号：{index}\n{body}")
+        return '\n\n'.join(blocks)
+
+    def create(self, model=None, messages=(), stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        prompt = ''.join(m.get('content', '') for m in messages)
+        text = self.render(messages[-1]['content'] if messages else '')
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 2, completion_tokens=len(text) // 2,
+                                total_tokens=(len(prompt) + len(text)) // 2)
+        if self.latency:
+            time.sleep(self.latency)
+        if not stream:
+            if self.chars_per_second > 0:
+                time.sleep(len(text) / self.chars_per_second)
+            message = SimpleNamespace(content=text)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+        return self._stream(text, usage)
+
+    def _stream(self, text, usage):
+        step = self.STREAM_CHUNK_CHARS
+        for start in range(0, len(text), step):
+            if self.chars_per_second > 0:
+                time.sleep(step / self.chars_per_second)
+            delta = SimpleNamespace(content=text[start:start + step])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+
+# ==== 录制 ====
+def _split_completion(prompt, output, completions):
+    """把一次补全按原始序号拆回各网页标题：{网页标题: 去掉序号行的结果块}"""
+    titles = {int(index): title.strip() for index, title in _PROMPT_PAGE_RE.findall(prompt)}
+    for block in output.split('\n\n'):
+        match = _OUTPUT_INDEX_RE.search(block)
+        if not match or int(match.group(1)) not in titles:
+            continue
+        lines = [line for line in block.strip().split('\n') if not _OUTPUT_INDEX_RE.search(line)]
+        completions[titles[int(match.group(1))]] = '\n'.join(lines)
+
+
+def record(out_path):
+    """跑一次真实刷新，记录博查请求/响应与火山引擎输出"""
+    import app
+    if app.client is None:
+        raise SystemExit('未检测到火山引擎SDK，无法录制模型输出')
+    fixture = {'bocha': [], 'completions': {}}
+    lock = threading.Lock()
+    bocha_client = app.bocha_service.bocha_client
+    original_search = bocha_client.search
+
+    def recording_search(payload):
+        response = original_search(payload)
+        with lock:
+            fixture['bocha'].append({'request': payload, 'response': response})
+        return response
+
+    completions = app.client.chat.completions
+    original_create = completions.create
+
+    def recording_create(*args, **kwargs):
+        prompt = kwargs['messages'][-1]['content']
+        response = original_create(*args, **kwargs)
+        if not kwargs.get('stream'):
+            with lock:
+                _split_completion(prompt, response.choices[0].message.content or '', fixture['completions'])
+            return response
+
+        def tee():
+            parts = []
+            try:
+                for chunk in response:
+                    choices = getattr(chunk, 'choices', None)
+                    if choices and getattr(choices[0], 'delta', None) is not None:
+                        parts.append(getattr(choices[0].delta, 'content', None) or '')
+                    yield chunk
+            finally:
+                with lock:
+                    _split_completion(prompt, ''.join(parts), fixture['completions'])
+        return tee()
+
+    bocha_client.search = recording_search
+    completions.create = recording_create
+    # 不读取加工备忘录，确保每个网页都经过模型
+    app.enrichment_cache = None
+    app.bocha_service.get_ai_news(force_refresh=True)
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(fixture, f, ensure_ascii=False)
+    print(json.dumps({'out': out_path, 'bocha_requests': len(fixture['bocha']),
+                      'completions': len(fixture['completions'])}, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    rec = sub.add_parser('record', help='录制真实上游的请求与输出')
+    rec.add_argument('--out', required=True)
+    syn = sub.add_parser('synthesize', help='生成合成夹具')
+    syn.add_argument('--out', required=True)
+    syn.add_argument('--pages', type=int, default=400)
+    syn.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args.out)
+    else:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(synthetic_fixture(args.pages, args.seed), f, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""博查搜索上游客户端
+
+- 复用 keep-alive 连接池（requests.Session），连接超时与读取超时分开配置
+- 超时、连接错误等请求异常以及 429 与 5xx 按带抖动的指数退避重试
+- 连续失败达到阈值后熔断，冷却期内直接失败，冷却结束后放行一次探测请求
+- 令牌桶限速：多路并发查询时整体不超过每秒 N 次请求
+- 记录每次调用的耗时直方图与状态码计数
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import Histogram
+
+
+class BochaError(Exception):
+    """博查调用失败（已用尽重试或遇到不可重试的错误）"""
+
+
+class CircuitOpenError(BochaError):
+    """熔断器处于打开状态，本次调用未发出"""
+
+
+class CircuitBreaker:
+    """连续失败计数熔断器：closed -> open（冷却）-> half-open（放行一次探测）"""
+
+    def __init__(self, failure_threshold=5, reset_seconds=120):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """调用结束时兜底：探测请求未记录成功或失败就退出（意外异常）时，允许下一次探测"""
+        with self._lock:
+            self._probing = False
+
+
+class RateLimiter:
+    """线程安全的令牌桶；rate_per_second <= 0 表示不限速"""
+
+    def __init__(self, rate_per_second, burst=1):
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class BochaClient:
+    RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, api_key, url, connect_timeout=5, read_timeout=30, max_retries=3,
+                 backoff_base=1.0, backoff_max=20.0, breaker=None, pool_size=4, rate_limiter=None):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.rate_limiter = rate_limiter or RateLimiter(0)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        })
+        self.latency = Histogram()
+        self.status_counts = {}
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def _record(self, status, elapsed):
+        self.latency.observe(elapsed)
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def _backoff(self, attempt):
+        # 全抖动（full jitter）：在 [0, min(上限, base * 2^attempt)] 内随机等待
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def search(self, payload):
+        """POST 查询并返回 JSON；失败时抛出 BochaError（熔断时为 CircuitOpenError）"""
+        if not self.breaker.allow():
+            raise CircuitOpenError('博查接口熔断中，暂停调用')
+        try:
+            return self._search(payload)
+        finally:
+            self.breaker.release()
+
+    def _search(self, payload):
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                # 超时、连接错误之外，分块传输中断、解压失败、重定向过多等也按可重试失败处理
+                if isinstance(e, requests.Timeout):
+                    status = 'timeout'
+                elif isinstance(e, requests.ConnectionError):
+                    status = 'connection_error'
+                else:
+                    status = 'request_error'
+                self._record(status, time.perf_counter() - started)
+                last_error = e
+            else:
+                self._record(str(response.status_code), time.perf_counter() - started)
+                if response.status_code == 200:
+                    try:
+                        result = response.json()
+                    except ValueError as e:
+                        last_error = e
+                    else:
+                        self.breaker.record_success()
+                        return result
+                elif response.status_code not in self.RETRYABLE_STATUS:
+                    self.breaker.record_failure()
+                    raise BochaError(f'HTTP {response.status_code}: {response.text[:200]}')
+                else:
+                    last_error = BochaError(f'HTTP {response.status_code}')
+            if attempt < self.max_retries:
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self._backoff(attempt))
+        self.breaker.record_failure()
+        raise BochaError(f'博查接口调用失败（已重试 {self.max_retries} 次）: {last_error}')
+
+    def stats(self):
+        latency = self.latency.snapshot()
+        with self._lock:
+            status_counts = dict(self.status_counts)
+            retries = self.retries
+        return {
+            'calls': latency['count'],
+            'latency_avg_seconds': round(latency['sum'] / latency['count'], 4) if latency['count'] else 0.0,
+            'latency_buckets': [[('+Inf' if b == float('inf') else b), n] for b, n in latency['buckets']],
+            'status_counts': status_counts,
+            'retries': retries,
+            'circuit': self.breaker.state,
+        }
@@ -0,0 +1,150 @@
+"""近重复新闻检测（加工前去重）
+
+同一条新闻常被多个站点转载（搜狐、凤凰、36氪……），标题略有改写但正文摘要高度相似。
+这里对“标题 + 摘要”做字符级 shingle，用单次排列 MinHash（one-permutation hashing）
+生成签名，再用 LSH 分段找候选对，最后以精确 Jaccard 相似度确认，并查集合并成簇。
+
+- 中文按单字切分、英文按单词切分，再取连续 3 个 token 作为 shingle
+- 每篇文档只需遍历一次 shingle 即可得到签名，耗时随网页数近似线性增长（见 benchmarks/bench_dedup.py）
+- token 先用 blake2b 换成 64 位整数，shingle 是整数元组：整数元组的内置哈希不加盐，
+  签名不受 PYTHONHASHSEED 影响，各进程、各次运行的分簇结果一致
+- 纯本地计算，不依赖网络与第三方库
+"""
+import re
+import time
+from functools import lru_cache
+from hashlib import blake2b
+
+_TOKEN_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]|[a-z0-9]+')
+_HASH_MASK = (1 << 64) - 1
+_EMPTY = _HASH_MASK
+
+
+def tokenize(text):
+    """中文单字 + 英文/数字单词"""
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+@lru_cache(maxsize=1 << 16)
+def _token_id(token):
+    """token 的稳定 64 位哈希（字符串的内置 hash() 加盐，随进程变化）"""
+    return int.from_bytes(blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def shingles(text, k=3):
+    """连续 k 个 token 组成的 shingle 集合（元素为 token 哈希的元组）"""
+    tokens = list(map(_token_id, tokenize(text)))
+    if len(tokens) < k:
+        return {tuple(tokens)} if tokens else set()
+    return set(zip(*(tokens[i:] for i in range(k))))
+
+
+def signature(shingle_set, num_bins):
+    """单次排列 MinHash：按哈希低位分桶，每桶取最小值；空桶向后借用相邻桶（densification）"""
+    sig = [_EMPTY] * num_bins
+    for s in shingle_set:
+        h = hash(s) & _HASH_MASK
+        b = h % num_bins
+        v = h // num_bins
+        if v < sig[b]:
+            sig[b] = v
+    if _EMPTY in sig and any(v != _EMPTY for v in sig):
+        for b in range(num_bins):
+            if sig[b] == _EMPTY:
+                step = 1
+                while sig[(b + step) % num_bins] == _EMPTY:
+                    step += 1
+                # 借用时混入偏移，避免两篇文档仅因借用同一桶而误判相等
+                sig[b] = (sig[(b + step) % num_bins] + step * 0x9E3779B97F4A7C15) & _HASH_MASK
+    return sig
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # 以较小下标为根，簇的顺序即首次出现的位置
+            if ra < rb:
+                self.parent[rb] = ra
+            else:
+                self.parent[ra] = rb
+
+
+def find_clusters(texts, threshold=0.5, bands=21, rows=3, k=3):
+    """返回近重复簇列表（每簇为下标列表，按下标升序；只含大小 >= 2 的簇）"""
+    num_bins = bands * rows
+    sets = [shingles(t, k) for t in texts]
+    buckets = {}
+    for i, sh in enumerate(sets):
+        if not sh:
+            continue
+        sig = signature(sh, num_bins)
+        for band in range(bands):
+            key = (band, *sig[band * rows:(band + 1) * rows])
+            buckets.setdefault(key, []).append(i)
+
+    uf = _UnionFind(len(texts))
+    checked = set()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        for x in range(len(members)):
+            a = members[x]
+            for y in range(x + 1, len(members)):
+                b = members[y]
+                if (a, b) in checked or uf.find(a) == uf.find(b):
+                    continue
+                checked.add((a, b))
+                sa, sb = sets[a], sets[b]
+                inter = len(sa & sb)
+                if inter and inter / (len(sa) + len(sb) - inter) >= threshold:
+                    uf.union(a, b)
+
+    clusters = {}
+    for i in range(len(texts)):
+        clusters.setdefault(uf.find(i), []).append(i)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def page_text(page):
+    return f"{page.get('name', '')}\n{page.get('summary', '')}"
+
+
+def collapse_near_duplicates(webpages, threshold=0.5):
+    """把近重复网页合并为一篇代表网页，返回 (新列表, 统计)
+
+    代表网页取簇内摘要最长的一篇（信息最完整），放在簇首次出现的位置，
+    其它转载来源记录在代表网页的 'alternates' 字段中（url / siteName / name）。
+    """
+    started = time.perf_counter()
+    clusters = find_clusters([page_text(p) for p in webpages], threshold=threshold)
+    replace = {}
+    dropped = set()
+    for members in clusters:
+        canonical = max(members, key=lambda i: (len(webpages[i].get('summary') or ''), -i))
+        page = dict(webpages[canonical])
+        page['alternates'] = [
+            {'url': webpages[i].get('url', ''), 'siteName': webpages[i].get('siteName', ''),
+             'name': webpages[i].get('name', '')}
+            for i in members if i != canonical
+        ]
+        replace[members[0]] = page
+        dropped.update(i for i in members if i != members[0])
+    result = [replace.get(i, page) for i, page in enumerate(webpages) if i not in dropped]
+    stats = {
+        'input': len(webpages),
+        'output': len(result),
+        'clusters': len(clusters),
+        'seconds': round(time.perf_counter() - started, 4),
+    }
+    return result, stats
@@ -0,0 +1,15 @@
+# Gunicorn 配置：gunicorn -c gunicorn.conf.py app:app
+# 每个 worker 启动后都参与刷新 worker 选主；只有当选的 worker 调用博查/火山引擎，
+# 其它 worker 通过共享快照库（SQLite WAL）同步同一份新闻数据。
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout = 180
+
+
+def post_worker_init(worker):
+    from app import bocha_service
+    bocha_service.start_background_refresh()
@@ -0,0 +1,148 @@
+"""多路查询扇出抓取
+
+一次刷新按“抓取计划”发出多条博查查询（通用查询、指定站点、按分类、多页），
+在有界线程池中并发执行，合并后按归一化 URL 去重，结果保持计划顺序。
+
+计划可通过 NEWS_INGESTION_PLAN 指向的 JSON 文件配置：
+    {"queries": [{"query": "...", "include": "a.com|b.com", "pages": 2, "count": 50, "freshness": "oneDay"}]}
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from bocha_client import BochaError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY = "全球范围内关于AI人工智能的最新动态新闻，重点关注具有行业影响力的技术突破、产品发布、行业趋势、投资融资和政策法规等方面的内容"
+DEFAULT_INCLUDE_SITES = "sohu.com|news.ifeng.com|36kr.com|techcrunch.com|venturebeat.com|theverge.com|arstechnica.com|zdnet.com"
+DEFAULT_EXCLUDE_SITES = "tech.gmw.cn|m.gmw.cn"
+CATEGORY_QUERIES = {
+    '技术突破': "AI人工智能 大模型 算法 技术突破 最新研究成果",
+    '产品发布': "AI人工智能 新产品发布 新功能上线 版本更新",
+    '行业动态': "AI人工智能 行业动态 公司合作 并购 市场变化",
+    '投资融资': "AI人工智能 公司融资 投资 上市",
+    '政策法规': "AI人工智能 政策 法规 监管",
+}
+
+
+class IngestionTask:
+    """一次博查调用（某条查询的某一页）"""
+
+    __slots__ = ('query', 'include', 'exclude', 'page', 'count', 'freshness')
+
+    def __init__(self, query, include=None, exclude=DEFAULT_EXCLUDE_SITES, page=1, count=50, freshness='oneDay'):
+        self.query = query
+        self.include = include
+        self.exclude = exclude
+        self.page = page
+        self.count = count
+        self.freshness = freshness
+
+    def payload(self):
+        data = {
+            "query": self.query,
+            "freshness": self.freshness,
+            "summary": True,
+            "count": self.count,
+            "page": self.page,
+        }
+        if self.include:
+            data["include"] = self.include
+        if self.exclude:
+            data["exclude"] = self.exclude
+        return data
+
+    def describe(self):
+        site = f" @ {self.include}" if self.include else ""
+        return f"{self.query[:24]}{site} 第{self.page}页"
+
+
+def _expand(entries):
+    tasks = []
+    for entry in entries:
+        pages = max(1, int(entry.get('pages', 1)))
+        for page in range(1, pages + 1):
+            tasks.append(IngestionTask(
+                entry['query'],
+                include=entry.get('include'),
+                exclude=entry.get('exclude', DEFAULT_EXCLUDE_SITES),
+                page=page,
+                count=min(50, max(1, int(entry.get('count', 50)))),
+                freshness=entry.get('freshness', 'oneDay'),
+            ))
+    return tasks
+
+
+def default_plan():
+    """默认计划：通用查询 2 页 + 指定站点 1 页 + 每个分类 1 页"""
+    entries = [
+        {'query': DEFAULT_QUERY, 'pages': 2},
+        {'query': DEFAULT_QUERY, 'include': DEFAULT_INCLUDE_SITES},
+    ]
+    entries.extend({'query': q} for q in CATEGORY_QUERIES.values())
+    return _expand(entries)
+
+
+def load_plan(path=None):
+    """读取 JSON 抓取计划；未配置或读取失败时使用默认计划"""
+    if path:
+        try:
+            with open(path, encoding='utf-8') as f:
+                tasks = _expand(json.load(f).get('queries', []))
+            if tasks:
+                return tasks
+            logger.warning("抓取计划 %s 中没有查询，使用默认计划", path)
+        except Exception as e:
+            logger.warning("读取抓取计划失败（%s），使用默认计划: %s", path, e)
+    return default_plan()
+
+
+def _web_pages(result):
+    """从博查响应中取出网页列表；字段缺失、为 null 或类型不对时按空列表处理"""
+    data = result.get('data') if isinstance(result, dict) else None
+    web_pages = data.get('webPages') if isinstance(data, dict) else None
+    pages = web_pages.get('value') if isinstance(web_pages, dict) else None
+    return [page for page in pages if isinstance(page, dict)] if isinstance(pages, list) else []
+
+
+def fetch_all(client, tasks, max_parallel=4, key=None):
+    """并发执行全部任务，返回 (去重后的 webPages 列表, 统计)
+
+    单个任务失败只记录不影响其它任务；全部失败时抛出 BochaError。
+    key(url) 用于去重（默认原样比较 URL）。
+    """
+    key = key or (lambda url: url)
+    results = [None] * len(tasks)
+    errors = []
+
+    def run(i):
+        try:
+            results[i] = _web_pages(client.search(tasks[i].payload()))
+        except BochaError as e:
+            errors.append(f"{tasks[i].describe()}: {e}")
+        except Exception as e:
+            # 非预期的异常同样只记为该任务失败，不中断其它查询
+            logger.warning("查询 %s 出现异常: %r", tasks[i].describe(), e)
+            errors.append(f"{tasks[i].describe()}: {e!r}")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(tasks))), thread_name_prefix='bocha') as pool:
+        list(pool.map(run, range(len(tasks))))
+
+    if tasks and len(errors) == len(tasks):
+        raise BochaError(f"全部 {len(tasks)} 个查询均失败，例如 {errors[0]}")
+
+    merged = []
+    seen = set()
+    raw = 0
+    for pages in results:
+        for page in pages or []:
+            raw += 1
+            k = key(page.get('url', '')) if page.get('url') else None
+            if k is not None:
+                if k in seen:
+                    continue
+                seen.add(k)
+            merged.append(page)
+    stats = {'tasks': len(tasks), 'failed': len(errors), 'raw_pages': raw, 'unique_pages': len(merged)}
+    return merged, stats
@@ -0,0 +1,288 @@
+"""火山引擎调用的 token 预算与配额
+
+- 发送前估算提示词 token 数：汉字按 1 个 token、其它字符按 4 个一 token 估计（偏保守）
+- 单个网页摘要超过 summary_max_chars 时截断；单次请求超过 prompt_max_tokens 时继续按比例收紧
+- 一次刷新的待加工网页超出剩余额度（本轮上限、每小时/每天 token 与请求数配额）时，
+  按价值从低到高舍弃，被舍弃的网页由调用方改走简化处理
+- 调用前按估算值预占额度，拿到响应中的 usage 后按实际值结算；重试时每次实际发出的请求都另外计入请求数
+- 额度检查与预占是一步完成的（内存计数在锁内，共享库在同一个写事务内），并发的分块不会一起越过配额
+- 提供 store（SnapshotStore）时配额计数写入共享库，重启与多 worker 之间不会重复计算
+"""
+import math
+import re
+import threading
+import time
+
+_CJK_RE = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]')
+
+# 未拿到 usage 时按提示词估算值的该比例预估输出 token
+COMPLETION_RATIO = 0.5
+# 按比例收紧摘要时的最短保留字数
+MIN_SUMMARY_CHARS = 60
+# 配额计数保留时长（秒）：超过该时长未更新的窗口被清理，与共享库一致
+USAGE_KEEP_SECONDS = 3 * 86400
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def clip(text, max_chars):
+    if not text or not max_chars or len(text) <= max_chars:
+        return text or ''
+    return text[:max_chars] + '…'
+
+
+def page_value(page, position):
+    """网页价值：被多个站点转载的优先，其次是抓取计划中靠前的（通用查询的结果排在前面）"""
+    return (len(page.get('alternates') or ()), -position)
+
+
+class _MemoryLedger:
+    """进程内配额计数 {窗口: (tokens, requests, 最后更新时间)}；按更新时间清理，小时与天窗口互不影响"""
+
+    def __init__(self, keep_seconds=USAGE_KEEP_SECONDS):
+        self.keep_seconds = keep_seconds
+        self._usage = {}
+        self._lock = threading.Lock()
+
+    def _add(self, windows, tokens, requests, now):
+        for window in windows:
+            used = self._usage.get(window, (0, 0, now))
+            self._usage[window] = (used[0] + tokens, used[1] + requests, now)
+        for window in [w for w, used in self._usage.items() if used[2] < now - self.keep_seconds]:
+            del self._usage[window]
+
+    def add(self, windows, tokens, requests, now=None):
+        with self._lock:
+            self._add(windows, tokens, requests, time.time() if now is None else now)
+
+    def reserve(self, windows, tokens, requests, fits):
+        with self._lock:
+            if not fits(self._load(windows)):
+                return False
+            self._add(windows, tokens, requests, time.time())
+            return True
+
+    def _load(self, windows):
+        return {w: self._usage[w][:2] for w in windows if w in self._usage}
+
+    def load(self, windows):
+        with self._lock:
+            return self._load(windows)
+
+
+class _StoreLedger:
+    def __init__(self, store):
+        self._store = store
+
+    def add(self, windows, tokens, requests):
+        self._store.add_usage(windows, tokens, requests, keep_seconds=USAGE_KEEP_SECONDS)
+
+    def reserve(self, windows, tokens, requests, fits):
+        return self._store.reserve_usage(windows, tokens, requests, fits, keep_seconds=USAGE_KEEP_SECONDS)
+
+    def load(self, windows):
+        return self._store.load_usage(windows)
+
+
+class Reservation:
+    """一次分块调用的预占；attempts 为已发出（或即将发出）的请求数，第一次请求由 acquire 预占"""
+    __slots__ = ('tokens', 'settled', 'attempts')
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.settled = False
+        self.attempts = 0
+
+
+class TokenBudget:
+    """0 表示不限制"""
+
+    def __init__(self, prompt_max_tokens=0, summary_max_chars=0, refresh_max_tokens=0,
+                 hourly_tokens=0, daily_tokens=0, hourly_requests=0, daily_requests=0,
+                 price_prompt_per_1k=0.0, price_completion_per_1k=0.0, store=None):
+        self.prompt_max_tokens = max(0, prompt_max_tokens)
+        self.summary_max_chars = max(0, summary_max_chars)
+        self.refresh_max_tokens = max(0, refresh_max_tokens)
+        self.hourly_tokens = max(0, hourly_tokens)
+        self.daily_tokens = max(0, daily_tokens)
+        self.hourly_requests = max(0, hourly_requests)
+        self.daily_requests = max(0, daily_requests)
+        self.price_prompt_per_1k = price_prompt_per_1k
+        self.price_completion_per_1k = price_completion_per_1k
+        self._ledger = _StoreLedger(store) if store is not None else _MemoryLedger()
+        self._lock = threading.Lock()
+        # 串行化“检查剩余额度 + 预占”，本轮上限（refresh_max_tokens）也在这把锁内判断
+        self._reserve_lock = threading.Lock()
+        self.fallback_pages = 0
+        self.cost = 0.0
+        self._refresh = self._new_refresh()
+
+    # ==== 配额窗口 ====
+    @staticmethod
+    def _windows(now=None):
+        now = time.localtime(now)
+        return time.strftime('h:%Y-%m-%dT%H', now), time.strftime('d:%Y-%m-%d', now)
+
+    def _remaining(self):
+        """(剩余 token, 剩余请求数)，None 表示不限"""
+        windows = self._windows()
+        return self._left(windows, self._ledger.load(windows))
+
+    def _left(self, windows, used):
+        hour, day = windows
+        tokens, requests = [], []
+        for window, token_limit, request_limit in ((hour, self.hourly_tokens, self.hourly_requests),
+                                                   (day, self.daily_tokens, self.daily_requests)):
+            used_tokens, used_requests = used.get(window, (0, 0))
+            if token_limit:
+                tokens.append(token_limit - used_tokens)
+            if request_limit:
+                requests.append(request_limit - used_requests)
+        if self.refresh_max_tokens:
+            with self._lock:
+                tokens.append(self.refresh_max_tokens - self._refresh['prompt_tokens']
+                              - self._refresh['completion_tokens'] - self._refresh['reserved_tokens'])
+        return (max(0, min(tokens)) if tokens else None, max(0, min(requests)) if requests else None)
+
+    # ==== 发送前 ====
+    def fit_summaries(self, summaries, overhead_tokens):
+        """把一次请求内的摘要截断到单页上限，整体仍超出 prompt_max_tokens 时按比例收紧；返回截断后的列表"""
+        clipped = [clip(s, self.summary_max_chars) for s in summaries]
+        if not self.prompt_max_tokens or not clipped:
+            return clipped
+        limit = self.summary_max_chars or max(len(s) for s in summaries)
+        for _ in range(8):
+            total = overhead_tokens + sum(estimate_tokens(s) for s in clipped)
+            if total <= self.prompt_max_tokens or limit <= MIN_SUMMARY_CHARS:
+                break
+            ratio = (self.prompt_max_tokens - overhead_tokens) / max(1, total - overhead_tokens)
+            limit = max(MIN_SUMMARY_CHARS, int(limit * min(0.9, max(0.1, ratio))))
+            clipped = [clip(s, limit) for s in summaries]
+        with self._lock:
+            self._refresh['truncated_pages'] += sum(1 for a, b in zip(summaries, clipped) if a != b)
+        return clipped
+
+    def select(self, costs, values, chunk_size, overhead_tokens):
+        """在剩余额度内挑选要送去模型的网页，返回 (保留的下标集合, 舍弃的下标列表)
+
+        costs / values 与网页一一对应；按价值从高到低装入，请求数额度按每 chunk_size 个网页一次计算。
+        """
+        tokens_left, requests_left = self._remaining()
+        order = sorted(range(len(costs)), key=lambda i: values[i], reverse=True)
+        if requests_left is not None:
+            order = order[:requests_left * chunk_size]
+        kept, dropped, spent = set(), [], 0
+        for count, i in enumerate(order):
+            # 每开始一个新分块计入一次系统提示词开销；预留输出 token
+            cost = math.ceil(costs[i] * (1 + COMPLETION_RATIO)) + (overhead_tokens if count % chunk_size == 0 else 0)
+            if tokens_left is not None and spent + cost > tokens_left:
+                dropped.append(i)
+                continue
+            spent += cost
+            kept.add(i)
+        dropped.extend(i for i in range(len(costs)) if i not in kept and i not in dropped)
+        return kept, sorted(dropped)
+
+    def _reserve(self, tokens, requests):
+        """检查剩余额度并预占，两步在同一把锁 / 同一个写事务内完成；额度不足时返回 False"""
+        windows = self._windows()
+
+        def fits(used):
+            tokens_left, requests_left = self._left(windows, used)
+            return not ((tokens_left is not None and tokens > tokens_left) or (requests and requests_left == 0))
+
+        with self._reserve_lock:
+            if not self._ledger.reserve(windows, tokens, requests, fits):
+                return False
+            with self._lock:
+                self._refresh['reserved_tokens'] += tokens
+                self._refresh['requests'] += requests
+            return True
+
+    def acquire(self, prompt_tokens):
+        """为一次调用预占额度（估算 token + 1 次请求）；额度不足时返回 None"""
+        estimate = math.ceil(prompt_tokens * (1 + COMPLETION_RATIO))
+        if not self._reserve(estimate, 1):
+            return None
+        with self._lock:
+            self._refresh['estimated_prompt_tokens'] += prompt_tokens
+        return Reservation(estimate)
+
+    def attempt(self, reservation):
+        """每次实际发出请求前调用：第一次请求已由 acquire 预占，之后的每次重试再预占 1 次请求数
+
+        请求数配额用完时返回 False，调用方应停止重试。reservation 为 None（未纳入预算）时总是返回 True。
+        """
+        if reservation is None:
+            return True
+        reservation.attempts += 1
+        if reservation.attempts == 1:
+            return True
+        if self._reserve(0, 1):
+            return True
+        reservation.attempts -= 1
+        return False
+
+    # ==== 调用后 ====
+    def settle(self, reservation, prompt_tokens, completion_tokens, seconds=0.0):
+        """按响应中的实际 usage 结算（同一预占的重试调用累加）；没有 usage 时保留预估值"""
+        actual = (prompt_tokens or 0) + (completion_tokens or 0)
+        cost = ((prompt_tokens or 0) * self.price_prompt_per_1k
+                + (completion_tokens or 0) * self.price_completion_per_1k) / 1000
+        with self._lock:
+            self._refresh['seconds'] += seconds
+            if not actual:
+                return
+            self._refresh['prompt_tokens'] += prompt_tokens or 0
+            self._refresh['completion_tokens'] += completion_tokens or 0
+            self._refresh['cost'] += cost
+            self.cost += cost
+            delta = actual
+            if reservation is not None and not reservation.settled:
+                reservation.settled = True
+                self._refresh['reserved_tokens'] -= reservation.tokens
+                delta = actual - reservation.tokens
+        if reservation is None or delta:
+            self._ledger.add(self._windows(), delta, 0)
+
+    def record_fallback(self, pages):
+        with self._lock:
+            self.fallback_pages += pages
+            self._refresh['fallback_pages'] += pages
+
+    # ==== 统计 ====
+    @staticmethod
+    def _new_refresh():
+        return {'requests': 0, 'estimated_prompt_tokens': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                'reserved_tokens': 0, 'truncated_pages': 0, 'fallback_pages': 0, 'cost': 0.0, 'seconds': 0.0}
+
+    def begin_refresh(self):
+        with self._lock:
+            self._refresh = self._new_refresh()
+
+    def refresh_usage(self):
+        """本轮刷新的用量（调用次数、估算/实际 token、截断与改走简化处理的网页数、费用、模型耗时）"""
+        with self._lock:
+            usage = dict(self._refresh)
+        usage.pop('reserved_tokens')
+        usage['cost'] = round(usage['cost'], 6)
+        usage['seconds'] = round(usage['seconds'], 3)
+        return usage
+
+    def stats(self):
+        hour, day = self._windows()
+        used = self._ledger.load((hour, day))
+        return {
+            'hour': {'tokens': used.get(hour, (0, 0))[0], 'requests': used.get(hour, (0, 0))[1],
+                     'token_limit': self.hourly_tokens or None, 'request_limit': self.hourly_requests or None},
+            'day': {'tokens': used.get(day, (0, 0))[0], 'requests': used.get(day, (0, 0))[1],
+                    'token_limit': self.daily_tokens or None, 'request_limit': self.daily_requests or None},
+            'fallback_pages': self.fallback_pages,
+            'cost': round(self.cost, 6),
+            'last_refresh': self.refresh_usage(),
+        }
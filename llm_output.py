@@ -0,0 +1,314 @@
+"""火山引擎批量加工输出的解析
+
+模型按“原始序号 / 标题 / 摘要 / 分类”逐条输出，多条之间约定用空行分隔，但实际输出常有偏差：
+摘要内部出现空行、字段带 Markdown 列表符或加粗、全角/半角冒号混用、分类写成“[产品发布]”或
+“产品发布/行业动态”、缺少原始序号、末尾一条被截断等。
+
+- RecordParser：按行单遍扫描的状态机，记录边界由字段决定而不是空行——遇到新的原始序号、
+  或当前记录已有同名字段时开始新记录；三个必需字段齐全即产出（流式下不必等到下一条开始）。
+  feed() 接受任意切分的文本增量，逐条产出已完成的记录；close() 产出剩余部分
+- normalize_category：分类只允许 CATEGORIES 中的 5 个取值，无法识别时返回 None
+- TitleIndex：verified() 核对序号对应的网页与记录内容是否吻合（模型把序号写串时常见）；
+  标题与网页标题一致（或互相包含）时直接通过，其余按二元组覆盖比例核对。
+  缺少、写错或核对不通过时，先核对前后相邻记录所对应网页的邻位（模型通常按输入顺序输出），
+  仍对不上再按“标题 + 摘要”与网页“标题 + 摘要”的字符二元组重合度（IDF 加权，取“仅标题”与
+  “标题 + 摘要”两者较高的得分）找最接近的网页；二元组倒排索引在装入网页时构建一次，核对与匹配共用，
+  每条记录只对共享非常见二元组最多的几个候选网页打分；
+  序号与内容对不上、也找不到足够接近的网页的记录丢弃，不按序号硬对应
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from itertools import chain, filterfalse, islice
+from operator import add
+
+CATEGORIES = ('技术突破', '产品发布', '行业动态', '投资融资', '政策法规')
+DEFAULT_CATEGORY = '技术突破'
+
+# 字段行：允许行首的列表符/引用符/编号与 Markdown 加粗，如 “- **标题**：xxx”、“2. 摘要: xxx”
+_FIELD_RE = re.compile(
+    r'^[\s>*#\-•]*(?:\d{1,3}[.、)）]\s*)?[*_【\[]*(原始序号|序号|标题|摘要|分类)[*_】\]]*\s*[:：]\s*(.*?)[\s*_]*$'
+)
+_FIELD_NAMES = {'原始序号': 'index', '序号': 'index', '标题': 'title', '摘要': 'summary', '分类': 'category'}
+_NUMBER_RE = re.compile(r'\d+')
+_CATEGORY_STRIP = '[]【】()（）"“”\'‘’`*_ 　。.'
+_NON_WORD_RE = re.compile(r'[\W_]+')
+_WORD_RE = re.compile(r'[a-z0-9]{3,}')
+
+# 按标题匹配的最低得分（记录二元组中被网页覆盖的 IDF 加权比例）
+MIN_MATCH_SCORE = 0.35
+# 建索引时每个网页摘要参与的最大字数
+INDEX_SUMMARY_CHARS = 160
+# 出现在超过该比例网页中的二元组不用于召回候选（仍参与精确打分），避免常见词把查询退化为全量扫描
+COMMON_GRAM_RATIO = 0.02
+# 网页较少时所有二元组都参与召回
+MIN_COMMON_DF = 8
+# 粗排后精确打分的候选数
+RERANK_CANDIDATES = 8
+# 按序号对应时的内容核对：记录二元组被该网页覆盖的比例低于此值时视为序号可疑，先尝试按标题匹配
+VERIFY_MIN_SCORE = 0.2
+# 按相邻记录推测网页时的覆盖比例下限（没有序号佐证，比序号核对严格；达不到时再按标题匹配）
+HINT_MIN_SCORE = 0.5
+# 序号核对时标题切段的字数：过半的段原样出现在该网页中即视为吻合，不再逐个二元组核对
+VERIFY_CHUNK_CHARS = 4
+_CHUNK_RE = re.compile('.{%d}' % VERIFY_CHUNK_CHARS, re.S)
+# 序号核对时标题二元组出现在该网页中的比例达到该值即视为吻合
+VERIFY_TITLE_SCORE = 0.5
+# 序号核对时每段查找的二元组数（段内查找在 C 层完成，段间判断是否已经够数）
+VERIFY_STEP = 16
+# 标题互相包含即视为吻合时，较短一方的最少字数（太短的标题如“AI”会误判）
+EXACT_TITLE_MIN_CHARS = 6
+
+
+def normalize_category(raw):
+    """返回规范分类；取值不在 CATEGORIES 中（去掉括号后也不包含任何一个）时返回 None"""
+    if not raw:
+        return None
+    value = raw.strip().strip(_CATEGORY_STRIP)
+    if value in CATEGORIES:
+        return value
+    # “产品发布/行业动态”、“分类为产品发布” 等：取最先出现的合法分类
+    found = [(value.find(c), c) for c in CATEGORIES if c in value]
+    return min(found)[1] if found else None
+
+
+def parse_index(raw):
+    match = _NUMBER_RE.search(raw or '')
+    return int(match.group()) if match else None
+
+
+class RecordParser:
+    """按行解析模型输出，产出记录 dict：index（int 或 None）、title、summary、category（原文）"""
+
+    REQUIRED = ('title', 'summary', 'category')
+
+    def __init__(self):
+        self._partial = ''
+        self._current = None
+        self._last_field = None
+
+    def feed(self, text):
+        """喂入一段文本增量，返回其中已完成的记录列表"""
+        if not text:
+            return []
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        done = []
+        for line in lines:
+            self._line(line, done)
+        return done
+
+    def close(self):
+        """输入结束：处理最后一行并产出未完成的记录"""
+        done = []
+        if self._partial:
+            self._line(self._partial, done)
+            self._partial = ''
+        self._flush(done)
+        return done
+
+    def _flush(self, done):
+        if self._current and any(self._current.values()):
+            done.append(self._current)
+        self._current = None
+        self._last_field = None
+
+    def _line(self, line, done):
+        line = line.strip()
+        if not line:
+            return
+        # 绝大多数行是规范的“字段：值”，先用 partition 判断，不规范的再交给正则
+        head, sep, value = line.partition('：')
+        if not sep or head not in _FIELD_NAMES:
+            head, sep, value = line.partition(':')
+        if sep and head in _FIELD_NAMES:
+            field = _FIELD_NAMES[head]
+            value = value.strip()
+        else:
+            match = _FIELD_RE.match(line)
+            if match is None:
+                # 续行：摘要跨行（包括中间夹着空行）时接到摘要后面，其它位置的散行忽略
+                if self._current is not None and self._last_field == 'summary':
+                    self._current['summary'] += '\n' + line
+                return
+            field = _FIELD_NAMES[match.group(1)]
+            value = match.group(2).strip()
+        current = self._current
+        # 新的原始序号只在当前记录已有序号或已进入摘要/分类时才开始新记录（兼容序号写在标题之后）
+        if current is not None and (current[field] or field == 'index' and (current['summary'] or current['category'])):
+            self._flush(done)
+            current = None
+        if current is None:
+            current = self._current = {'index': None, 'title': '', 'summary': '', 'category': ''}
+        current[field] = parse_index(value) if field == 'index' else value
+        self._last_field = field
+        # 必需字段齐全即产出；摘要之后还可能有续行，所以以分类收尾时才立即产出
+        if field != 'summary' and all(map(current.__getitem__, self.REQUIRED)):
+            self._flush(done)
+
+
+def parse_records(text):
+    """一次性解析完整输出"""
+    parser = RecordParser()
+    records = parser.feed(text.replace('\r', '') if text else '')
+    records.extend(parser.close())
+    return records
+
+
+def iter_records(deltas):
+    """流式解析：从文本增量迭代器中逐条产出记录"""
+    parser = RecordParser()
+    for text in deltas:
+        yield from parser.feed(text.replace('\r', ''))
+    yield from parser.close()
+
+
+def _normalize(text):
+    return _NON_WORD_RE.sub('', (text or '').lower())
+
+
+def _grams(text):
+    """去掉空白与标点后的字符二元组（不需要分词），外加完整的英文单词/数字（区分度高，如型号、编号）"""
+    text = (text or '').lower()
+    words = _WORD_RE.findall(text)
+    text = _NON_WORD_RE.sub('', text)
+    if len(text) < 2:
+        return {text} if text else set()
+    grams = set(map(add, text, text[1:]))
+    grams.update(words)
+    return grams
+
+
+class TitleIndex:
+    """网页“标题 + 摘要”的二元组倒排索引，用于核对原始序号、以及在序号不可用时找回对应网页
+
+    positions 限定参与匹配的网页下标（例如当前分块），索引在构造时对这些网页建立一次；
+    claim() 标记已被占用的网页，同一次解析中不会再匹配给其它记录。
+    """
+
+    def __init__(self, webpages, positions=None, min_score=MIN_MATCH_SCORE):
+        self.min_score = min_score
+        self.positions = list(range(len(webpages))) if positions is None else list(positions)
+        self._position_set = set(self.positions)
+        self.claimed = set()
+        self._last_query = (None, None)
+        self._titles = {}        # 下标 -> 规范化的网页标题
+        self._texts = {}         # 下标 -> 网页“标题 + 摘要”（小写）
+        self._grams = {}
+        self._postings = defaultdict(list)
+        for pos in self.positions:
+            page = webpages[pos]
+            name = page.get('name') or ''
+            self._titles[pos] = _normalize(name)
+            text = self._texts[pos] = f"{name} {(page.get('summary') or '')[:INDEX_SUMMARY_CHARS]}".lower()
+            grams = self._grams[pos] = _grams(text)
+            for gram in grams:
+                self._postings[gram].append(pos)
+        total = max(1, len(self._grams))
+        self._idf = {gram: math.log(1 + total / len(posting)) for gram, posting in self._postings.items()}
+        self._max_df = max(MIN_COMMON_DF, int(total * COMMON_GRAM_RATIO))
+        self._rare = {gram for gram, posting in self._postings.items() if len(posting) <= self._max_df}
+        # 查询中未出现在任何网页里的二元组也计入分母
+        self._missing_idf = math.log(1 + total)
+
+    def _query_grams(self, title, summary):
+        """(标题二元组, 标题 + 摘要二元组)；同一条记录通常先 verified() 再 match()，缓存最近一次"""
+        key, grams = self._last_query
+        if key != (title, summary):
+            title_grams = _grams(title)
+            grams = (title_grams, title_grams | _grams(summary))
+            self._last_query = ((title, summary), grams)
+        return grams
+
+    def __contains__(self, pos):
+        return pos in self._position_set
+
+    def available(self, index):
+        """原始序号（从 1 开始）是否对应一个未被占用的网页"""
+        return index is not None and index - 1 in self._position_set and index - 1 not in self.claimed
+
+    def verified(self, index, title, summary='', min_score=VERIFY_MIN_SCORE):
+        """序号对应一个未被占用的网页，且标题与网页标题一致（或互相包含），
+        或记录的二元组被该网页覆盖的比例不低于 min_score"""
+        if not self.available(index):
+            return False
+        pos = index - 1
+        normalized, page_title = _normalize(title), self._titles[pos]
+        shorter, longer = sorted((normalized, page_title), key=len)
+        if shorter == longer or len(shorter) >= EXACT_TITLE_MIN_CHARS and shorter in longer:
+            return True
+        # 在网页原文（小写）中查找子串，不建二元组集合（生成非 ASCII 二元组字符串是主要开销）：
+        # 标题按 VERIFY_CHUNK_CHARS 字切段、过半原样出现（偶然重合的长片段很少），或标题二元组过半出现即通过；
+        # 否则再按“标题 + 摘要”二元组的覆盖比例核对，够数即返回
+        contains = self._texts[pos].__contains__
+        chunks = _CHUNK_RE.findall(normalized)
+        if len(chunks) >= 2 and sum(map(contains, chunks)) * 2 >= len(chunks):
+            return True
+        if len(normalized) > 1:
+            found = set(filter(contains, map(add, normalized, normalized[1:])))
+            if len(found) >= max(min_score, VERIFY_TITLE_SCORE) * (len(normalized) - 1):
+                return True
+        parts = [part for part in (normalized, _normalize(summary)) if part]
+        total = sum(max(1, len(part) - 1) for part in parts)
+        if not total:
+            return True
+        need = min_score * total
+        seen = set()
+        for part in parts:
+            if len(part) == 1:
+                seen.update(filter(contains, (part,)))
+                continue
+            for start in range(0, len(part) - 1, VERIFY_STEP):
+                chunk = part[start:start + VERIFY_STEP + 1]
+                seen.update(filter(contains, map(add, chunk, chunk[1:])))
+                if len(seen) >= need:
+                    return True
+        return len(seen) >= need
+
+    def claim(self, pos):
+        """占用网页；已被占用时返回 False"""
+        if pos in self.claimed:
+            return False
+        self.claimed.add(pos)
+        return True
+
+    def match(self, title, summary='', hints=()):
+        """返回 (网页下标, 得分)；没有达到 min_score 的未占用网页时返回 (None, 最高得分)
+
+        hints 为按相邻记录推测的网页下标（模型通常按输入顺序输出）：先逐个核对，覆盖比例达到
+        HINT_MIN_SCORE 时直接采用（得分记为 HINT_MIN_SCORE），不必建倒排索引。
+        """
+        for pos in hints:
+            if self.verified(pos + 1, title, summary, HINT_MIN_SCORE):
+                return pos, HINT_MIN_SCORE
+        title_grams, query = self._query_grams(title, summary)
+        if not query:
+            return None, 0.0
+        idf, missing_idf = self._idf, self._missing_idf
+        # 查询中未出现在任何网页里的二元组也计入分母
+        known = query & idf.keys()
+        norm = sum(map(idf.__getitem__, known)) + (len(query) - len(known)) * missing_idf
+        title_known = title_grams & known
+        title_norm = sum(map(idf.__getitem__, title_known)) + (len(title_grams) - len(title_known)) * missing_idf
+        # 先按共享的非常见二元组个数粗排（计数在 C 层完成），再对前 RERANK_CANDIDATES 个候选按 IDF 精确打分；
+        # 非常见二元组的 IDF 相差不大，粗排不加权足以把正确网页排进候选
+        rough = Counter(chain.from_iterable(map(self._postings.__getitem__, query & self._rare)))
+        # 同分按下标排序，结果不受集合遍历顺序影响
+        ranked = sorted(sorted(rough), key=rough.__getitem__, reverse=True)
+        claimed = self.claimed
+        candidates = list(islice(filterfalse(claimed.__contains__, ranked), RERANK_CANDIDATES))
+        if not candidates:
+            # 只有常见二元组可用（查询很短）时退回全量打分
+            candidates = [pos for pos in self._grams if pos not in claimed]
+        best, best_score = None, 0.0
+        for pos in sorted(candidates):
+            grams = self._grams[pos]
+            # 集合求交在 C 层完成，只对共有的二元组累加权重
+            score = sum(map(idf.__getitem__, query & grams)) / norm
+            if title_norm:
+                score = max(score, sum(map(idf.__getitem__, title_grams & grams)) / title_norm)
+            if score > best_score:
+                best, best_score = pos, score
+        if best is None or best_score < self.min_score:
+            return None, best_score
+        return best, best_score
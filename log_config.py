@@ -0,0 +1,42 @@
+"""日志配置：LOG_LEVEL 控制级别，LOG_FORMAT=json 时每行输出一条 JSON（便于日志系统采集）
+
+调用方使用 %s 占位符传参（logger.debug('... %s', value)），级别关闭时不会格式化消息。
+"""
+import json
+import logging
+import time
+
+# LogRecord 的内置属性；其余通过 extra= 传入的字段原样写入 JSON
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def configure_logging(level='INFO', fmt='text'):
+    """配置根 logger（重复调用只保留一个处理器）"""
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    handler = logging.StreamHandler()
+    if str(fmt).lower() == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+    for existing in list(root.handlers):
+        if getattr(existing, '_ai_news', False):
+            root.removeHandler(existing)
+    handler._ai_news = True
+    root.addHandler(handler)
@@ -0,0 +1,187 @@
+"""轻量指标原语（无第三方依赖）
+
+- Histogram：累积分桶直方图
+- Counter / Gauge / HistogramFamily：可带标签的计数器、瞬时值与直方图组
+- CallbackMetric：采集时才取值，适合暴露其它组件已有的统计
+- Registry：注册指标并输出 Prometheus 文本格式
+"""
+import bisect
+import threading
+
+# 默认延迟分桶（秒）
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Histogram:
+    """累积分桶直方图：记录观测值的分布、总和与次数"""
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """返回 {'buckets': [(上界, 累计次数), ...], 'sum', 'count'}，最后一个上界为 +Inf"""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = []
+        running = 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            running += n
+            cumulative.append((bound, running))
+        return {'buckets': cumulative, 'sum': total, 'count': count}
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class Counter:
+    """单调递增计数器，可带标签：inc(amount, 标签值...)"""
+
+    kind = 'counter'
+
+    def __init__(self, labelnames=()):
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labelvalues):
+        key = tuple(str(v) for v in labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield '', key, (), value
+
+
+class Gauge(Counter):
+    """可增可减的瞬时值"""
+
+    kind = 'gauge'
+
+    def set(self, value, *labelvalues):
+        key = tuple(str(v) for v in labelvalues)
+        with self._lock:
+            self._values[key] = value
+
+
+class CallbackMetric:
+    """采集时才调用 fn() 取值的指标；fn 返回数值，或 {标签值元组: 数值}"""
+
+    def __init__(self, kind, fn, labelnames=()):
+        self.kind = kind
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        value = self.fn()
+        if isinstance(value, dict):
+            for key, v in sorted(value.items()):
+                yield '', tuple(str(k) for k in (key if isinstance(key, tuple) else (key,))), (), v
+        elif value is not None:
+            yield '', (), (), value
+
+
+class HistogramFamily:
+    """按标签拆分的一组直方图：observe(value, 标签值...)；也可包装已有的 Histogram"""
+
+    kind = 'histogram'
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS, labelnames=(), histogram=None):
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._children = {(): histogram} if histogram is not None else {}
+        self._lock = threading.Lock()
+
+    def labels(self, *labelvalues):
+        key = tuple(str(v) for v in labelvalues)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, Histogram(self.buckets))
+        return child
+
+    def observe(self, value, *labelvalues):
+        self.labels(*labelvalues).observe(value)
+
+    def samples(self):
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            snap = child.snapshot()
+            for bound, count in snap['buckets']:
+                yield '_bucket', key, (('le', _format_value(float(bound))),), count
+            yield '_sum', key, (), snap['sum']
+            yield '_count', key, (), snap['count']
+
+
+class Registry:
+    """指标注册表，render() 输出 Prometheus 文本格式（text/plain; version=0.0.4）"""
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, name, help_text, metric):
+        with self._lock:
+            self._metrics.append((self.prefix + name, help_text, metric))
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(name, help_text, Counter(labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self.register(name, help_text, Gauge(labelnames))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_LATENCY_BUCKETS, labelnames=()):
+        return self.register(name, help_text, HistogramFamily(buckets, labelnames))
+
+    def callback(self, name, help_text, kind, fn, labelnames=()):
+        return self.register(name, help_text, CallbackMetric(kind, fn, labelnames))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for name, help_text, metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                # 单个指标采集失败不影响其它指标
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for suffix, key, extra, value in samples:
+                labels = _format_labels(metric.labelnames, key, extra)
+                lines.append(f'{name}{suffix}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
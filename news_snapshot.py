@@ -0,0 +1,186 @@
+"""文章快照：每一代（generation）文章只序列化一次
+
+快照安装时预先生成 /api/news 的 JSON 字节、ETag 以及压缩体；
+单篇文章与相关文章的响应在首次请求时生成并缓存在该代快照上，
+快照被替换后旧缓存随之释放。
+
+同时按 (created_at, id) 建立全量、分类、来源、分类+来源的有序索引，
+分页与过滤查询只需二分定位后切片，不必逐篇扫描。
+"""
+import base64
+import binascii
+import gzip
+import hashlib
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 小于该字节数的响应不压缩
+MIN_COMPRESS_SIZE = 1024
+
+
+class EncodedBody:
+    """预编码的响应体：原始字节 + ETag + 按需生成并缓存的 gzip/br 压缩体"""
+
+    __slots__ = ('raw', 'etag', '_encoded', '_lock')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.etag = hashlib.sha1(raw).hexdigest()[:20]
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_json(cls, payload):
+        return cls(json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    def encoded(self, encoding):
+        """返回指定编码（'br' / 'gzip'）的字节；不支持或不值得压缩时返回 None"""
+        if len(self.raw) < MIN_COMPRESS_SIZE:
+            return None
+        if encoding == 'br' and brotli is None:
+            return None
+        body = self._encoded.get(encoding)
+        if body is None:
+            with self._lock:
+                body = self._encoded.get(encoding)
+                if body is None:
+                    if encoding == 'br':
+                        body = brotli.compress(self.raw, quality=5)
+                    elif encoding == 'gzip':
+                        body = gzip.compress(self.raw, compresslevel=6, mtime=0)
+                    else:
+                        return None
+                    self._encoded[encoding] = body
+        return body
+
+
+class InvalidCursor(ValueError):
+    """分页游标无法解析"""
+
+
+def encode_cursor(key):
+    raw = json.dumps(list(key), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, aid = json.loads(raw.decode('utf-8'))
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(created_at, str) or not isinstance(aid, str):
+        raise InvalidCursor(cursor)
+    return created_at, aid
+
+
+def _sort_key(article):
+    return (article.get('created_at') or '', article['id'])
+
+
+class NewsSnapshot:
+    """一代不可变的文章集合"""
+
+    def __init__(self, generation, articles, last_update):
+        self.generation = generation
+        self.articles = articles
+        self.last_update = last_update
+        self.by_id = {article['id']: article for article in articles}
+        self.list_body = EncodedBody.from_json({
+            'success': True,
+            'data': articles,
+            'count': len(articles),
+            'last_update': last_update,
+        })
+        self._bodies = {}
+        self._lock = threading.Lock()
+        self._build_indexes()
+
+    def _build_indexes(self):
+        """按 (created_at, id) 升序建立各维度的有序列表；查询时从尾部向前取即为最新优先"""
+        ordered = sorted(self.articles, key=_sort_key)
+        indexes = {(): ordered}
+        for article in ordered:
+            category = article.get('category') or ''
+            source = article.get('source') or ''
+            indexes.setdefault(('category', category), []).append(article)
+            indexes.setdefault(('source', source), []).append(article)
+            indexes.setdefault(('category', category, 'source', source), []).append(article)
+        self._indexes = {name: (items, [_sort_key(a) for a in items]) for name, items in indexes.items()}
+
+    def query(self, category=None, source=None, since=None, until=None, cursor=None, limit=50):
+        """按发布时间倒序分页查询，返回 (文章列表, 下一页游标或 None, 满足条件的总数)
+
+        since / until 与 created_at 做字符串比较（'YYYY-MM-DD' 或 'YYYY-MM-DD HH:MM:SS'，含端点）；
+        cursor 为上一页返回的游标，InvalidCursor 表示游标无法解析。
+        """
+        name = ()
+        if category and source:
+            name = ('category', category, 'source', source)
+        elif category:
+            name = ('category', category)
+        elif source:
+            name = ('source', source)
+        items, keys = self._indexes.get(name, ((), ()))
+        lo = bisect_left(keys, (since, '')) if since else 0
+        hi = bisect_right(keys, (until + '\uffff',)) if until else len(keys)
+        total = max(0, hi - lo)
+        if cursor:
+            hi = min(hi, bisect_left(keys, decode_cursor(cursor)))
+        start = max(lo, hi - max(1, limit))
+        page = items[start:hi][::-1]
+        next_cursor = encode_cursor(keys[start]) if page and start > lo else None
+        return page, next_cursor, total
+
+    def cached_body(self, key, build):
+        """按 key 缓存本代快照上的派生响应体；build() 返回 JSON 可序列化对象"""
+        body = self._bodies.get(key)
+        if body is None:
+            body = EncodedBody.from_json(build())
+            with self._lock:
+                body = self._bodies.setdefault(key, body)
+        return body
+
+
+class RenderCache:
+    """渲染结果（HTML）缓存：键为 (页面, 快照代号)，值为 EncodedBody，按最近使用淘汰
+
+    同一代快照内的页面只渲染一次；gzip / br 压缩体随 EncodedBody 一起缓存，热点页面直接返回字节。
+    快照换代后旧键不再命中，随 LRU 自然淘汰。
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key, generation, render):
+        """render() 返回 HTML 字符串；返回对应的 EncodedBody"""
+        cache_key = (key, generation)
+        with self._lock:
+            body = self._entries.get(cache_key)
+            if body is not None:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return body
+            self.misses += 1
+        body = EncodedBody(render().encode('utf-8'))
+        with self._lock:
+            body = self._entries.setdefault(cache_key, body)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,446 @@
+"""新闻快照的本地持久化（SQLite）
+
+每次成功获取新闻后写入一份完整快照，进程重启时直接加载最近一份，
+无需等待博查 + 火山引擎的完整往返即可对外提供数据。
+
+数据库使用 WAL 模式，可被多个 gunicorn worker 同时读写：
+- 快照代号（generation）单调递增，其它 worker 轮询代号即可发现新数据
+- leases 表提供简单的租约选主，只有持有租约的 worker 调用上游
+- refresh_jobs 表保存异步刷新任务的状态，任意 worker 都能查询
+- refresh_requests 表是其它 worker 提交给刷新 worker 的刷新请求队列，刷新 worker 轮询领取
+- llm_usage 表按小时/天累计模型 token 与请求数，配额在重启和多 worker 之间共享
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class SnapshotStore:
+    """基于 SQLite 的快照存储。每次写入在单个事务中完成，读写互不阻塞。"""
+
+    def __init__(self, path, keep=5):
+        self.path = path
+        self.keep = max(1, keep)
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS snapshots ("
+                    " generation INTEGER PRIMARY KEY AUTOINCREMENT,"
+                    " created_at TEXT NOT NULL,"
+                    " saved_ts REAL NOT NULL,"
+                    " articles TEXT NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS leases ("
+                    " name TEXT PRIMARY KEY,"
+                    " owner TEXT NOT NULL,"
+                    " expires_ts REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS refresh_jobs ("
+                    " id TEXT PRIMARY KEY,"
+                    " updated_ts REAL NOT NULL,"
+                    " state TEXT NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS refresh_requests ("
+                    " id TEXT PRIMARY KEY,"
+                    " requested_ts REAL NOT NULL,"
+                    " claimed_by TEXT,"
+                    " finished_ts REAL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_usage ("
+                    " bucket TEXT PRIMARY KEY,"
+                    " tokens INTEGER NOT NULL,"
+                    " requests INTEGER NOT NULL,"
+                    " updated_ts REAL NOT NULL)"
+                )
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def save(self, articles, created_at):
+        """原子写入一份快照，返回新的代号（generation）。只保留最近 keep 份。"""
+        payload = json.dumps(articles, ensure_ascii=False)
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    cur = conn.execute(
+                        "INSERT INTO snapshots (created_at, saved_ts, articles) VALUES (?, ?, ?)",
+                        (created_at, time.time(), payload),
+                    )
+                    generation = cur.lastrowid
+                    conn.execute(
+                        "DELETE FROM snapshots WHERE generation <= ?",
+                        (generation - self.keep,),
+                    )
+                return generation
+            finally:
+                conn.close()
+
+    def latest_generation(self):
+        """最新快照代号（没有快照时为 0），供其它 worker 低成本轮询"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT MAX(generation) FROM snapshots").fetchone()
+        finally:
+            conn.close()
+        return row[0] or 0
+
+    def latest_saved_ts(self):
+        """最新快照的写入时间（Unix 时间戳，没有快照时为 None），供调度判断是否错过了刷新"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT MAX(saved_ts) FROM snapshots").fetchone()
+        finally:
+            conn.close()
+        return row[0]
+
+    def try_acquire_lease(self, name, owner, ttl_seconds):
+        """尝试获取或续期租约。租约空闲、已过期或本来就属于 owner 时成功。"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT owner, expires_ts FROM leases WHERE name = ?", (name,)
+            ).fetchone()
+            if row and row[0] != owner and row[1] > now:
+                conn.rollback()
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (name, owner, expires_ts) VALUES (?, ?, ?)",
+                (name, owner, now + ttl_seconds),
+            )
+            conn.commit()
+            return True
+        except sqlite3.OperationalError:
+            # 数据库被其它 worker 锁住时视为本轮竞选失败
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+
+    def release_lease(self, name, owner):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+        finally:
+            conn.close()
+
+    def save_job(self, job_id, state, keep=50):
+        """写入（覆盖）刷新任务状态，只保留最近 keep 个任务"""
+        payload = json.dumps(state, ensure_ascii=False)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO refresh_jobs (id, updated_ts, state) VALUES (?, ?, ?)",
+                    (job_id, time.time(), payload),
+                )
+                conn.execute(
+                    "DELETE FROM refresh_jobs WHERE id NOT IN"
+                    " (SELECT id FROM refresh_jobs ORDER BY updated_ts DESC LIMIT ?)",
+                    (keep,),
+                )
+        finally:
+            conn.close()
+
+    def load_job(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT state FROM refresh_jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def recent_jobs(self, since_ts):
+        """updated_ts 不早于 since_ts 的任务，返回 [(updated_ts, 任务状态)]，按更新时间升序"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT updated_ts, state FROM refresh_jobs WHERE updated_ts >= ? ORDER BY updated_ts",
+                (since_ts,),
+            ).fetchall()
+        finally:
+            conn.close()
+        jobs = []
+        for updated_ts, state in rows:
+            try:
+                jobs.append((updated_ts, json.loads(state)))
+            except ValueError:
+                continue
+        return jobs
+
+    def request_refresh(self, request_id):
+        """登记一次刷新请求（由不持有租约的 worker 调用），等待刷新 worker 领取执行"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO refresh_requests (id, requested_ts) VALUES (?, ?)",
+                    (request_id, time.time()),
+                )
+        finally:
+            conn.close()
+
+    def claim_refresh_requests(self, owner, max_age_seconds):
+        """领取所有未被领取、且提交时间在 max_age_seconds 以内的刷新请求，返回请求ID列表（按提交顺序）
+
+        过期未领取的请求与早已完成的请求顺带清理。
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM refresh_requests WHERE requested_ts < ? AND (claimed_by IS NULL OR finished_ts IS NOT NULL)",
+                (now - max_age_seconds,),
+            )
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM refresh_requests WHERE claimed_by IS NULL ORDER BY requested_ts"
+            ).fetchall()]
+            if ids:
+                conn.executemany(
+                    "UPDATE refresh_requests SET claimed_by = ? WHERE id = ?", [(owner, i) for i in ids]
+                )
+            conn.commit()
+            return ids
+        except sqlite3.OperationalError:
+            # 数据库被其它 worker 锁住时下一轮再领取
+            conn.rollback()
+            return []
+        finally:
+            conn.close()
+
+    def finish_refresh_requests(self, request_ids):
+        """标记刷新请求已执行完毕，提交请求的 worker 据此停止等待"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE refresh_requests SET finished_ts = ? WHERE id = ?",
+                    [(time.time(), i) for i in request_ids],
+                )
+        finally:
+            conn.close()
+
+    def refresh_request_finished(self, request_id):
+        """刷新请求是否已执行完毕；请求不存在（已过期被清理）时也视为结束"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT finished_ts FROM refresh_requests WHERE id = ?", (request_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return row is None or row[0] is not None
+
+    @staticmethod
+    def _add_usage(conn, windows, tokens, requests, keep_seconds):
+        now = time.time()
+        for window in windows:
+            conn.execute(
+                "INSERT INTO llm_usage (bucket, tokens, requests, updated_ts) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(bucket) DO UPDATE SET tokens = tokens + excluded.tokens,"
+                " requests = requests + excluded.requests, updated_ts = excluded.updated_ts",
+                (window, tokens, requests, now),
+            )
+        conn.execute("DELETE FROM llm_usage WHERE updated_ts < ?", (now - keep_seconds,))
+
+    @staticmethod
+    def _load_usage(conn, windows):
+        windows = list(windows)
+        marks = ','.join('?' * len(windows))
+        rows = conn.execute(
+            f"SELECT bucket, tokens, requests FROM llm_usage WHERE bucket IN ({marks})", windows
+        ).fetchall()
+        return {window: (tokens, requests) for window, tokens, requests in rows}
+
+    def add_usage(self, windows, tokens, requests, keep_seconds=3 * 86400):
+        """把 token 数与请求数累加到各个时间窗口（如 'h:2024-05-01T10'、'd:2024-05-01'）"""
+        conn = self._connect()
+        try:
+            with conn:
+                self._add_usage(conn, windows, tokens, requests, keep_seconds)
+        finally:
+            conn.close()
+
+    def reserve_usage(self, windows, tokens, requests, fits, keep_seconds=3 * 86400):
+        """在同一个写事务（BEGIN IMMEDIATE）内读取各窗口用量，fits(用量) 为真时才累加；返回是否预占成功
+
+        多个 worker 同时预占时后到的一方会读到先到一方的累加结果，不会一起越过配额。
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if not fits(self._load_usage(conn, windows)):
+                conn.rollback()
+                return False
+            self._add_usage(conn, windows, tokens, requests, keep_seconds)
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def load_usage(self, windows):
+        """返回 {窗口: (tokens, requests)}，没有记录的窗口不出现"""
+        conn = self._connect()
+        try:
+            return self._load_usage(conn, windows)
+        finally:
+            conn.close()
+
+    def load_latest(self):
+        """读取最近一份快照，返回 dict(generation, created_at, articles)；没有时返回 None。"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT generation, created_at, articles FROM snapshots"
+                " ORDER BY generation DESC LIMIT 1"
+            ).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        try:
+            articles = json.loads(row[2])
+        except ValueError:
+            return None
+        return {'generation': row[0], 'created_at': row[1], 'articles': articles}
+
+
+class EnrichmentCache:
+    """火山引擎加工结果的持久化备忘录（与快照共用同一个 SQLite 文件）
+
+    以“归一化 URL + 原始摘要”的哈希为键，保存生成的标题、摘要和分类；
+    标题为空表示该网页曾被模型判定为无关，同样缓存以免重复发送。
+    条目超过 ttl 视为未命中；总数超过 max_entries 时按最近访问时间淘汰（LRU）。
+    """
+
+    def __init__(self, path, ttl_seconds, max_entries):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS enrichment_cache ("
+                    " key TEXT PRIMARY KEY,"
+                    " title TEXT NOT NULL,"
+                    " summary TEXT NOT NULL,"
+                    " category TEXT NOT NULL,"
+                    " created_ts REAL NOT NULL,"
+                    " accessed_ts REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_enrichment_accessed"
+                    " ON enrichment_cache (accessed_ts)"
+                )
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get_many(self, keys):
+        """批量查询，返回 {key: {'title','summary','category'}}，只包含未过期的命中项"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        conn = self._connect()
+        try:
+            with conn:
+                for start in range(0, len(keys), 500):
+                    batch = keys[start:start + 500]
+                    marks = ','.join('?' * len(batch))
+                    rows = conn.execute(
+                        f"SELECT key, title, summary, category FROM enrichment_cache"
+                        f" WHERE key IN ({marks}) AND created_ts >= ?",
+                        (*batch, now - self.ttl_seconds),
+                    ).fetchall()
+                    for key, title, summary, category in rows:
+                        found[key] = {'title': title, 'summary': summary, 'category': category}
+                if found:
+                    conn.executemany(
+                        "UPDATE enrichment_cache SET accessed_ts = ? WHERE key = ?",
+                        [(now, key) for key in found],
+                    )
+        finally:
+            conn.close()
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries):
+        """批量写入 {key: {'title','summary','category'}}，并执行过期清理与 LRU 淘汰"""
+        if not entries:
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO enrichment_cache"
+                    " (key, title, summary, category, created_ts, accessed_ts)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [(key, v.get('title', ''), v.get('summary', ''), v.get('category', ''), now, now)
+                     for key, v in entries.items()],
+                )
+                conn.execute(
+                    "DELETE FROM enrichment_cache WHERE created_ts < ?", (now - self.ttl_seconds,)
+                )
+                total = conn.execute("SELECT COUNT(*) FROM enrichment_cache").fetchone()[0]
+                overflow = total - self.max_entries
+                if overflow > 0:
+                    conn.execute(
+                        "DELETE FROM enrichment_cache WHERE key IN ("
+                        " SELECT key FROM enrichment_cache ORDER BY accessed_ts LIMIT ?)",
+                        (overflow,),
+                    )
+                    with self._lock:
+                        self.evictions += overflow
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
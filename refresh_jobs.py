@@ -0,0 +1,255 @@
+"""异步刷新任务：POST /api/refresh 立即返回任务ID，刷新在后台线程中执行
+
+- 同一时刻最多一个任务在途；在途期间重复提交返回同一个任务（与单飞合并一致）
+- 刷新流程通过 progress(stage, **info) 上报阶段：searching -> enriching -> publishing，
+  以 done / failed 结束；没有任务在途时（例如定时刷新）只记录当前阶段，
+  随后提交的任务直接从该阶段开始
+- 阶段变化与结束时回调 on_change(事件类型, 任务)，用于 SSE 推送
+- 提供 store（SnapshotStore）时任务状态同时写入共享库，多 worker 部署下任意 worker 都能查询
+- 多 worker 部署时任务由持有租约的刷新 worker 执行：其它 worker 上提交的任务只写入共享库并登记刷新请求
+  （delegate() 为真时），刷新 worker 领取后 adopt() 接手同一个任务ID，进度照常写回共享库；
+  各 worker 的协调线程定期 relay()，把其它 worker 写入的阶段变化转发给本进程的 SSE 订阅者
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('searching', 'enriching', 'publishing')
+TERMINAL = ('done', 'failed')
+
+
+def _now_str():
+    return time.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class RefreshJobs:
+    def __init__(self, run, store=None, on_change=None, history=20, delegate=None, stale_seconds=300):
+        self._run = run
+        self._store = store
+        self._on_change = on_change
+        self._history = max(1, history)
+        self._delegate = delegate
+        self._stale_seconds = stale_seconds
+        self._jobs = OrderedDict()
+        self._active = None
+        self._current = None  # 当前在途刷新的 (阶段, 进度)，与是否有任务无关
+        self._lock = threading.Lock()
+        # 已推送给本进程订阅者的任务状态 {任务ID: (state, stage)}，relay() 据此只转发变化
+        self._announced = OrderedDict()
+        self._relay_since = time.time()
+
+    def start(self):
+        """提交刷新任务，返回 (任务, 是否新建)；已有任务在途（本进程或共享库中）时返回该任务"""
+        with self._lock:
+            if self._active is not None:
+                return self._public(self._active), False
+        shared = self._shared_active()
+        if shared is not None:
+            return shared, False
+        if self._delegate is not None and self._delegate():
+            # 本进程不是刷新 worker：任务写入共享库并登记刷新请求，由刷新 worker 接手执行
+            job = self._public(self._new_job())
+            self._persist(job)
+            self._store.request_refresh(job['id'])
+            return job, True
+        with self._lock:
+            if self._active is not None:
+                return self._public(self._active), False
+            job = self._activate(self._new_job())
+            snapshot = self._public(job)
+        self._persist(snapshot)
+        threading.Thread(target=self._execute, args=(job,), name='refresh-job', daemon=True).start()
+        return snapshot, True
+
+    @staticmethod
+    def _new_job():
+        return {
+            'id': uuid.uuid4().hex[:12],
+            'state': 'queued',
+            'stage': None,
+            'progress': {},
+            'created_at': _now_str(),
+            'finished_at': None,
+            'seconds': None,
+            'result': None,
+        }
+
+    def _activate(self, job):
+        """把任务设为本进程的在途任务（调用方持有锁）；刷新已在途时直接从当前阶段开始"""
+        job['_started'] = time.perf_counter()
+        job['_aliases'] = []
+        if self._current is not None:
+            job['state'] = 'running'
+            job['stage'], progress = self._current
+            job['progress'] = dict(progress)
+        self._active = job
+        self._jobs[job['id']] = job
+        while len(self._jobs) > self._history:
+            self._jobs.popitem(last=False)
+        return job
+
+    def _shared_active(self):
+        """共享库中其它 worker 提交、尚未结束的任务（超过 stale_seconds 未更新的视为已失效）"""
+        if self._store is None:
+            return None
+        try:
+            jobs = self._store.recent_jobs(time.time() - self._stale_seconds)
+        except Exception:
+            return None
+        for _, job in reversed(jobs):
+            if job.get('state') not in TERMINAL:
+                return job
+        return None
+
+    def _execute(self, job):
+        try:
+            self._run()
+        except Exception as e:
+            self.progress('failed', error=str(e))
+        self.settle(job['id'])
+
+    def settle(self, job_id):
+        """刷新结束后收尾：刷新未实际执行（例如被最小间隔节流）时不会上报结束阶段，这里记为 skipped"""
+        with self._lock:
+            pending = self._active is not None and self._active['id'] == job_id
+        if pending:
+            self.progress('done', status='skipped')
+
+    def adopt(self, job_ids):
+        """刷新 worker 接手其它 worker 提交的任务（任务ID即刷新请求ID），返回接手后的任务ID
+
+        已有任务在途时并入该任务；同时接手多个任务时共用一次刷新，进度与结果同样写入各自的任务ID。
+        不是任务的请求（例如同步刷新接口提交的）被忽略，没有可接手的任务时返回 None。
+        """
+        found = []
+        for job_id in job_ids:
+            try:
+                job = self._store.load_job(job_id) if self._store is not None else None
+            except Exception:
+                job = None
+            if job and job.get('state') not in TERMINAL:
+                found.append(job)
+        if not found:
+            return None
+        with self._lock:
+            job = self._active
+            if job is None:
+                job = self._activate(found.pop(0))
+            job['_aliases'].extend(other['id'] for other in found)
+            snapshot, aliases = self._public(job), list(job['_aliases'])
+        self._persist(snapshot, aliases)
+        logger.info("接手刷新任务 %s", ', '.join([snapshot['id']] + aliases))
+        return snapshot['id']
+
+    def progress(self, stage, **info):
+        """上报在途刷新的阶段与进度；stage 为 done / failed 时结束当前任务"""
+        with self._lock:
+            terminal = stage in TERMINAL
+            if terminal:
+                self._current = None
+            elif self._current is None or self._current[0] != stage:
+                self._current = (stage, dict(info))
+            else:
+                self._current[1].update(info)
+            job = self._active
+            if job is None:
+                return
+            changed = terminal or job['stage'] != stage
+            aliases = list(job['_aliases'])
+            if terminal:
+                job['state'] = stage
+                job['result'] = info
+                job['finished_at'] = _now_str()
+                job['seconds'] = round(time.perf_counter() - job['_started'], 3)
+                self._active = None
+            else:
+                job['state'] = 'running'
+                if job['stage'] != stage:
+                    job['stage'] = stage
+                    job['progress'] = {}
+                job['progress'].update(info)
+            snapshot = self._public(job)
+            if changed:
+                for job_id in [job['id']] + aliases:
+                    self._announce(job_id, snapshot)
+        self._persist(snapshot, aliases)
+        if changed:
+            self._notify(snapshot)
+            for job_id in aliases:
+                self._notify(dict(snapshot, id=job_id))
+
+    def relay(self):
+        """把共享库中其它 worker 写入的任务阶段变化推送给本进程的订阅者（由协调线程定期调用）"""
+        if self._store is None or self._on_change is None:
+            return
+        since = self._relay_since
+        try:
+            jobs = self._store.recent_jobs(since)
+        except Exception:
+            return
+        pending = []
+        with self._lock:
+            for updated_ts, job in jobs:
+                self._relay_since = max(self._relay_since, updated_ts)
+                # 排队中的任务还没有阶段可报，本进程自己推送过的状态也不重复推送
+                if job.get('state') == 'queued' or not self._announce(job.get('id'), job):
+                    continue
+                pending.append(job)
+        for job in pending:
+            self._notify(job)
+
+    def _announce(self, job_id, job):
+        """记录已推送的任务状态（调用方持有锁）；与上次推送的相同时返回 False"""
+        key = (job.get('state'), job.get('stage'))
+        if self._announced.get(job_id) == key:
+            return False
+        self._announced[job_id] = key
+        self._announced.move_to_end(job_id)
+        while len(self._announced) > self._history:
+            self._announced.popitem(last=False)
+        return True
+
+    def _notify(self, job):
+        if not self._on_change:
+            return
+        try:
+            self._on_change('refresh_complete' if job['state'] in TERMINAL else 'refresh_progress', job)
+        except Exception:
+            pass
+
+    def get(self, job_id):
+        """任务状态；本进程没有时查共享库，都没有返回 None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return self._public(job)
+        if self._store is not None:
+            try:
+                return self._store.load_job(job_id)
+            except Exception:
+                return None
+        return None
+
+    def active(self):
+        with self._lock:
+            return self._public(self._active) if self._active else None
+
+    @staticmethod
+    def _public(job):
+        public = {k: v for k, v in job.items() if not k.startswith('_')}
+        public['progress'] = dict(job['progress'])
+        return public
+
+    def _persist(self, job, aliases=()):
+        if self._store is None:
+            return
+        try:
+            self._store.save_job(job['id'], job)
+            for job_id in aliases:
+                self._store.save_job(job_id, dict(job, id=job_id))
+        except Exception:
+            pass
@@ -0,0 +1,143 @@
+"""相关文章推荐：基于内容相似度的预计算近邻
+
+- 标题 + 摘要按检索索引同样的规则切词（中文二元组 + 英文单词），
+  经特征哈希映射到固定维度，做 TF-IDF 加权并 L2 归一化
+- 每次刷新完成后整体计算一次余弦相似度矩阵，为每篇文章保存 top-k 近邻，
+  接口只做字典查询
+- 安装了 NumPy 时用分块矩阵乘法；否则退化为纯 Python 的稀疏倒排累加，结果一致
+"""
+import heapq
+import math
+import threading
+import time
+import zlib
+
+from search_index import tokenize, TITLE_WEIGHT
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# NumPy 路径每次参与矩阵乘法的行数，限制相似度块的内存占用
+BLOCK_ROWS = 512
+# 出现在超过该比例文章中的特征视为停用词（区分度低，却占据大部分相似度计算量）；
+# 文章数少于 MAX_DF_MIN_DOCS 时不做截断：小样本下的文档频率没有统计意义，截断会删掉同一话题的共有词
+MAX_DF_RATIO = 0.2
+MAX_DF_MIN_DOCS = 50
+
+
+def _features(article, dims):
+    """哈希后的词频向量 {维度: 加权词频}；用 crc32 保证各 worker 结果一致"""
+    freqs = {}
+    for weight, text in ((TITLE_WEIGHT, article.get('title', '')), (1, article.get('summary', ''))):
+        for token in tokenize(text):
+            slot = zlib.crc32(token.encode('utf-8')) % dims
+            freqs[slot] = freqs.get(slot, 0) + weight
+    return freqs
+
+
+def _tfidf_vectors(articles, dims):
+    """返回每篇文章的稀疏 TF-IDF 向量（已 L2 归一化）"""
+    raw = [_features(article, dims) for article in articles]
+    df = {}
+    for freqs in raw:
+        for slot in freqs:
+            df[slot] = df.get(slot, 0) + 1
+    n = len(raw)
+    max_df = int(n * MAX_DF_RATIO) if n >= MAX_DF_MIN_DOCS else n
+    idf = {slot: math.log((1 + n) / (1 + count)) + 1 for slot, count in df.items() if count <= max_df}
+    vectors = []
+    for freqs in raw:
+        vec = {slot: (1 + math.log(tf)) * idf[slot] for slot, tf in freqs.items() if slot in idf}
+        norm = math.sqrt(sum(v * v for v in vec.values()))
+        if norm:
+            vec = {slot: v / norm for slot, v in vec.items()}
+        vectors.append(vec)
+    return vectors
+
+
+def _neighbors_numpy(vectors, dims, top_k, min_score):
+    n = len(vectors)
+    matrix = numpy.zeros((n, dims), dtype=numpy.float32)
+    for row, vec in enumerate(vectors):
+        if vec:
+            matrix[row, list(vec)] = list(vec.values())
+    result = []
+    k = min(top_k, n - 1)
+    for start in range(0, n, BLOCK_ROWS):
+        block = matrix[start:start + BLOCK_ROWS] @ matrix.T
+        rows = numpy.arange(block.shape[0])
+        block[rows, rows + start] = -1.0
+        if k <= 0:
+            result.extend([] for _ in rows)
+            continue
+        top = numpy.argpartition(-block, k - 1, axis=1)[:, :k]
+        scores = numpy.take_along_axis(block, top, axis=1)
+        order = numpy.argsort(-scores, axis=1, kind='stable')
+        top = numpy.take_along_axis(top, order, axis=1).tolist()
+        scores = numpy.take_along_axis(scores, order, axis=1).tolist()
+        for cols, values in zip(top, scores):
+            result.append([(col, value) for col, value in zip(cols, values) if value >= min_score])
+    return result
+
+
+def _neighbors_python(vectors, top_k, min_score):
+    postings = {}
+    for doc, vec in enumerate(vectors):
+        for slot, weight in vec.items():
+            postings.setdefault(slot, []).append((doc, weight))
+    result = []
+    for doc, vec in enumerate(vectors):
+        scores = {}
+        for slot, weight in vec.items():
+            for other, other_weight in postings[slot]:
+                if other != doc:
+                    scores[other] = scores.get(other, 0.0) + weight * other_weight
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], -item[0]))
+        result.append([(other, score) for other, score in best if score >= min_score])
+    return result
+
+
+class RelatedIndex:
+    """每次刷新后整体重建的近邻表：{文章ID: [(相关文章ID, 相似度), ...]}"""
+
+    def __init__(self, top_k=3, min_score=0.1, dims=4096):
+        self.top_k = max(1, top_k)
+        self.min_score = min_score
+        self.dims = max(64, dims)
+        self._neighbors = {}
+        self._lock = threading.Lock()
+        self.last_build = {'articles': 0, 'seconds': 0.0, 'backend': None}
+
+    def rebuild(self, articles):
+        """根据当前文章集合重新计算全部近邻，计算完成后整体替换"""
+        articles = [article for article in articles if article.get('id')]
+        started = time.perf_counter()
+        vectors = _tfidf_vectors(articles, self.dims)
+        if numpy is not None and articles:
+            pairs = _neighbors_numpy(vectors, self.dims, self.top_k, self.min_score)
+            backend = 'numpy'
+        else:
+            pairs = _neighbors_python(vectors, self.top_k, self.min_score)
+            backend = 'python'
+        neighbors = {
+            article['id']: [(articles[other]['id'], round(score, 4)) for other, score in pairs[row]]
+            for row, article in enumerate(articles)
+        }
+        with self._lock:
+            self._neighbors = neighbors
+            self.last_build = {
+                'articles': len(articles),
+                'seconds': round(time.perf_counter() - started, 4),
+                'backend': backend,
+            }
+        return neighbors
+
+    def neighbors(self, article_id):
+        """返回预计算的近邻列表；文章不在本轮近邻表中时返回 None"""
+        return self._neighbors.get(article_id)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.last_build, top_k=self.top_k, min_score=self.min_score)
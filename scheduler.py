@@ -0,0 +1,260 @@
+"""后台刷新调度
+
+- 调度规则：以起始时间为锚点、每隔 N 秒的间隔规则（IntervalSpec），或 5 段 cron 表达式（CronSpec）
+- 每次按墙上时间计算下一个时间点，刷新耗时不会累积漂移；时间点之后加随机抖动，避免多个部署同时打上游
+- 启动时若距上次成功刷新已错过至少一个时间点，立即补跑一次（只补一次）
+- 自适应节奏：最近几次新文章多时提前刷新，没有新文章时跳过后续时间点退避
+- 失败后按指数退避重试（带抖动），而不是固定等待
+- stop() 立即结束等待，可随刷新 worker 角色变化启停
+"""
+import logging
+import math
+import random
+import threading
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+# 单次等待的上限（秒）：长时间睡眠期间系统时间被调整时也能及时重新计算
+MAX_WAIT_SECONDS = 300
+
+
+class IntervalSpec:
+    """以每天 anchor_hour:anchor_minute 为锚点，每隔 interval_seconds 一次"""
+
+    def __init__(self, interval_seconds, anchor_hour=0, anchor_minute=0):
+        self.interval_seconds = max(60, int(interval_seconds))
+        self.anchor_hour = anchor_hour
+        self.anchor_minute = anchor_minute
+
+    def next_after(self, dt):
+        anchor = dt.replace(hour=self.anchor_hour, minute=self.anchor_minute, second=0, microsecond=0)
+        cycles = math.floor((dt - anchor).total_seconds() / self.interval_seconds) + 1
+        return anchor + timedelta(seconds=cycles * self.interval_seconds)
+
+    def period_seconds(self, dt=None):
+        return self.interval_seconds
+
+    def describe(self):
+        return f"every {self.interval_seconds}s from {self.anchor_hour:02d}:{self.anchor_minute:02d}"
+
+
+def _parse_field(field, low, high):
+    values = set()
+    for part in field.split(','):
+        expr, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if step <= 0:
+            raise ValueError(f"步长必须为正数: {part}")
+        if expr == '*':
+            start, end = low, high
+        elif '-' in expr:
+            start, end = (int(x) for x in expr.split('-', 1))
+        else:
+            start = int(expr)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"取值超出范围 {low}-{high}: {part}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSpec:
+    """5 段 cron 表达式：分 时 日 月 周（周日为 0 或 7），支持 * , - /"""
+
+    def __init__(self, expr):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron 表达式需要 5 段: {expr!r}")
+        self.expr = expr
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        weekdays = _parse_field(fields[4], 0, 7)
+        self.weekdays = {d % 7 for d in weekdays}
+        # 与 crontab(5)（Vixie cron / cronie）一致：日与周两段都不以 * 开头时满足其一即可，否则两者都要满足。
+        # 判断看写法而不是取值：*/2 按不受限处理，1-31、0-6 这类写满范围的仍按受限处理
+        self._day_any = fields[2].startswith('*')
+        self._weekday_any = fields[4].startswith('*')
+
+    def _day_matches(self, dt):
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._day_any or self._weekday_any:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, dt):
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # 逐级跳过不匹配的月 / 日 / 时 / 分，最多覆盖数年
+        for _ in range(100000):
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"cron 表达式没有可用的时间点: {self.expr!r}")
+
+    def period_seconds(self, dt):
+        first = self.next_after(dt)
+        return (self.next_after(first) - first).total_seconds()
+
+    def describe(self):
+        return f"cron {self.expr}"
+
+
+class AdaptiveCadence:
+    """根据每轮新文章数调整间隔倍数：多则减半，零则加倍，其余逐步回到 1"""
+
+    def __init__(self, min_factor=0.25, max_factor=4.0, busy_threshold=10):
+        self.min_factor = min(1.0, min_factor)
+        self.max_factor = max(1.0, max_factor)
+        self.busy_threshold = max(1, busy_threshold)
+        self.factor = 1.0
+
+    def record(self, new_articles):
+        if new_articles >= self.busy_threshold:
+            self.factor *= 0.5
+        elif new_articles == 0:
+            self.factor *= 2.0
+        elif self.factor != 1.0:
+            self.factor = math.sqrt(self.factor)
+            if abs(self.factor - 1.0) < 0.05:
+                self.factor = 1.0
+        self.factor = min(self.max_factor, max(self.min_factor, self.factor))
+        return self.factor
+
+
+class RefreshScheduler:
+    """按调度规则在后台线程中调用 run()
+
+    run() 返回本轮结果 dict（status、new_articles），失败时 status 为 upstream_error / error；
+    返回 None 表示本轮被跳过。now() 返回当前时间（与调度规则同一时区），
+    last_run() 返回上次成功刷新的时间（可能来自其它 worker），用于判断是否需要补跑。
+    """
+
+    FAILED = ('upstream_error', 'error')
+
+    def __init__(self, spec, run, now, last_run=None, jitter_seconds=0, cadence=None,
+                 retry_base_seconds=60):
+        self.spec = spec
+        self._run = run
+        self._now = now
+        self._last_run = last_run or (lambda: None)
+        self.jitter_seconds = max(0, jitter_seconds)
+        self.cadence = cadence
+        self.retry_base_seconds = max(1, retry_base_seconds)
+        self.failures = 0
+        self.next_run = None
+        self.next_reason = None
+        self.last_outcome = None
+        self.runs = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return False
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._loop, args=(self._stop,),
+                                            name='refresh-scheduler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        with self._lock:
+            self._stop.set()
+            self._thread = None
+            self.next_run = None
+
+    def _jitter(self):
+        return timedelta(seconds=random.uniform(0, self.jitter_seconds)) if self.jitter_seconds else timedelta(0)
+
+    def _first_run(self, now):
+        last = self._last_run()
+        if last is None or self.spec.next_after(last) <= now:
+            return now, 'catch-up'
+        return self._plan(now)
+
+    def _plan(self, now):
+        """下一次刷新时间：调度规则的下一个时间点，按自适应倍数提前或退避"""
+        slot = self.spec.next_after(now)
+        factor = self.cadence.factor if self.cadence else 1.0
+        if factor < 1.0:
+            target = now + timedelta(seconds=self.spec.period_seconds(now) * factor)
+            if target < slot:
+                return target + self._jitter(), 'adaptive'
+        elif factor > 1.0:
+            target = now + timedelta(seconds=self.spec.period_seconds(now) * factor)
+            slot = self.spec.next_after(target - timedelta(seconds=1))
+            return slot + self._jitter(), 'backoff'
+        return slot + self._jitter(), 'schedule'
+
+    def _retry(self, now):
+        delay = min(self.spec.period_seconds(now), self.retry_base_seconds * (2 ** (self.failures - 1)))
+        return now + timedelta(seconds=random.uniform(delay / 2, delay)), 'retry'
+
+    def _wait_until(self, due, stop):
+        """等待到 due；期间被 stop() 时返回 True"""
+        while True:
+            remaining = (due - self._now()).total_seconds()
+            if remaining <= 0:
+                return stop.is_set()
+            if stop.wait(min(remaining, MAX_WAIT_SECONDS)):
+                return True
+
+    def _loop(self, stop):
+        try:
+            due, reason = self._first_run(self._now())
+        except Exception as e:
+            logger.error("计算首次刷新时间失败: %s", e)
+            due, reason = self._plan(self._now())
+        while not stop.is_set():
+            self.next_run, self.next_reason = due, reason
+            logger.info("下一次后台刷新：%s（%s）", due.strftime('%Y-%m-%d %H:%M:%S'), reason)
+            if self._wait_until(due, stop):
+                break
+            try:
+                outcome = self._run()
+            except Exception as e:
+                logger.error("后台刷新任务错误: %s", e)
+                outcome = {'status': 'error'}
+            now = self._now()
+            if outcome is None:
+                due, reason = self._plan(now)
+                continue
+            self.runs += 1
+            self.last_outcome = outcome
+            if outcome.get('status') in self.FAILED:
+                self.failures += 1
+                due, reason = self._retry(now)
+                continue
+            self.failures = 0
+            if self.cadence:
+                factor = self.cadence.record(outcome.get('new_articles') or 0)
+                logger.info("本轮新文章 %s 篇，刷新间隔倍数 %.2f", outcome.get('new_articles'), factor)
+            due, reason = self._plan(now)
+
+    def stats(self):
+        return {
+            'spec': self.spec.describe(),
+            'running': self.running,
+            'next_run': self.next_run.strftime('%Y-%m-%d %H:%M:%S') if self.next_run else None,
+            'next_reason': self.next_reason,
+            'cadence_factor': round(self.cadence.factor, 3) if self.cadence else None,
+            'failures': self.failures,
+            'runs': self.runs,
+            'last_outcome': self.last_outcome,
+        }
@@ -0,0 +1,423 @@
+"""文章全文检索：内存倒排索引 + BM25
+
+- 中文按连续汉字的二元组（bigram）切分，单个汉字保留为一元；英文/数字按单词切分并转小写
+- 标题权重高于摘要（标题词频按 TITLE_WEIGHT 计）
+- 快照安装时按文章ID增量同步：只索引新增/内容变化的文章，移除已下线的文章
+- 每个词的倒排表另按 BM25 词频分量降序保存一份（impact 表），同步时只对涉及的词做有序插入/删除，
+  不随每次同步整体失效；BM25 的平均文档长度取重排时的参考值，偏离超过 AVG_LEN_TOLERANCE 才整体重排
+- 单词查询沿 impact 表取 top-k，常见词无需全表扫描
+- 多词查询按“文档包含哪些查询词、各词的词频分量落在高档还是低档”分组：每个词另存包含该词的文档位图
+  （Python 整数，按槽位置位），impact 表再存一份高档（分量最高的 1/HIGH_TIER_RATIO）的位图，
+  各组文档由位运算得出；组的得分上界是组内各词对应档位的最大贡献之和，低于当前第 k 名的组整组跳过，
+  只命中少数几个词、且分量不高的大量文档无需逐篇计分
+- 查询结果按索引版本做 LRU 缓存，重复查询直接命中
+"""
+import heapq
+import math
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import repeat
+from operator import add, mul, neg, truediv
+
+_CJK_RUN_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[a-z0-9]+(?:[.+#][a-z0-9]+)*')
+_CJK_START = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+
+TITLE_WEIGHT = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 平均文档长度偏离参考值超过该比例时整体重排 impact 表（参考值用于 BM25 长度归一）
+AVG_LEN_TOLERANCE = 0.1
+# 一次同步变更的文章数超过索引规模的该比例时整体重排（比逐条有序插入快）
+BULK_RATIO = 0.2
+# 多词查询的倒排表总长不超过该值时直接逐词累加全部得分
+EXHAUSTIVE_MAX_POSTINGS = 256
+# 分组剪枝的最多查询词数（每个词展开为“不含 / 低档 / 高档”），更长的查询用阈值算法
+PRUNED_MAX_TERMS = 8
+# impact 表中分量最高的 1/HIGH_TIER_RATIO 为高档，其余为低档，低档的分量上界取分档处的值
+HIGH_TIER_RATIO = 8
+# 重排时立即排好 impact 表、建好位图的最小倒排表长度（查询时再建会明显变慢），其余按需建立
+PRECOMPUTE_MIN_DF = 300
+
+
+def tokenize(text):
+    """中文二元组 + 英文单词"""
+    tokens = []
+    for run in _CJK_RUN_RE.findall((text or '').lower()):
+        if _CJK_START.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(map(add, run, run[1:]))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def _slots_of(bits):
+    """位图中置位的槽位（从高到低逐个取最高位；越取整数越短，稀疏位图比按字节扫描快）"""
+    while bits:
+        slot = bits.bit_length() - 1
+        yield slot
+        bits ^= 1 << slot
+
+
+class _Impacts:
+    """一个词的倒排表按 BM25 词频分量降序排列：keys 存负的分量（升序，便于 bisect），docs 与之一一对应
+
+    split 为分档处的 key：key < split 的文档为高档，位图为 high；其余为低档，分量不超过 -split，
+    低档不单独存位图，查询时由“包含该词”的位图减去高档得出。
+    """
+
+    __slots__ = ('keys', 'docs', 'split', 'high')
+
+    def __init__(self, keys=None):
+        """keys：{doc_id: 负的分量}；排序与取值都在 C 层完成"""
+        keys = keys or {}
+        self.docs = sorted(keys, key=keys.__getitem__)
+        self.keys = array('d', map(keys.__getitem__, self.docs))
+        self.split = self.keys[len(self.keys) // HIGH_TIER_RATIO] if self.keys else 0.0
+        self.high = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def insert(self, key, doc_id):
+        pos = bisect_right(self.keys, key)
+        self.keys.insert(pos, key)
+        self.docs.insert(pos, doc_id)
+
+    def remove(self, key, doc_id):
+        pos = bisect_left(self.keys, key)
+        while pos < len(self.docs) and self.keys[pos] == key:
+            if self.docs[pos] == doc_id:
+                del self.keys[pos]
+                del self.docs[pos]
+                return
+            pos += 1
+
+
+class SearchIndex:
+    def __init__(self, cache_size=256):
+        self._postings = {}      # term -> {doc_id: 加权词频}
+        self._impacts = {}       # term -> _Impacts（已排序的词随同步增量维护）
+        self._doc_len = {}       # doc_id -> 文档长度（加权 token 数）
+        self._doc_terms = {}     # doc_id -> 该文档包含的词（用于删除）
+        self._contents = {}      # doc_id -> (标题, 摘要)（判断是否需要重建）
+        self._sources = {}       # doc_id -> 上次同步时的文章对象
+        self._bitsets = {}       # term -> 包含该词的文档位图（按槽位置位，建立后随同步增量维护）
+        self._slots = {}         # doc_id -> 槽位
+        self._slot_docs = []     # 槽位 -> doc_id（空闲为 None）
+        self._free_slots = []
+        self._total_len = 0
+        self._avg_len = None     # impact 表使用的参考平均文档长度
+        self._norm = self._scale = 0.0
+        self._version = 0
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+    def __len__(self):
+        return len(self._doc_len)
+
+    @staticmethod
+    def _content(article):
+        return article.get('title') or '', article.get('summary') or ''
+
+    def _weight(self, tf, length):
+        """BM25 词频分量（按参考平均文档长度）；impact 表的插入与删除都用它计算，删除时能按值精确定位"""
+        return tf * (BM25_K1 + 1) / (tf + self._norm + self._scale * length)
+
+    def _add(self, doc_id, content, incremental):
+        freqs = {}
+        for token in tokenize(content[0]):
+            freqs[token] = freqs.get(token, 0) + TITLE_WEIGHT
+        for token in tokenize(content[1]):
+            freqs[token] = freqs.get(token, 0) + 1
+        length = sum(freqs.values())
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._slot_docs[slot] = doc_id
+        else:
+            slot = len(self._slot_docs)
+            self._slot_docs.append(doc_id)
+        self._slots[doc_id] = slot
+        bit = 1 << slot
+        bitsets = self._bitsets
+        for term, tf in freqs.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+            impacts = self._impacts.get(term) if incremental else None
+            if impacts is not None:
+                key = -self._weight(tf, length)
+                impacts.insert(key, doc_id)
+                if key < impacts.split:
+                    impacts.high |= bit
+            if term in bitsets:
+                bitsets[term] |= bit
+        self._doc_len[doc_id] = length
+        self._doc_terms[doc_id] = tuple(freqs)
+        self._contents[doc_id] = content
+        self._total_len += length
+
+    def _remove(self, doc_id, incremental):
+        length = self._doc_len.pop(doc_id, 0)
+        slot = self._slots.pop(doc_id, None)
+        if slot is not None:
+            self._slot_docs[slot] = None
+            self._free_slots.append(slot)
+            bit = 1 << slot
+        bitsets = self._bitsets
+        for term in self._doc_terms.pop(doc_id, ()):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            tf = postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                self._impacts.pop(term, None)
+                bitsets.pop(term, None)
+                continue
+            impacts = self._impacts.get(term) if incremental and tf is not None else None
+            if impacts is not None:
+                key = -self._weight(tf, length)
+                impacts.remove(key, doc_id)
+                if key < impacts.split:
+                    impacts.high ^= bit
+            if tf is not None and term in bitsets:
+                bitsets[term] ^= bit
+        self._total_len -= length
+        self._contents.pop(doc_id, None)
+        self._sources.pop(doc_id, None)
+
+    def _rebuild_impacts(self):
+        """按当前平均文档长度重排：倒排表长的词立即重排并建好位图，其余在第一次查询时按需建立
+
+        位图与平均文档长度无关，已建立的随同步增量维护，这里只补建缺少的。
+        """
+        n = len(self._doc_len)
+        self._impacts = {}
+        if not n:
+            self._avg_len = None
+            self._bitsets = {}
+            self._slots, self._slot_docs, self._free_slots = {}, [], []
+            return
+        self._avg_len = max(1.0, self._total_len / n)
+        self._norm = BM25_K1 * (1 - BM25_B)
+        self._scale = BM25_K1 * BM25_B / self._avg_len
+        for term, postings in self._postings.items():
+            if len(postings) >= PRECOMPUTE_MIN_DF:
+                self._impacts_of(term, postings)
+                self._bitset_of(term, postings)
+
+    def _impacts_of(self, term, postings):
+        impacts = self._impacts.get(term)
+        if impacts is None:
+            # 与 _weight 相同的运算顺序（结果逐位一致，删除时才能按值定位），逐元素运算都在 C 层完成
+            tfs = list(postings.values())
+            lengths = map(self._doc_len.__getitem__, postings)
+            weights = map(truediv, map(mul, tfs, repeat(BM25_K1 + 1)),
+                          map(add, map(add, tfs, repeat(self._norm)), map(mul, repeat(self._scale), lengths)))
+            impacts = self._impacts[term] = _Impacts(dict(zip(postings, map(neg, weights))))
+            impacts.high = self._bitset(impacts.docs[:bisect_left(impacts.keys, impacts.split)])
+        return impacts
+
+    def _bitset(self, doc_ids):
+        """文档所在槽位的位图"""
+        data = bytearray((len(self._slot_docs) + 7) // 8)
+        for slot in map(self._slots.__getitem__, doc_ids):
+            data[slot >> 3] |= 1 << (slot & 7)
+        return int.from_bytes(data, 'little')
+
+    def _bitset_of(self, term, postings):
+        bits = self._bitsets.get(term)
+        if bits is None:
+            bits = self._bitsets[term] = self._bitset(postings)
+        return bits
+
+    def sync(self, articles):
+        """与给定文章集合增量同步，返回 (新增/更新数, 移除数)
+
+        只有新增/内容变化/已下线的文章涉及的词会被更新，impact 表按参考平均文档长度做有序插入与删除；
+        一次变更超过 BULK_RATIO、或平均文档长度偏离参考值超过 AVG_LEN_TOLERANCE 时整体重排。
+        """
+        with self._lock:
+            wanted = {article.get('id'): article for article in articles}
+            wanted.pop(None, None)
+            wanted.pop('', None)
+            removed = [aid for aid in self._doc_len if aid not in wanted]
+            sources, contents = self._sources, self._contents
+            changed = []
+            for aid, article in wanted.items():
+                # 快照安装时替换文章对象而不原地修改：同一对象无需再比较内容
+                if sources.get(aid) is article:
+                    continue
+                content = self._content(article)
+                if contents.get(aid) != content:
+                    changed.append((aid, content))
+                else:
+                    sources[aid] = article
+            if not changed and not removed:
+                return 0, 0
+            incremental = (self._avg_len is not None
+                           and len(changed) + len(removed) <= BULK_RATIO * len(self._doc_len))
+            for aid in removed:
+                self._remove(aid, incremental)
+            for aid, content in changed:
+                if aid in self._doc_len:
+                    self._remove(aid, incremental)
+                self._add(aid, content, incremental)
+                sources[aid] = wanted[aid]
+            n = len(self._doc_len)
+            if (not incremental or not n
+                    or abs(self._total_len / n - self._avg_len) > AVG_LEN_TOLERANCE * self._avg_len):
+                self._rebuild_impacts()
+            self._version += 1
+            self._cache.clear()
+            return len(changed), len(removed)
+
+    def search(self, query, limit=20):
+        """BM25 排序，返回 [(doc_id, score), ...]
+
+        单词查询沿 impact 表取 top-k；多词查询按词与档位分组、按组得分上界剪枝（见 _pruned_top_k），
+        倒排表都很短时直接逐词累加，查询词超过 PRUNED_MAX_TERMS 个时用阈值算法。
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or limit <= 0:
+            return []
+        key = (tuple(terms), limit)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+            n = len(self._doc_len)
+            if n == 0:
+                return []
+            lists = []
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                lists.append((idf, postings, self._impacts_of(term, postings)))
+            if not lists:
+                result = []
+            elif len(lists) == 1 or len(lists) > PRUNED_MAX_TERMS:
+                result = self._threshold_top_k(lists, limit)
+            elif sum(len(postings) for _, postings, _ in lists) <= EXHAUSTIVE_MAX_POSTINGS:
+                result = self._score_all(lists, limit)
+            else:
+                result = self._pruned_top_k(lists, [self._bitset_of(term, self._postings[term])
+                                                    for term in terms if term in self._postings], limit)
+            self._cache[key] = result
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            return result
+
+    def _pruned_top_k(self, lists, bitsets, limit):
+        """按“各查询词不含 / 低档 / 高档”分组计分
+
+        对查询词逐个展开（深度优先，先高档后低档，最后不含），当前文档集合由位图的与运算得出，
+        组的得分上界为已选档位的最大贡献加上其余词的最大贡献；文档集合为空或上界不超过当前第 k 名时剪掉整组，
+        到达叶子时对组内文档精确计分。
+        """
+        entries = []
+        for (idf, postings, impacts), present in zip(lists, bitsets):
+            # (该档最大贡献, 该档位图)：低档在前，入栈后高档先展开
+            high = impacts.high
+            tiers = ((-idf * impacts.split, present & ~high), (-idf * impacts.keys[0], high))
+            entries.append((tiers[1][0], idf, postings, tiers, ~present))
+        entries.sort(key=lambda entry: entry[0], reverse=True)
+        m = len(entries)
+        rest = [0.0] * (m + 1)
+        for j in range(m - 1, -1, -1):
+            rest[j] = rest[j + 1] + entries[j][0]
+        universe = 0
+        for present in bitsets:
+            universe |= present
+        doc_len, slot_docs = self._doc_len, self._slot_docs
+        norm, scale, k1 = self._norm, self._scale, BM25_K1 + 1
+        top = []  # 小顶堆 (score, doc_id)
+        stack = [(0, universe, 0.0, ())]
+        while stack:
+            j, bits, bound, members = stack.pop()
+            floor = top[0][0] if len(top) >= limit else -1.0
+            if bound + rest[j] <= floor:
+                continue
+            if j == m:
+                for slot in _slots_of(bits):
+                    doc_id = slot_docs[slot]
+                    length = doc_len[doc_id]
+                    score = 0.0
+                    for idf, postings in members:
+                        tf = postings[doc_id]
+                        score += idf * (tf * k1 / (tf + norm + scale * length))
+                    if len(top) < limit:
+                        heapq.heappush(top, (score, doc_id))
+                    elif score > top[0][0]:
+                        heapq.heapreplace(top, (score, doc_id))
+                continue
+            _, idf, postings, tiers, absent = entries[j]
+            rest_max = rest[j + 1]
+            # 后入栈的先展开：不含最后，高档最先
+            if bound + rest_max > floor:
+                child = bits & absent
+                if child:
+                    stack.append((j + 1, child, bound, members))
+            term = members + ((idf, postings),)
+            for tier_max, tier_bits in tiers:
+                if bound + tier_max + rest_max > floor:
+                    child = bits & tier_bits
+                    if child:
+                        stack.append((j + 1, child, bound + tier_max, term))
+        return [(doc_id, score) for score, doc_id in sorted(top, reverse=True)]
+
+    @staticmethod
+    def _score_all(lists, limit):
+        """逐词累加全部倒排表的得分（倒排表都不长时比阈值算法的逐文档随机访问更快）"""
+        scores = {}
+        for idf, _, impacts in lists:
+            for key, doc_id in zip(impacts.keys, impacts.docs):
+                scores[doc_id] = scores.get(doc_id, 0.0) - idf * key
+        top = heapq.nlargest(limit, zip(scores.values(), scores.keys()))
+        return [(doc_id, score) for score, doc_id in top]
+
+    def _threshold_top_k(self, lists, limit):
+        """各词的 impact 表按名次并行扫描：第 k 名的得分不低于所有词剩余最大贡献之和时提前结束"""
+        doc_len, weight = self._doc_len, self._weight
+
+        def full_score(doc_id):
+            total = 0.0
+            for idf, postings, _ in lists:
+                tf = postings.get(doc_id)
+                if tf:
+                    total += idf * weight(tf, doc_len[doc_id])
+            return total
+
+        top = []  # 小顶堆 (score, doc_id)
+        seen = set()
+        rank = 0
+        while True:
+            threshold = 0.0
+            active = False
+            for idf, _, impacts in lists:
+                if rank >= len(impacts):
+                    continue
+                active = True
+                threshold -= idf * impacts.keys[rank]
+                doc_id = impacts.docs[rank]
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                entry = (full_score(doc_id), doc_id)
+                if len(top) < limit:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+            if not active or (len(top) >= limit and top[0][0] >= threshold):
+                break
+            rank += 1
+        return [(doc_id, score) for score, doc_id in sorted(top, reverse=True)]
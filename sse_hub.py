@@ -0,0 +1,209 @@
+"""SSE 广播中心
+
+- 所有事件写入带序号的环形缓冲区，订阅者只保存自己的读取位置（游标），发布端不为每个连接排队
+- 断线重连时根据 Last-Event-ID 补发缓冲区内错过的事件；超出缓冲区范围则下发 resync 让前端整体重拉
+- 空闲时定期发送 keepalive 注释行，写失败即可发现断开的连接
+- 消费过慢（落后超过整个缓冲区）的连接收到 resync 后被断开
+- 同时提供同步生成器（线程 / gevent worker）与异步生成器（ASGI），
+  异步路径下成千上万个空闲连接只占用协程，不占用线程；每个连接等待自己的 future，
+  发布时按事件循环一次性唤醒，登记与注销都是 O(1)，取消（客户端断开）不会被吞掉
+"""
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+
+
+class HubFull(Exception):
+    """连接数已达上限"""
+
+
+def _release(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class SSEHub:
+    def __init__(self, buffer_size=1000, keepalive_seconds=15, max_clients=10000):
+        self.buffer_size = max(1, buffer_size)
+        self.keepalive_seconds = max(1, keepalive_seconds)
+        self.max_clients = max(1, max_clients)
+        # 事件 ID 带上本进程的 hub 标识：重连到另一个 worker 时序号不可比，直接 resync
+        self.hub_id = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=self.buffer_size)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._loop_lock = threading.Lock()
+        self._loop_waiters = {}
+        self.clients = 0
+        self.published = 0
+        self.evicted = 0
+        self.rejected = 0
+
+    # ==== 发布 ====
+    def publish(self, event_type, payload):
+        message = {"type": event_type, **payload}
+        data = json.dumps(message, ensure_ascii=False)
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, f"id: {self.hub_id}-{self._seq}\ndata: {data}\n\n"))
+            self.published += 1
+            self._cond.notify_all()
+        with self._loop_lock:
+            loops = list(self._loop_waiters)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake_loop, loop)
+            except RuntimeError:
+                # 事件循环已关闭
+                with self._loop_lock:
+                    self._loop_waiters.pop(loop, None)
+
+    def _wake_loop(self, loop):
+        with self._loop_lock:
+            waiters = self._loop_waiters.pop(loop, None)
+        for waiter in waiters or ():
+            _release(waiter)
+
+    def _add_waiter(self, loop, waiter):
+        with self._loop_lock:
+            self._loop_waiters.setdefault(loop, set()).add(waiter)
+
+    def _discard_waiter(self, loop, waiter):
+        with self._loop_lock:
+            waiters = self._loop_waiters.get(loop)
+            if waiters is not None:
+                waiters.discard(waiter)
+
+    # ==== 订阅 ====
+    @staticmethod
+    def format_event(message):
+        """不带序号的一次性事件（不进入缓冲区，例如连接建立时的心跳）"""
+        return f"data: {json.dumps(message, ensure_ascii=False)}\n\n"
+
+    def _enter(self):
+        """占用一个连接名额；检查与计数在同一把锁内完成，并发连接不会超过上限"""
+        with self._cond:
+            if self.clients >= self.max_clients:
+                self.rejected += 1
+                raise HubFull()
+            self.clients += 1
+
+    def _leave(self):
+        with self._cond:
+            self.clients -= 1
+
+    def _resume_cursor(self, last_event_id):
+        """根据 Last-Event-ID 计算起始游标；返回 (游标, 是否需要 resync)"""
+        with self._cond:
+            current = self._seq
+            oldest = self._events[0][0] if self._events else current + 1
+        if not last_event_id:
+            return current, False
+        hub_id, _, seq = str(last_event_id).rpartition('-')
+        if hub_id != self.hub_id or not seq.isdigit():
+            return current, True
+        seq = int(seq)
+        if seq > current:
+            return current, True
+        if seq < oldest - 1:
+            return current, True
+        return seq, False
+
+    def _collect(self, cursor):
+        """取出游标之后的事件（需持有 _cond）；返回 (frames, 新游标, 是否已落后于缓冲区)"""
+        if not self._events or cursor >= self._seq:
+            return [], cursor, False
+        oldest = self._events[0][0]
+        if cursor < oldest - 1:
+            return [], self._seq, True
+        frames = [frame for _, frame in islice(self._events, cursor - oldest + 1, None)]
+        return frames, self._seq, False
+
+    def _preamble(self, hello, resync):
+        head = "retry: 5000\n\n"
+        if hello:
+            head += self.format_event(hello)
+        if resync:
+            head += self.format_event({"type": "resync"})
+        return head
+
+    def stream(self, last_event_id=None, hello=None):
+        """同步订阅生成器。连接数超限时抛出 HubFull。"""
+        self._enter()
+        events = self._stream(last_event_id, hello)
+        # 先推进到 try 之内：之后无论迭代到哪一步、还是从未迭代就被关闭或回收，finally 都会归还名额
+        next(events)
+        return events
+
+    def _stream(self, last_event_id, hello):
+        try:
+            yield
+            cursor, resync = self._resume_cursor(last_event_id)
+            yield self._preamble(hello, resync)
+            while True:
+                with self._cond:
+                    if cursor >= self._seq:
+                        self._cond.wait(self.keepalive_seconds)
+                    frames, cursor, lagged = self._collect(cursor)
+                if lagged:
+                    with self._cond:
+                        self.evicted += 1
+                    yield self.format_event({"type": "resync"})
+                    return
+                yield ''.join(frames) if frames else ": keepalive\n\n"
+        finally:
+            self._leave()
+
+    async def astream(self, last_event_id=None, hello=None):
+        """返回异步订阅生成器（ASGI）。连接数超限时抛出 HubFull。"""
+        self._enter()
+        events = self._astream(last_event_id, hello)
+        # 同 stream()：推进到 try 之内再交给调用方
+        await events.asend(None)
+        return events
+
+    async def _astream(self, last_event_id, hello):
+        loop = asyncio.get_running_loop()
+        try:
+            yield
+            cursor, resync = self._resume_cursor(last_event_id)
+            yield self._preamble(hello, resync)
+            while True:
+                # 先登记再检查序号：检查之后才发布的事件一定会唤醒这个 waiter
+                waiter = loop.create_future()
+                self._add_waiter(loop, waiter)
+                try:
+                    with self._cond:
+                        pending = cursor < self._seq
+                    if not pending:
+                        timer = loop.call_later(self.keepalive_seconds, _release, waiter)
+                        try:
+                            await waiter
+                        finally:
+                            timer.cancel()
+                finally:
+                    self._discard_waiter(loop, waiter)
+                with self._cond:
+                    frames, cursor, lagged = self._collect(cursor)
+                if lagged:
+                    with self._cond:
+                        self.evicted += 1
+                    yield self.format_event({"type": "resync"})
+                    return
+                yield ''.join(frames) if frames else ": keepalive\n\n"
+        finally:
+            self._leave()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'clients': self.clients,
+                'published': self.published,
+                'evicted': self.evicted,
+                'rejected': self.rejected,
+                'buffered': len(self._events),
+                'last_event_id': f"{self.hub_id}-{self._seq}",
+            }
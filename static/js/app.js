@@ -3,6 +3,8 @@ class AINewsApp {
     constructor() {
         this.newsData = [];
         this.currentFilter = 'all';
+        // 分页：下一页游标（每页条数与卡片字段由服务端的 /api/news/<分类>/<页>.json 决定）
+        this.nextCursor = null;
         // 自动轮询间隔（毫秒）。默认 60 分钟，可在 URL 上用 ?poll=minutes 或 localStorage.poll_minutes 覆盖
         const urlPoll = (typeof window !== 'undefined') ? parseInt(new URLSearchParams(window.location.search).get('poll') || '0', 10) : 0;
         const lsPoll = (typeof localStorage !== 'undefined') ? parseInt(localStorage.getItem('poll_minutes') || '0', 10) : 0;
@@ -17,7 +19,10 @@ class AINewsApp {
 
     init() {
         this.bindEvents();
-        this.loadNews();
+        // 首页已由服务端渲染首屏并内嵌数据时直接使用，省去一次 /api/news 往返
+        if (!this.hydrate()) {
+            this.loadNews();
+        }
         this.startAutoRefresh();
         this.connectSSE();
     }
@@ -29,6 +34,14 @@ class AINewsApp {
             this.refreshNews();
         });
 
+        // 加载更多
+        const loadMoreBtn = document.getElementById('loadMoreBtn');
+        if (loadMoreBtn) {
+            loadMoreBtn.addEventListener('click', () => {
+                this.loadMore();
+            });
+        }
+
         // 分类过滤器
         document.addEventListener('click', (e) => {
             if (e.target.classList.contains('category-filter')) {
@@ -62,17 +75,34 @@ class AINewsApp {
         });
     }
 
+    hydrate() {
+        const node = document.getElementById('initialNews');
+        if (!node) return false;
+        try {
+            const initial = JSON.parse(node.textContent || '{}');
+            if (!initial.data || initial.data.length === 0) return false;
+            this.newsData = initial.data;
+            this.nextCursor = initial.next_cursor || null;
+            this.updateTimestamp(initial.last_update);
+            return true;
+        } catch (_) {
+            return false;
+        }
+    }
+
     async loadNews(silent = false) {
         try {
             if (!silent) {
                 this.showLoading();
             }
             
-            const response = await fetch('/api/news');
+            // no-cache：总是带 ETag 向服务端确认，内容未变时只返回 304
+            const response = await fetch(this.newsPageUrl(), { cache: 'no-cache' });
             const result = await response.json();
             
             if (result.success) {
                 this.newsData = result.data;
+                this.nextCursor = result.next_cursor || null;
                 this.renderNews();
                 this.updateTimestamp(result.last_update || result.timestamp);
                 this.showCategoryFilter();
@@ -85,6 +115,31 @@ class AINewsApp {
         }
     }
 
+    newsPageUrl(cursor = null) {
+        // 分类与游标都放在路径里：静态导出时 nginx 按路径直接返回预生成的分页文件
+        const category = encodeURIComponent(this.currentFilter || 'all');
+        return `/api/news/${category}/${cursor || 'first'}.json`;
+    }
+
+    async loadMore() {
+        if (!this.nextCursor || this.loadingMore) return;
+        this.loadingMore = true;
+        try {
+            const response = await fetch(this.newsPageUrl(this.nextCursor));
+            const result = await response.json();
+            if (result.success) {
+                const known = new Set(this.newsData.map(item => item.id));
+                this.newsData = this.newsData.concat(result.data.filter(item => !known.has(item.id)));
+                this.nextCursor = result.next_cursor || null;
+                this.renderNews();
+            }
+        } catch (error) {
+            console.error('加载更多失败:', error);
+        } finally {
+            this.loadingMore = false;
+        }
+    }
+
     async refreshNews() {
         // 非开发模式：模拟刷新（展示加载10秒，保持数据不变但更新显示时间与顺序）
         if (!this.devRealRefresh) {
@@ -106,23 +161,65 @@ class AINewsApp {
             return;
         }
 
-        // 开发模式：执行真实刷新
+        // 开发模式：提交异步刷新任务，刷新期间继续展示当前数据，完成后由 SSE 通知
+        const refreshBtn = document.getElementById('refreshBtn');
+        refreshBtn.querySelector('i').classList.add('fa-spin');
+        refreshBtn.disabled = true;
         try {
-            this.showLoading();
-            const response = await fetch('/api/refresh');
+            const response = await fetch('/api/refresh', { method: 'POST' });
             const result = await response.json();
-            if (result.success) {
-                this.newsData = result.data;
-                this.renderNews();
-                this.updateTimestamp(result.last_update || result.timestamp);
-                this.showCategoryFilter();
-                console.log('新闻数据已刷新（开发模式）');
-            } else {
-                throw new Error(result.error || '刷新数据失败');
+            if (!result.success) {
+                throw new Error(result.error || '提交刷新失败');
             }
+            this.trackRefreshJob(result.job);
         } catch (error) {
             console.error('刷新新闻失败:', error);
-            this.showError(error.message);
+            this.resetRefreshButton();
+        }
+    }
+
+    trackRefreshJob(job) {
+        this.refreshJobId = job.id;
+        this.updateRefreshJob(job);
+        // SSE 不可用时的兜底：定时查询任务状态
+        if (this.refreshJobTimer) clearInterval(this.refreshJobTimer);
+        this.refreshJobTimer = setInterval(async () => {
+            try {
+                const response = await fetch(`/api/refresh/${encodeURIComponent(job.id)}`);
+                const result = await response.json();
+                if (result.success) this.updateRefreshJob(result.job);
+            } catch (_) {}
+        }, 5000);
+    }
+
+    updateRefreshJob(job) {
+        if (!job || job.id !== this.refreshJobId) return;
+        const status = document.getElementById('refreshStatus');
+        if (job.state === 'done' || job.state === 'failed') {
+            clearInterval(this.refreshJobTimer);
+            this.refreshJobTimer = null;
+            this.refreshJobId = null;
+            this.resetRefreshButton();
+            if (status) {
+                status.textContent = job.state === 'done' ? '' : '刷新失败，继续显示上次的资讯';
+                status.classList.toggle('hidden', job.state === 'done');
+            }
+            if (job.state === 'done') {
+                this.nextCursor = null;
+                this.loadNews(true);
+                console.log('新闻数据已刷新（开发模式）');
+            }
+            return;
+        }
+        const labels = { queued: '排队中', searching: '正在搜索', enriching: '正在加工', publishing: '正在发布' };
+        let text = labels[job.stage || job.state] || '刷新中';
+        const progress = job.progress || {};
+        if (job.stage === 'enriching' && progress.chunks) {
+            text += ` ${progress.chunks_done || 0}/${progress.chunks}`;
+        }
+        if (status) {
+            status.textContent = text + '…';
+            status.classList.remove('hidden');
         }
     }
 
@@ -167,13 +264,37 @@ class AINewsApp {
             if (this.es) {
                 try { this.es.close(); } catch (_) {}
             }
-            this.es = new EventSource('/api/stream');
+            // 手动重连时带上最后收到的事件ID，服务端补发断线期间错过的事件
+            const url = this.lastEventId
+                ? `/api/stream?last_event_id=${encodeURIComponent(this.lastEventId)}`
+                : '/api/stream';
+            this.es = new EventSource(url);
             this.es.onmessage = (e) => {
                 try {
+                    if (e.lastEventId) {
+                        this.lastEventId = e.lastEventId;
+                    }
                     const data = JSON.parse(e.data || '{}');
-                    if (data.type === 'news_updated') {
-                        // 后端刷新完成后，立即拉取最新数据
+                    if (data.type === 'resync') {
+                        // 错过的事件已超出服务端缓冲区，整体重新拉取
                         this.loadNews(true);
+                    } else if (data.type === 'article_added' && data.article) {
+                        // 增量：新增文章直接插入，无需重新拉取整个列表
+                        const matches = this.currentFilter === 'all' || data.article.category === this.currentFilter;
+                        if (matches && !this.newsData.some(item => item.id === data.article.id)) {
+                            this.newsData.unshift(data.article);
+                            this.scheduleRender();
+                        }
+                    } else if (data.type === 'article_removed') {
+                        this.newsData = this.newsData.filter(item => item.id !== data.id);
+                        this.scheduleRender();
+                    } else if ((data.type === 'refresh_progress' || data.type === 'refresh_complete') && data.job) {
+                        this.updateRefreshJob(data.job);
+                    } else if (data.type === 'news_updated' && !data.delta) {
+                        // 后端未提供增量时，立即拉取最新数据
+                        this.loadNews(true);
+                    } else if (data.type === 'news_updated') {
+                        this.updateTimestamp(data.last_update);
                     }
                 } catch (_) {}
             };
@@ -187,7 +308,19 @@ class AINewsApp {
         }
     }
 
+    scheduleRender() {
+        // 一次刷新会连续收到多条增量事件，合并为一次渲染
+        if (this.renderTimer) return;
+        this.renderTimer = setTimeout(() => {
+            this.renderTimer = null;
+            this.renderNews();
+            this.showCategoryFilter();
+        }, 200);
+    }
+
     resetRefreshButton() {
+        // 异步刷新任务进行中时保持转动，直到任务结束
+        if (this.refreshJobId) return;
         const refreshBtn = document.getElementById('refreshBtn');
         const icon = refreshBtn.querySelector('i');
         icon.classList.remove('fa-spin');
@@ -203,7 +336,12 @@ class AINewsApp {
             : this.newsData.filter(item => item.category === this.currentFilter);
         
         // 生成HTML
-        container.innerHTML = filteredNews.map((item, index) => this.createNewsCard(item, index + 1)).join('');
+        container.innerHTML = filteredNews.map(item => this.createNewsCard(item, item.id)).join('');
+
+        const loadMoreWrap = document.getElementById('loadMoreWrap');
+        if (loadMoreWrap) {
+            loadMoreWrap.classList.toggle('hidden', !this.nextCursor);
+        }
         
         // 显示容器
         document.getElementById('loadingState').classList.add('hidden');
@@ -253,7 +391,7 @@ class AINewsApp {
     }
 
     openArticleModal(articleId) {
-        const article = this.newsData[articleId - 1];
+        const article = this.newsData.find(item => item.id === articleId);
         if (!article) {
             console.error('文章不存在:', articleId);
             return;
@@ -297,8 +435,8 @@ class AINewsApp {
         // 更新当前过滤器
         this.currentFilter = button.dataset.category;
         
-        // 重新渲染新闻
-        this.renderNews();
+        // 按分类从服务端重新拉取第一页
+        this.loadNews(true);
     }
 
     getCategoryIcon(category) {
@@ -0,0 +1,104 @@
+"""静态导出：把整站预渲染为文件，交给 nginx / CDN 直接提供
+
+目录结构（STATIC_EXPORT_DIR）：
+- releases/<版本>/          每次导出一份完整目录（HTML、JSON、静态资源及其 .gz / .br 压缩件）
+- current -> releases/<版本>  符号链接，导出完成后原子替换，nginx 始终看到完整的一版
+
+写入过程：先在新版本目录中写完全部文件，再创建临时符号链接并 rename 覆盖 current，
+旧版本保留最近 keep 份，正在读取旧目录的请求不受影响。
+"""
+import os
+import shutil
+import time
+
+from news_snapshot import EncodedBody
+
+# 生成压缩件的扩展名（静态资源按后缀判断）
+COMPRESSIBLE_SUFFIXES = ('.html', '.json', '.css', '.js', '.svg', '.txt')
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _write_body(path, body):
+    """写入文件本体及 .gz / .br 压缩件（不值得压缩或未安装 brotli 时跳过）"""
+    _write(path, body.raw)
+    for encoding, suffix in (('gzip', '.gz'), ('br', '.br')):
+        encoded = body.encoded(encoding)
+        if encoded is not None:
+            _write(path + suffix, encoded)
+
+
+def _copy_static(static_dir, target):
+    for root, _, names in os.walk(static_dir):
+        for name in names:
+            source = os.path.join(root, name)
+            dest = os.path.join(target, os.path.relpath(source, static_dir))
+            if name.endswith(COMPRESSIBLE_SUFFIXES):
+                with open(source, 'rb') as f:
+                    _write_body(dest, EncodedBody(f.read()))
+            else:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                shutil.copyfile(source, dest)
+
+
+def _swap_current(out_root, release_dir):
+    link = os.path.join(out_root, 'current')
+    tmp = f"{link}.tmp-{os.getpid()}"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    os.symlink(os.path.relpath(release_dir, out_root), tmp)
+    # rename 覆盖已存在的符号链接是原子操作
+    os.replace(tmp, link)
+
+
+def _prune(releases_dir, keep, current):
+    """按修改时间保留最近 keep 个版本（不会删除 current 指向的目录）"""
+    paths = [
+        os.path.join(releases_dir, name) for name in os.listdir(releases_dir)
+        if not name.endswith('.partial')
+    ]
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:-keep]:
+        if os.path.realpath(path) != os.path.realpath(current):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def export_site(out_root, files, version, static_dir=None, keep=3):
+    """导出一版站点并切换 current，返回统计信息
+
+    files 为 (相对路径, EncodedBody) 的可迭代对象；static_dir 下的文件原样复制到 static/。
+    """
+    started = time.perf_counter()
+    releases_dir = os.path.join(out_root, 'releases')
+    release_dir = os.path.join(releases_dir, version)
+    # 同名版本已存在（例如同一秒内重复导出）时追加序号，绝不覆盖 current 可能指向的目录
+    suffix = 0
+    while os.path.exists(release_dir):
+        suffix += 1
+        release_dir = os.path.join(releases_dir, f"{version}.{suffix}")
+    building = release_dir + '.partial'
+    shutil.rmtree(building, ignore_errors=True)
+    os.makedirs(building)
+    count = 0
+    try:
+        for relative, body in files:
+            _write_body(os.path.join(building, relative), body)
+            count += 1
+        if static_dir and os.path.isdir(static_dir):
+            _copy_static(static_dir, os.path.join(building, 'static'))
+        os.rename(building, release_dir)
+    except Exception:
+        shutil.rmtree(building, ignore_errors=True)
+        raise
+    _swap_current(out_root, release_dir)
+    _prune(releases_dir, max(1, keep), release_dir)
+    return {
+        'version': os.path.basename(release_dir),
+        'files': count,
+        'path': release_dir,
+        'seconds': round(time.perf_counter() - started, 4),
+    }
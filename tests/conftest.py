@@ -0,0 +1,18 @@
+"""测试环境：导入 app 之前把数据目录指向临时目录、关闭静态导出与日志噪音，上游一律由测试替换"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.update({
+    'NEWS_DATA_DIR': tempfile.mkdtemp(prefix='ai-news-test-'),
+    'STATIC_EXPORT_DIR': '',
+    'LOG_LEVEL': 'WARNING',
+    'BOCHA_API_KEY': 'test',
+    'BOCHA_API_URL': 'http://127.0.0.1:9/v1/web-search',
+    'BOCHA_RATE_PER_SECOND': '0',
+    'NEWS_REFRESH_MIN_INTERVAL_SECONDS': '0',
+    'VOLCENGINE_ENDPOINT_ID': 'test',
+})
@@ -0,0 +1,178 @@
+"""ASGI 入口：原生路由与 Flask 路由响应一致、其它路由经 WSGI 适配器回落到 Flask、SSE 推送与断开后释放名额"""
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import app
+import asgi
+from news_snapshot import NewsSnapshot
+from sse_hub import SSEHub
+
+
+def _articles(n):
+    return [{'id': f'a{i:03d}', 'title': f'标题 {i}', 'summary': '摘要' * 20, 'source': '来源',
+             'category': '技术突破', 'created_at': f'2026-01-01 {i // 60:02d}:{i % 60:02d}:00'}
+            for i in range(n)]
+
+
+@pytest.fixture(autouse=True)
+def snapshot(monkeypatch):
+    snapshot = NewsSnapshot(1, _articles(40), '2026-01-01 01:00:00')
+    monkeypatch.setattr(app, 'current_articles', snapshot.articles)
+    monkeypatch.setattr(app, 'current_snapshot', snapshot)
+    return snapshot
+
+
+class _Exchange:
+    """一次 ASGI HTTP 请求：按 scope 调用 application，记录发出的消息；disconnect() 模拟客户端断开"""
+
+    def __init__(self, path, method='GET', query=b'', headers=(), body=b''):
+        self.scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': method, 'scheme': 'http', 'path': path, 'root_path': '',
+            'query_string': query, 'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+        }
+        self.body = body
+        self.messages = []
+        self.received = asyncio.Event()
+        self._requested = False
+        self._disconnected = asyncio.Event()
+
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {'type': 'http.request', 'body': self.body, 'more_body': False}
+        await self._disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        self.messages.append(message)
+        self.received.set()
+
+    def disconnect(self):
+        self._disconnected.set()
+
+    async def run(self):
+        await asgi.application(self.scope, self.receive, self.send)
+        return self
+
+    @property
+    def status(self):
+        return self.messages[0]['status']
+
+    @property
+    def headers(self):
+        return {name.decode('latin-1'): value.decode('latin-1') for name, value in self.messages[0]['headers']}
+
+    @property
+    def data(self):
+        return b''.join(message.get('body', b'') for message in self.messages[1:])
+
+
+def _call(path, **kwargs):
+    async def run():
+        return await _Exchange(path, **kwargs).run()
+    return asyncio.run(run())
+
+
+def test_native_news_matches_flask():
+    native = _call('/api/news', headers=[('Accept-Encoding', 'gzip')])
+    flask = app.app.test_client().get('/api/news', headers={'Accept-Encoding': 'gzip'})
+    assert native.status == 200
+    for name in ('ETag', 'Cache-Control', 'Vary', 'Content-Encoding', 'X-News-Generation'):
+        assert native.headers[name.lower()] == flask.headers[name]
+    assert native.data == flask.data
+    assert int(native.headers['content-length']) == len(native.data)
+    assert json.loads(gzip.decompress(native.data))['count'] == 40
+    # 原生路由同样支持条件请求，且不经过 WSGI 适配器（首条消息即响应头）
+    again = _call('/api/news', headers=[('If-None-Match', native.headers['etag'])])
+    assert again.status == 304 and again.data == b''
+    assert again.headers['access-control-allow-origin'] == '*'
+
+
+def test_native_news_page_and_bad_cursor():
+    page = _call('/api/news', query=b'limit=5&fields=id')
+    flask = app.app.test_client().get('/api/news?limit=5&fields=id')
+    assert page.status == 200 and json.loads(page.data) == flask.get_json()
+    bad = _call('/api/news', query=b'cursor=bad')
+    assert bad.status == 400 and json.loads(bad.data)['success'] is False
+
+
+def test_unknown_routes_fall_back_to_flask(monkeypatch):
+    ran = []
+    real_run_wsgi = asgi._run_wsgi
+    monkeypatch.setattr(asgi, '_run_wsgi', lambda *args: ran.append(args[0]['PATH_INFO']) or real_run_wsgi(*args))
+    missing = _call('/api/search', headers=[('Origin', 'https://example.com')])
+    assert missing.status == 400
+    assert json.loads(missing.data) == {'success': False, 'error': '缺少查询参数 q'}
+    assert missing.headers['access-control-allow-origin'] == 'https://example.com'
+    assert missing.messages[-1] == {'type': 'http.response.body', 'body': b''}
+    assert _call('/no-such-page').status == 404
+    # 非 GET/HEAD 的 /api/news 也交给 Flask（405）
+    assert _call('/api/news', method='POST', body=b'{}', headers=[('Content-Type', 'application/json')]).status == 405
+    assert ran == ['/api/search', '/no-such-page', '/api/news']
+
+
+def test_wsgi_fallback_passes_query_and_body(monkeypatch):
+    seen = {}
+
+    def fake_app(environ, start_response):
+        seen['query'] = environ['QUERY_STRING']
+        seen['body'] = environ['wsgi.input'].read()
+        seen['header'] = environ['HTTP_X_TRACE']
+        start_response('201 Created', [('Content-Type', 'text/plain')])
+        return [b'a', b'', b'b']
+    monkeypatch.setattr(app, 'app', fake_app)
+    exchange = _call('/anything', method='POST', query=b'x=1', body=b'payload', headers=[('X-Trace', 't1')])
+    assert seen == {'query': 'x=1', 'body': b'payload', 'header': 't1'}
+    assert exchange.status == 201 and exchange.data == b'ab'
+
+
+def _sse_events(data):
+    return [json.loads(line[len('data: '):]) for line in data.decode('utf-8').split('\n') if line.startswith('data: ')]
+
+
+def test_sse_stream_pushes_events_and_releases_slot(monkeypatch):
+    hub = SSEHub(keepalive_seconds=60)
+    monkeypatch.setattr(app, 'sse_hub', hub)
+
+    async def run():
+        exchange = _Exchange('/api/stream')
+        task = asyncio.ensure_future(exchange.run())
+        # 先收到响应头与连接时的心跳
+        while len(exchange.messages) < 2:
+            exchange.received.clear()
+            await asyncio.wait_for(exchange.received.wait(), 5)
+        assert hub.clients == 1
+        hub.publish('news_updated', {'count': 3})
+        while len(_sse_events(exchange.data)) < 2:
+            exchange.received.clear()
+            await asyncio.wait_for(exchange.received.wait(), 5)
+        exchange.disconnect()
+        await asyncio.wait_for(task, 5)
+        return exchange
+
+    exchange = asyncio.run(run())
+    assert exchange.status == 200
+    assert exchange.headers['content-type'].startswith('text/event-stream')
+    assert exchange.headers['cache-control'] == 'no-cache'
+    events = _sse_events(exchange.data)
+    assert events[0]['type'] == 'heartbeat'
+    assert events[1] == {'type': 'news_updated', 'count': 3}
+    assert hub.clients == 0
+
+
+def test_sse_stream_rejects_when_full(monkeypatch):
+    hub = SSEHub(max_clients=1)
+    monkeypatch.setattr(app, 'sse_hub', hub)
+    held = hub.stream()
+    try:
+        exchange = _call('/api/stream')
+    finally:
+        held.close()
+    assert exchange.status == 503
+    assert json.loads(exchange.data)['error'] == '连接数已达上限'
+    assert hub.clients == 0
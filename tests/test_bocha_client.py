@@ -0,0 +1,194 @@
+"""博查客户端：对本地替身服务的重试、退避、429/5xx 处理与熔断器状态转换"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import bocha_client
+from bocha_client import BochaClient, BochaError, CircuitBreaker, CircuitOpenError
+
+
+class _Stub:
+    """按顺序返回预设状态码的博查替身；列表用完后一直返回最后一个"""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                status = stub.statuses[min(stub.calls, len(stub.statuses) - 1)]
+                stub.calls += 1
+                body = json.dumps({'code': 200, 'data': {'webPages': {'value': []}}}).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/v1/web-search'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def make(*statuses):
+        servers.append(_Stub(statuses))
+        return servers[-1]
+    yield make
+    for server in servers:
+        server.close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(bocha_client.time, 'sleep', recorded.append)
+    return recorded
+
+
+def _client(url, **kwargs):
+    kwargs.setdefault('max_retries', 3)
+    kwargs.setdefault('read_timeout', 5)
+    return BochaClient('test', url, **kwargs)
+
+
+def test_retries_429_and_5xx_then_succeeds(stub, sleeps):
+    server = stub(429, 503, 200)
+    client = _client(server.url)
+    assert client.search({'query': 'AI'})['code'] == 200
+    assert server.calls == 3
+    stats = client.stats()
+    assert stats['retries'] == 2 and len(sleeps) == 2
+    assert stats['status_counts'] == {'429': 1, '503': 1, '200': 1}
+    assert stats['circuit'] == 'closed'
+
+
+def test_non_retryable_status_fails_immediately(stub, sleeps):
+    server = stub(401)
+    client = _client(server.url)
+    with pytest.raises(BochaError, match='HTTP 401'):
+        client.search({'query': 'AI'})
+    assert server.calls == 1 and not sleeps
+
+
+def test_gives_up_after_max_retries(stub, sleeps):
+    server = stub(500)
+    client = _client(server.url, max_retries=2)
+    with pytest.raises(BochaError, match='已重试 2 次'):
+        client.search({'query': 'AI'})
+    assert server.calls == 3 and client.stats()['retries'] == 2
+
+
+def test_backoff_is_capped_full_jitter(monkeypatch):
+    client = _client('http://127.0.0.1:9', backoff_base=1.0, backoff_max=4.0)
+    monkeypatch.setattr(bocha_client.random, 'uniform', lambda low, high: high)
+    assert [client._backoff(attempt) for attempt in range(5)] == [1.0, 2.0, 4.0, 4.0, 4.0]
+    monkeypatch.setattr(bocha_client.random, 'uniform', lambda low, high: low)
+    assert client._backoff(3) == 0
+
+
+@pytest.mark.parametrize('error', [requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError,
+                                   requests.exceptions.TooManyRedirects, requests.ConnectionError, requests.Timeout])
+def test_request_exceptions_are_retried_and_counted(error, stub, sleeps):
+    server = stub(200)
+    client = _client(server.url, max_retries=1)
+    real_post = client.session.post
+    failures = [error('断开')]
+
+    def flaky_post(*args, **kwargs):
+        if failures:
+            raise failures.pop()
+        return real_post(*args, **kwargs)
+    client.session.post = flaky_post
+    assert client.search({'query': 'AI'})['code'] == 200
+    assert client.stats()['retries'] == 1
+
+
+def test_breaker_opens_half_opens_and_closes(stub, sleeps):
+    server = stub(500, 500, 200)
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    client = _client(server.url, max_retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(BochaError):
+            client.search({'query': 'AI'})
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        client.search({'query': 'AI'})
+    assert server.calls == 2
+    # 冷却结束：放行一次探测，成功后回到 closed
+    breaker._opened_at -= 60
+    assert breaker.state == 'half-open'
+    assert client.search({'query': 'AI'})['code'] == 200
+    assert breaker.state == 'closed'
+
+
+def test_failed_probe_reopens(stub, sleeps):
+    server = stub(500)
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    client = _client(server.url, max_retries=0, breaker=breaker)
+    with pytest.raises(BochaError):
+        client.search({'query': 'AI'})
+    breaker._opened_at = time.monotonic() - 60
+    with pytest.raises(BochaError):
+        client.search({'query': 'AI'})
+    assert breaker.state == 'open'
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_probe_interrupted_by_request_error_does_not_stick(stub, sleeps):
+    server = stub(200)
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    client = _client(server.url, max_retries=0, breaker=breaker)
+    breaker.record_failure()
+    breaker._opened_at -= 60
+    real_post = client.session.post
+
+    def broken_post(*args, **kwargs):
+        raise requests.exceptions.ChunkedEncodingError('分块传输中断')
+    client.session.post = broken_post
+    with pytest.raises(BochaError):
+        client.search({'query': 'AI'})
+    assert not breaker._probing and breaker.state == 'open'
+    # 再次冷却结束后可以继续探测并恢复
+    breaker._opened_at -= 60
+    client.session.post = real_post
+    assert client.search({'query': 'AI'})['code'] == 200
+    assert breaker.state == 'closed'
+
+
+def test_unexpected_error_during_probe_releases_probe(stub, sleeps):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    client = _client(stub(200).url, max_retries=0, breaker=breaker)
+    breaker.record_failure()
+    breaker._opened_at -= 60
+
+    def broken_post(*args, **kwargs):
+        raise RuntimeError('意外错误')
+    client.session.post = broken_post
+    with pytest.raises(RuntimeError):
+        client.search({'query': 'AI'})
+    assert breaker.state == 'half-open' and breaker.allow()
@@ -0,0 +1,53 @@
+"""近重复检测：固定语料的分簇结果，且不随 PYTHONHASHSEED 变化"""
+import json
+import os
+import subprocess
+import sys
+
+from dedup import collapse_near_duplicates, find_clusters, shingles, signature
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASE = [
+    'OpenAI 发布新一代推理模型，数学与编程评测成绩大幅提升，并开放 API 调用',
+    '英伟达季度营收创新高，数据中心显卡需求推动营收同比增长超过一倍',
+    '欧盟人工智能法案正式生效，高风险系统需要完成合规评估并公开训练数据摘要',
+    '人形机器人初创公司完成五亿元 B 轮融资，资金将用于量产与海外市场拓展',
+]
+TEXTS = [
+    BASE[0],
+    BASE[1],
+    '【转载】' + BASE[0] + '。',
+    BASE[2],
+    BASE[1].replace('超过一倍', '超一倍'),
+    BASE[3],
+    '快讯：' + BASE[2],
+    '量子计算芯片实现纠错突破，逻辑比特寿命超过物理比特',
+]
+EXPECTED = [[0, 2], [1, 4], [3, 6]]
+
+# 子进程输出分簇结果与第一篇的签名
+_SCRIPT = ('import json, sys; from dedup import find_clusters, shingles, signature; texts = json.loads(sys.argv[1]); '
+           'print(json.dumps([find_clusters(texts), signature(shingles(texts[0]), 63)]))')
+
+
+def test_fixed_corpus_clusters():
+    assert find_clusters(TEXTS) == EXPECTED
+
+
+def test_clusters_do_not_depend_on_hash_seed():
+    expected = [EXPECTED, signature(shingles(TEXTS[0]), 63)]
+    for seed in ('0', '1', '12345'):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        out = subprocess.run([sys.executable, '-c', _SCRIPT, json.dumps(TEXTS)], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        assert json.loads(out) == expected
+
+
+def test_collapse_keeps_longest_summary_at_first_position():
+    pages = [{'name': '', 'summary': text, 'url': f'https://example.com/{i}', 'siteName': str(i)}
+             for i, text in enumerate(TEXTS)]
+    result, stats = collapse_near_duplicates(pages)
+    assert stats['output'] == len(TEXTS) - 3 and stats['clusters'] == 3
+    assert result[0]['url'] == 'https://example.com/2'
+    assert [alt['url'] for alt in result[0]['alternates']] == ['https://example.com/0']
@@ -0,0 +1,135 @@
+"""加工备忘录：模型输出中途断开或被截断时，不把未输出的网页记为“无关”"""
+from types import SimpleNamespace
+
+import pytest
+
+import app
+
+
+def _pages(n, tag):
+    # 每个用例使用不同的 URL，避免共享的备忘录互相影响
+    return [
+        {'name': f'测试新闻标题第{i}条关于大模型', 'url': f'https://example.com/{tag}/{i}',
+         'summary': f'第{i}条新闻的原始摘要内容，介绍某个大模型的发布细节。', 'siteName': '示例'}
+        for i in range(1, n + 1)
+    ]
+
+
+def _block(page, index):
+    return f"原始序号：{index}\n标题：{page['name']}\n摘要：{page['summary']}\n分类：产品发布\n\n"
+
+
+class _StreamClient:
+    """流式替身：按给定文本分段吐出；fail=True 时吐完后抛出连接错误，finish_reason 可指定"""
+
+    def __init__(self, text, fail=False, finish_reason='stop'):
+        self.text = text
+        self.fail = fail
+        self.finish_reason = finish_reason
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model=None, messages=(), stream=False, **kwargs):
+        if not stream:
+            message = SimpleNamespace(content=self.text)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=self.finish_reason)],
+                                   usage=None)
+        return self._stream()
+
+    def _stream(self):
+        for start in range(0, len(self.text), 16):
+            delta = SimpleNamespace(content=self.text[start:start + 16])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+        if self.fail:
+            raise ConnectionError('stream reset')
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=''),
+                                                       finish_reason=self.finish_reason)], usage=None)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    assert app.enrichment_cache is not None
+    monkeypatch.setattr(app.bocha_service, 'enrich_stream', True)
+    monkeypatch.setattr(app.bocha_service, 'enrich_chunk_retries', 0)
+    return app.bocha_service
+
+
+def _memo(service, pages):
+    return app.enrichment_cache.get_many([service._memo_key(page) for page in pages])
+
+
+def test_complete_stream_marks_missing_pages_irrelevant(service, monkeypatch):
+    pages = _pages(3, 'complete')
+    monkeypatch.setattr(app, 'client', _StreamClient(_block(pages[0], 1)))
+    items = service._enrich_chunk(pages, [0, 1, 2])
+    assert [item['url'] for item in items] == [pages[0]['url']]
+    memo = _memo(service, pages)
+    assert memo[service._memo_key(pages[0])]['title'] == pages[0]['name']
+    assert memo[service._memo_key(pages[1])]['title'] == ''
+    assert memo[service._memo_key(pages[2])]['title'] == ''
+
+
+def test_interrupted_stream_memoizes_received_records_only(service, monkeypatch):
+    pages = _pages(3, 'interrupted')
+    monkeypatch.setattr(app, 'client', _StreamClient(_block(pages[0], 1) + _block(pages[1], 2), fail=True))
+    items = service._enrich_chunk(pages, [0, 1, 2])
+    assert [item['url'] for item in items] == [pages[0]['url'], pages[1]['url']]
+    memo = _memo(service, pages)
+    assert memo[service._memo_key(pages[0])]['title'] == pages[0]['name']
+    assert memo[service._memo_key(pages[1])]['title'] == pages[1]['name']
+    assert service._memo_key(pages[2]) not in memo
+
+
+def test_truncated_stream_does_not_cache_missing_pages(service, monkeypatch):
+    pages = _pages(3, 'truncated')
+    monkeypatch.setattr(app, 'client', _StreamClient(_block(pages[0], 1), finish_reason='length'))
+    service._enrich_chunk(pages, [0, 1, 2])
+    memo = _memo(service, pages)
+    assert service._memo_key(pages[0]) in memo
+    assert service._memo_key(pages[1]) not in memo
+    assert service._memo_key(pages[2]) not in memo
+
+
+def test_remember_chunk_partial_output(service):
+    pages = _pages(2, 'partial')
+    item = {'url': pages[0]['url'], 'title': '已生成标题', 'summary': '摘要', 'category': '产品发布'}
+    service._remember_chunk(pages, [0, 1], [item], complete=False)
+    memo = _memo(service, pages)
+    assert memo[service._memo_key(pages[0])]['title'] == '已生成标题'
+    assert service._memo_key(pages[1]) not in memo
+
+
+@pytest.fixture
+def batch_service(monkeypatch):
+    monkeypatch.setattr(app.bocha_service, 'enrich_stream', False)
+    monkeypatch.setattr(app.bocha_service, 'enrich_chunk_retries', 0)
+    return app.bocha_service
+
+
+def test_complete_batch_marks_missing_pages_irrelevant(batch_service, monkeypatch):
+    pages = _pages(2, 'batch-complete')
+    monkeypatch.setattr(app, 'client', _StreamClient(_block(pages[0], 1)))
+    batch_service._enrich_chunk(pages, [0, 1])
+    memo = _memo(batch_service, pages)
+    assert memo[batch_service._memo_key(pages[1])]['title'] == ''
+
+
+def test_truncated_batch_does_not_cache_missing_pages(batch_service, monkeypatch):
+    pages = _pages(3, 'batch-truncated')
+    monkeypatch.setattr(app, 'client', _StreamClient(_block(pages[0], 1), finish_reason='length'))
+    items = batch_service._enrich_chunk(pages, [0, 1, 2])
+    assert [item['url'] for item in items] == [pages[0]['url']]
+    memo = _memo(batch_service, pages)
+    assert memo[batch_service._memo_key(pages[0])]['title'] == pages[0]['name']
+    assert batch_service._memo_key(pages[1]) not in memo
+    assert batch_service._memo_key(pages[2]) not in memo
+
+
+def test_unparsed_batch_records_do_not_cache_missing_pages(batch_service, monkeypatch):
+    pages = _pages(3, 'batch-unmatched')
+    text = _block(pages[0], 1) + "原始序号：9\n标题：Quantum Widgets\n摘要：unrelated\n分类：行业动态\n\n"
+    monkeypatch.setattr(app, 'client', _StreamClient(text))
+    batch_service._enrich_chunk(pages, [0, 1, 2])
+    memo = _memo(batch_service, pages)
+    assert batch_service._memo_key(pages[0]) in memo
+    assert batch_service._memo_key(pages[1]) not in memo
+    assert batch_service._memo_key(pages[2]) not in memo
@@ -0,0 +1,57 @@
+"""多路查询扇出：单个查询失败（含非博查异常与畸形响应）不影响其它查询"""
+import pytest
+
+from bocha_client import BochaError
+from ingestion import IngestionTask, fetch_all
+
+
+def _response(*urls):
+    return {'code': 200, 'data': {'webPages': {'value': [{'url': url, 'name': url} for url in urls]}}}
+
+
+class _Client:
+    def __init__(self, responses):
+        self.responses = responses
+
+    def search(self, payload):
+        response = self.responses[payload['query']]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def _tasks(*queries):
+    return [IngestionTask(query) for query in queries]
+
+
+def test_non_bocha_error_only_fails_its_task():
+    client = _Client({
+        'a': _response('https://a.com/1', 'https://a.com/2'),
+        'b': RuntimeError('响应处理出错'),
+        'c': BochaError('HTTP 500'),
+        'd': _response('https://a.com/2', 'https://d.com/1'),
+    })
+    pages, stats = fetch_all(client, _tasks('a', 'b', 'c', 'd'), max_parallel=4)
+    assert [page['url'] for page in pages] == ['https://a.com/1', 'https://a.com/2', 'https://d.com/1']
+    assert stats == {'tasks': 4, 'failed': 2, 'raw_pages': 4, 'unique_pages': 3}
+
+
+@pytest.mark.parametrize('payload', [
+    {'code': 200, 'data': None},
+    {'code': 200, 'data': {'webPages': None}},
+    {'code': 200, 'data': {'webPages': {'value': None}}},
+    {'code': 200, 'data': {'webPages': {'value': ['不是对象', None]}}},
+    None,
+    [],
+])
+def test_malformed_payload_is_treated_as_empty(payload):
+    client = _Client({'a': payload, 'b': _response('https://b.com/1')})
+    pages, stats = fetch_all(client, _tasks('a', 'b'))
+    assert [page['url'] for page in pages] == ['https://b.com/1']
+    assert stats['failed'] == 0
+
+
+def test_all_failed_raises_bocha_error():
+    client = _Client({'a': RuntimeError('x'), 'b': BochaError('y')})
+    with pytest.raises(BochaError, match='全部 2 个查询均失败'):
+        fetch_all(client, _tasks('a', 'b'))
@@ -0,0 +1,98 @@
+"""模型预算：配额窗口、计数清理、重试计数与并发预占"""
+import threading
+import time
+
+import pytest
+
+from llm_budget import USAGE_KEEP_SECONDS, TokenBudget, _MemoryLedger
+from news_store import SnapshotStore
+
+
+@pytest.fixture(params=['memory', 'store'])
+def make_budget(request, tmp_path):
+    def make(**limits):
+        store = SnapshotStore(str(tmp_path / 'news.sqlite3')) if request.param == 'store' else None
+        return TokenBudget(store=store, **limits)
+    return make
+
+
+def test_windows_are_hourly_and_daily():
+    now = time.mktime((2026, 10, 17, 9, 30, 0, 0, 0, -1))
+    assert TokenBudget._windows(now) == ('h:2026-10-17T09', 'd:2026-10-17')
+
+
+def test_memory_ledger_prunes_each_window_by_age():
+    ledger = _MemoryLedger()
+    now = time.time()
+    # 60 个小时窗口：旧实现按键排序只保留最后 48 个，会把排在前面的 'd:' 当天窗口删掉
+    for hours_ago in range(60, -1, -1):
+        ts = now - hours_ago * 3600
+        ledger.add(TokenBudget._windows(ts), 10, 1, now=ts)
+    hour, day = TokenBudget._windows(now)
+    used = ledger.load((hour, day))
+    assert used[hour] == (10, 1)
+    assert day in used and used[day][1] >= 1
+    # 超过保留时长未更新的窗口被清理，其它窗口不受影响
+    old_hour, old_day = TokenBudget._windows(now - USAGE_KEEP_SECONDS - 7200)
+    ledger.add((old_hour, old_day), 5, 1, now=now - USAGE_KEEP_SECONDS - 7200)
+    ledger.add((hour, day), 1, 0, now=now)
+    assert ledger.load((old_hour,)) == {}
+    assert ledger.load((hour,))[hour] == (11, 1)
+
+
+def test_acquire_respects_hourly_token_limit(make_budget):
+    budget = make_budget(hourly_tokens=300)
+    assert budget.acquire(100) is not None  # 预占 150
+    assert budget.acquire(100) is not None  # 预占 150，共 300
+    assert budget.acquire(1) is None
+    assert budget.stats()['hour']['tokens'] == 300
+
+
+def test_settle_replaces_estimate_with_actual_usage(make_budget):
+    budget = make_budget(daily_tokens=1000)
+    reservation = budget.acquire(100)
+    budget.settle(reservation, 80, 20)
+    assert budget.stats()['day']['tokens'] == 100
+    assert budget.refresh_usage()['prompt_tokens'] == 80
+
+
+def test_each_retry_attempt_counts_as_a_request(make_budget):
+    budget = make_budget(hourly_requests=3)
+    reservation = budget.acquire(10)
+    assert budget.attempt(reservation)  # 第一次请求已由 acquire 预占
+    assert budget.stats()['hour']['requests'] == 1
+    assert budget.attempt(reservation)
+    assert budget.attempt(reservation)
+    assert budget.stats()['hour']['requests'] == 3
+    assert not budget.attempt(reservation)
+    assert reservation.attempts == 3
+    assert budget.refresh_usage()['requests'] == 3
+    assert budget.attempt(None)
+
+
+def test_concurrent_acquire_does_not_exceed_quota(make_budget):
+    budget = make_budget(hourly_requests=5)
+    results = []
+    barrier = threading.Barrier(16)
+
+    def worker():
+        barrier.wait()
+        results.append(budget.acquire(10))
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(1 for r in results if r is not None) == 5
+    assert budget.stats()['hour']['requests'] == 5
+
+
+def test_store_reservation_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'news.sqlite3')
+    first = TokenBudget(hourly_requests=2, store=SnapshotStore(path))
+    second = TokenBudget(hourly_requests=2, store=SnapshotStore(path))
+    assert first.acquire(10) is not None
+    assert second.acquire(10) is not None
+    assert first.acquire(10) is None
+    assert second.acquire(10) is None
@@ -0,0 +1,130 @@
+"""模型输出解析：畸形输出下的记录切分、分类校验与按内容对应网页"""
+import random
+
+import pytest
+
+import app
+import llm_output
+from llm_output import DEFAULT_CATEGORY, HINT_MIN_SCORE, TitleIndex, iter_records, normalize_category, parse_index, parse_records
+
+PAGES = [
+    {'name': 'OpenAI 发布新一代推理模型', 'url': 'https://example.com/p/1', 'siteName': '甲',
+     'summary': 'OpenAI 今日发布新一代推理模型，数学与编程评测成绩大幅提升，并开放 API 调用。'},
+    {'name': '英伟达季度营收创新高', 'url': 'https://example.com/p/2', 'siteName': '乙',
+     'summary': '受数据中心显卡需求推动，英伟达季度营收同比增长超过一倍，股价盘后上涨。'},
+    {'name': '欧盟人工智能法案正式生效', 'url': 'https://example.com/p/3', 'siteName': '丙',
+     'summary': '欧盟人工智能法案正式生效，高风险系统需要完成合规评估并公开训练数据摘要。'},
+    {'name': '机器人初创公司完成五亿元融资', 'url': 'https://example.com/p/4', 'siteName': '丁',
+     'summary': '一家人形机器人初创公司完成五亿元 B 轮融资，资金将用于量产与海外市场拓展。'},
+]
+
+
+def _block(pos, index=None, category='产品发布', colon='：'):
+    page = PAGES[pos]
+    lines = [] if index is None else [f"原始序号{colon}{index}"]
+    lines += [f"标题{colon}{page['name']}", f"摘要{colon}{page['summary']}", f"分类{colon}{category}"]
+    return '\n'.join(lines)
+
+
+def _parse(text):
+    return app.bocha_service.parse_volcengine_batch_response(text, PAGES)
+
+
+def test_blank_line_inside_summary_does_not_split_record():
+    records = parse_records("原始序号：1\n标题：甲\n摘要：第一段\n\n第二段\n分类：产品发布\n\n原始序号：2\n标题：乙\n摘要：短\n分类：行业动态")
+    assert [r['index'] for r in records] == [1, 2]
+    assert records[0]['summary'] == '第一段\n第二段'
+    assert records[0]['category'] == '产品发布'
+
+
+def test_markdown_halfwidth_colon_and_field_order():
+    text = "以下是结果：\n\n- **原始序号**: [3]\n- **标题**: 丙\n- **分类**: 【政策法规】\n- **摘要**: 内容"
+    records = parse_records(text)
+    assert records == [{'index': 3, 'title': '丙', 'summary': '内容', 'category': '【政策法规】'}]
+
+
+def test_truncated_last_record_is_kept_without_category():
+    records = parse_records(_block(0, 1) + '\n\n原始序号：2\n标题：英伟达季度营收创新高\n摘要：受数据中心')
+    assert len(records) == 2
+    assert records[1]['summary'] == '受数据中心' and records[1]['category'] == ''
+
+
+def test_stream_matches_batch_for_any_split():
+    text = '\r\n'.join([_block(0, 1), '', _block(1, 2, colon=':'), '', '- **标题**：丙\n摘要：x\n\n续行\n分类：其他'])
+    expected = parse_records(text)
+    rng = random.Random(1)
+    for _ in range(20):
+        cuts = sorted(rng.sample(range(1, len(text)), 8))
+        deltas = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert list(iter_records(deltas)) == expected
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('产品发布', '产品发布'), ('[投资融资]', '投资融资'), ('【政策法规】。', '政策法规'),
+    ('行业动态/产品发布', '行业动态'), ('其他', None), ('', None),
+])
+def test_normalize_category(raw, expected):
+    assert normalize_category(raw) == expected
+
+
+def test_parse_index():
+    assert parse_index('[12]') == 12
+    assert parse_index('第 3 条') == 3
+    assert parse_index('无') is None
+
+
+def test_invalid_category_falls_back_to_default():
+    items = _parse(_block(0, 1, category='综合资讯'))
+    assert items[0]['category'] == DEFAULT_CATEGORY
+
+
+def test_missing_and_bad_index_are_matched_by_content():
+    text = '\n\n'.join([_block(0), _block(1, 99), _block(2, 3)])
+    items = _parse(text)
+    assert [item['url'] for item in items] == [PAGES[0]['url'], PAGES[1]['url'], PAGES[2]['url']]
+
+
+def test_duplicate_index_is_matched_by_content():
+    text = '\n\n'.join([_block(0, 1), _block(1, 1), _block(2, 3)])
+    assert [item['url'] for item in _parse(text)] == [PAGES[0]['url'], PAGES[1]['url'], PAGES[2]['url']]
+
+
+def test_mismatched_index_without_match_is_dropped():
+    unrelated = "原始序号：2\n标题：量子计算芯片实现纠错突破\n摘要：研究团队在超导量子比特上演示了逻辑比特寿命超过物理比特。\n分类：技术突破"
+    items = _parse('\n\n'.join([_block(0, 1), unrelated]))
+    # 序号 2 对应的网页内容对不上，也没有足够接近的网页：丢弃，而不是挂到网页 2 的链接上
+    assert [item['url'] for item in items] == [PAGES[0]['url']]
+
+
+def test_mismatched_index_is_corrected_by_content():
+    text = '\n\n'.join([_block(0, 1), _block(3, 3), _block(2, 4)])
+    assert [item['url'] for item in _parse(text)] == [PAGES[0]['url'], PAGES[3]['url'], PAGES[2]['url']]
+
+
+def test_unindexed_records_follow_neighbor_positions():
+    index = TitleIndex(PAGES)
+    assert index.match(PAGES[1]['name'], PAGES[1]['summary'], hints=[1]) == (1, HINT_MIN_SCORE)
+    # 推测的网页对不上时退回按标题匹配
+    pos, score = index.match(PAGES[2]['name'], PAGES[2]['summary'], hints=[0])
+    assert pos == 2 and score >= index.min_score
+
+
+def test_records_without_title_are_dropped():
+    assert _parse('原始序号：1\n摘要：只有摘要\n分类：产品发布') == []
+
+
+def test_title_index_is_built_once_when_pages_are_installed(monkeypatch):
+    index = TitleIndex(PAGES)
+    # 构造后核对与匹配都不再为网页生成二元组
+    built = []
+    monkeypatch.setattr(llm_output, '_grams', lambda text, real=llm_output._grams: built.append(text) or real(text))
+    assert index.verified(1, PAGES[0]['name'], PAGES[0]['summary'])
+    assert index.match(PAGES[2]['name'], PAGES[2]['summary'])[0] == 2
+    assert built == [PAGES[2]['name'], PAGES[2]['summary']]
+
+
+def test_exact_title_skips_bigram_check():
+    index = TitleIndex(PAGES)
+    assert index.verified(2, '英伟达季度营收创新高', '与网页无关的摘要')
+    assert index.verified(2, '【快讯】英伟达季度营收创新高！', '')
+    assert not index.verified(2, '量子计算芯片实现纠错突破', '研究团队在超导量子比特上演示了逻辑比特寿命超过物理比特。')
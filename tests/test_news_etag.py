@@ -0,0 +1,96 @@
+"""/api/news 条件请求与压缩协商：If-None-Match 返回 304、Vary 头、br/gzip 选择以及 ETag 随快照代数变化"""
+import gzip
+import json
+
+import pytest
+
+import app
+import news_snapshot
+from news_snapshot import NewsSnapshot
+
+
+def _articles(n, tag=''):
+    return [{'id': f'a{i:03d}', 'title': f'标题 {i}{tag}', 'summary': '摘要' * 20, 'source': '来源',
+             'category': '技术突破', 'created_at': f'2026-01-01 {i // 60:02d}:{i % 60:02d}:00'}
+            for i in range(n)]
+
+
+def _install(monkeypatch, snapshot):
+    monkeypatch.setattr(app, 'current_articles', snapshot.articles)
+    monkeypatch.setattr(app, 'current_snapshot', snapshot)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    _install(monkeypatch, NewsSnapshot(1, _articles(50), '2026-01-01 01:00:00'))
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize('params', [{}, {'limit': 10, 'fields': 'id,title'}])
+def test_if_none_match_returns_304(client, params):
+    first = client.get('/api/news', query_string=params)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/"')
+    again = client.get('/api/news', query_string=params, headers={'If-None-Match': etag})
+    assert again.status_code == 304 and not again.data
+    assert again.headers['ETag'] == etag
+    assert again.headers['Vary'] == 'Accept-Encoding'
+    assert again.headers['X-News-Generation'] == '1'
+    # 强校验形式与多值列表同样命中；不相关的 ETag 返回完整响应
+    assert client.get('/api/news', query_string=params, headers={'If-None-Match': etag[2:]}).status_code == 304
+    assert client.get('/api/news', query_string=params,
+                      headers={'If-None-Match': f'"other", {etag}'}).status_code == 304
+    assert client.get('/api/news', query_string=params, headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_vary_and_cache_headers(client):
+    response = client.get('/api/news')
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.headers['Cache-Control'].startswith('public, max-age=')
+    assert response.headers['Content-Type'].startswith('application/json')
+
+
+def test_gzip_negotiation(client):
+    plain = client.get('/api/news')
+    assert 'Content-Encoding' not in plain.headers
+    response = client.get('/api/news', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    # 压缩体与原始体共用同一个 ETag，解压后内容一致
+    assert response.headers['ETag'] == plain.headers['ETag']
+    assert json.loads(gzip.decompress(response.data)) == plain.get_json()
+    # q=0 表示拒绝该编码
+    assert 'Content-Encoding' not in client.get('/api/news', headers={'Accept-Encoding': 'gzip;q=0'}).headers
+
+
+def test_br_falls_back_to_gzip_without_brotli(client, monkeypatch):
+    monkeypatch.setattr(news_snapshot, 'brotli', None)
+    response = client.get('/api/news', headers={'Accept-Encoding': 'br, gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Encoding' not in client.get('/api/news', headers={'Accept-Encoding': 'br'}).headers
+
+
+def test_br_preferred_when_available(client):
+    brotli = pytest.importorskip('brotli')
+    response = client.get('/api/news', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(response.data))['count'] == 50
+
+
+def test_small_body_is_not_compressed(client):
+    response = client.get('/api/news', query_string={'limit': 1, 'fields': 'id'}, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200 and 'Content-Encoding' not in response.headers
+
+
+def test_etag_changes_with_generation(client, monkeypatch):
+    old = client.get('/api/news')
+    old_page = client.get('/api/news', query_string={'limit': 10})
+    _install(monkeypatch, NewsSnapshot(2, _articles(51, tag='（更新）'), '2026-01-01 02:00:00'))
+    new = client.get('/api/news', headers={'If-None-Match': old.headers['ETag']})
+    assert new.status_code == 200 and new.get_json()['count'] == 51
+    assert new.headers['ETag'] != old.headers['ETag']
+    assert new.headers['X-News-Generation'] == '2'
+    page = client.get('/api/news', query_string={'limit': 10}, headers={'If-None-Match': old_page.headers['ETag']})
+    assert page.status_code == 200 and page.headers['ETag'] != old_page.headers['ETag']
+    # 新一代的 ETag 随后照常命中 304
+    assert client.get('/api/news', headers={'If-None-Match': new.headers['ETag']}).status_code == 304
@@ -0,0 +1,93 @@
+"""列表分页：游标翻页不重复不遗漏、过滤条件、快照更新后继续翻页与无效游标"""
+import pytest
+
+import app
+from news_snapshot import InvalidCursor, NewsSnapshot, encode_cursor
+
+
+def _article(i, category='技术突破', source='甲', created_at=None):
+    return {'id': f'a{i:03d}', 'title': f'标题 {i}', 'category': category, 'source': source,
+            'created_at': created_at or f'2026-01-{1 + i // 24:02d} {i % 24:02d}:00:00'}
+
+
+ARTICLES = [_article(i, category=('技术突破', '产品发布')[i % 2], source=('甲', '乙', '丙')[i % 3]) for i in range(100)]
+
+
+def _walk(snapshot, limit, **filters):
+    ids, cursor = [], None
+    while True:
+        page, cursor, total = snapshot.query(cursor=cursor, limit=limit, **filters)
+        ids += [a['id'] for a in page]
+        if not cursor:
+            return ids, total
+
+
+@pytest.mark.parametrize('limit', [1, 7, 50, 100, 200])
+def test_cursor_chain_covers_everything_once(limit):
+    snapshot = NewsSnapshot(1, list(ARTICLES), None)
+    ids, total = _walk(snapshot, limit)
+    assert total == 100
+    assert ids == [a['id'] for a in reversed(ARTICLES)]
+
+
+def test_filters_and_time_range():
+    snapshot = NewsSnapshot(1, list(ARTICLES), None)
+    ids, total = _walk(snapshot, 9, category='产品发布', source='乙')
+    expected = [a['id'] for a in reversed(ARTICLES) if a['category'] == '产品发布' and a['source'] == '乙']
+    assert ids == expected and total == len(expected)
+    ids, total = _walk(snapshot, 5, since='2026-01-02', until='2026-01-02')
+    assert ids == [a['id'] for a in reversed(ARTICLES) if a['created_at'].startswith('2026-01-02')]
+    assert total == 24
+    page, cursor, total = snapshot.query(category='不存在')
+    assert not page and cursor is None and total == 0
+
+
+def test_same_timestamp_is_ordered_by_id():
+    articles = [_article(i, created_at='2026-01-01 00:00:00') for i in range(10)]
+    snapshot = NewsSnapshot(1, articles, None)
+    assert _walk(snapshot, 3)[0] == [a['id'] for a in reversed(articles)]
+
+
+def test_cursor_survives_snapshot_update():
+    first, cursor, _ = NewsSnapshot(1, list(ARTICLES), None).query(limit=30)
+    # 翻页期间新增了更新的文章、下线了已看过的一篇：后续页不重复也不跳过
+    newer = ARTICLES[:-1] + [_article(200, created_at='2026-02-01 00:00:00')]
+    rest, _, _ = NewsSnapshot(2, newer, None).query(cursor=cursor, limit=100)
+    assert [a['id'] for a in first + rest] == [a['id'] for a in reversed(ARTICLES)]
+
+
+@pytest.mark.parametrize('cursor', ['not-base64!', encode_cursor((1, 2)), 'W10'])
+def test_invalid_cursor(cursor, monkeypatch):
+    snapshot = NewsSnapshot(1, list(ARTICLES), None)
+    with pytest.raises(InvalidCursor):
+        snapshot.query(cursor=cursor)
+    monkeypatch.setattr(app, 'current_articles', snapshot.articles)
+    monkeypatch.setattr(app, 'current_snapshot', snapshot)
+    response = app.app.test_client().get('/api/news', query_string={'limit': 10, 'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_api_pages_and_projection(monkeypatch):
+    snapshot = NewsSnapshot(1, list(ARTICLES), '2026-01-05 00:00:00')
+    monkeypatch.setattr(app, 'current_articles', snapshot.articles)
+    monkeypatch.setattr(app, 'current_snapshot', snapshot)
+    client = app.app.test_client()
+    ids, cursor = [], None
+    while True:
+        params = {'limit': 40, 'fields': 'id,category', 'category': '技术突破'}
+        if cursor:
+            params['cursor'] = cursor
+        result = client.get('/api/news', query_string=params).get_json()
+        assert all(set(item) == {'id', 'category'} for item in result['data'])
+        assert result['total'] == 50 and result['count'] == len(result['data'])
+        ids += [item['id'] for item in result['data']]
+        cursor = result['next_cursor']
+        if not cursor:
+            break
+    assert ids == [a['id'] for a in reversed(ARTICLES) if a['category'] == '技术突破']
+    # limit 越界时截到 [1, NEWS_PAGE_MAX]，非数字时用默认值
+    assert client.get('/api/news?limit=0').get_json()['count'] == 1
+    assert client.get('/api/news?limit=abc').get_json()['count'] == app.NEWS_PAGE_SIZE
+    # 不带参数时返回全量列表
+    assert client.get('/api/news').get_json()['count'] == 100
@@ -0,0 +1,81 @@
+"""分块加工的部分发布节流：流式结果不再逐条触发整份快照安装"""
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import app
+
+_PROMPT_PAGE_RE = re.compile(r'原始内容(\d+)：\n标题：(.*)')
+
+
+class _EchoClient:
+    """按提示词中的网页逐条输出记录（标题与原文相同），每条之间停顿 delay 秒"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model=None, messages=(), stream=False, **kwargs):
+        return self._stream(_PROMPT_PAGE_RE.findall(messages[-1]['content']))
+
+    def _stream(self, pages):
+        for index, title in pages:
+            if self.delay:
+                time.sleep(self.delay)
+            text = f"原始序号：{index}\n标题：{title}\n摘要：关于{title}的摘要\n分类：产品发布\n\n"
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=None)],
+                                  usage=None)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=''), finish_reason='stop')],
+                              usage=None)
+
+
+def _pages(n, tag):
+    return [{'name': f'{tag} 大模型新闻第{i}条', 'url': f'https://example.com/{tag}/{i}',
+             'summary': f'{tag} 第{i}条摘要', 'siteName': '示例'} for i in range(n)]
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(app, 'enrichment_cache', None)
+    monkeypatch.setattr(app.bocha_service, 'enrich_stream', True)
+    monkeypatch.setattr(app.bocha_service, 'enrich_chunk_size', 10)
+    return app.bocha_service
+
+
+def _run(service, monkeypatch, pages, interval, delay=0.0):
+    monkeypatch.setattr(app, 'client', _EchoClient(delay))
+    monkeypatch.setattr(service, 'partial_publish_seconds', interval)
+    published = []
+    lock = threading.Lock()
+
+    def on_partial(items):
+        with lock:
+            published.append(len(items))
+
+    result = service.enrich_pages(pages, on_partial=on_partial)
+    return result, published
+
+
+def test_unthrottled_publishes_every_item(service, monkeypatch):
+    result, published = _run(service, monkeypatch, _pages(30, 'every'), 0)
+    assert len(result) == 30
+    assert len(published) == 30
+
+
+def test_throttled_publishes_are_coalesced(service, monkeypatch):
+    result, published = _run(service, monkeypatch, _pages(30, 'coalesced'), 0.05, delay=0.005)
+    assert len(result) == 30
+    assert 1 <= len(published) < 15
+    assert published == sorted(published)
+
+
+def test_no_partial_publish_after_return(service, monkeypatch):
+    result, published = _run(service, monkeypatch, _pages(20, 'late'), 10)
+    # 第一条立即发布，其余等待中的延迟发布在返回前被取消，由调用方安装最终结果
+    assert len(published) == 1
+    time.sleep(0.1)
+    assert len(published) == 1
+    assert len(result) == 20
@@ -0,0 +1,72 @@
+"""多 worker 刷新协调：非刷新 worker 不调用上游，刷新请求经共享库交给持有租约的 worker"""
+import time
+
+import pytest
+
+import app
+from news_store import SnapshotStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / 'news.sqlite3'))
+
+
+def test_refresh_requests_are_claimed_once(store):
+    store.request_refresh('a')
+    store.request_refresh('b')
+    assert store.claim_refresh_requests('leader-1', 60) == ['a', 'b']
+    assert store.claim_refresh_requests('leader-2', 60) == []
+    assert not store.refresh_request_finished('a')
+    store.finish_refresh_requests(['a', 'b'])
+    assert store.refresh_request_finished('a')
+    assert store.refresh_request_finished('missing')
+
+
+def test_stale_refresh_requests_expire(store):
+    store.request_refresh('old')
+    time.sleep(0.05)
+    assert store.claim_refresh_requests('leader', 0.01) == []
+
+
+@pytest.fixture
+def follower(monkeypatch, store):
+    service = app.bocha_service
+    monkeypatch.setattr(app, 'snapshot_store', store)
+    monkeypatch.setattr(app, 'current_articles', [])
+    monkeypatch.setattr(service, 'coordinator_running', True)
+    monkeypatch.setattr(service, 'is_leader', False)
+    monkeypatch.setattr(service, 'follower_wait_seconds', 0.2)
+    monkeypatch.setattr(service, 'follower_refresh_wait_seconds', 0.2)
+
+    def forbidden(*args, **kwargs):
+        raise AssertionError('follower must not call upstream')
+
+    monkeypatch.setattr(service, 'get_ai_news', forbidden)
+    return service
+
+
+def test_follower_refresh_is_delegated_to_leader(follower, store):
+    started = time.monotonic()
+    assert follower.refresh(wait=True) == []
+    assert time.monotonic() - started < 2
+    assert len(store.claim_refresh_requests('leader', 60)) == 1
+
+
+def test_follower_ensure_articles_waits_briefly(follower):
+    started = time.monotonic()
+    assert follower.ensure_articles() == []
+    assert time.monotonic() - started < 2
+
+
+def test_leader_serves_follower_requests(monkeypatch, store):
+    service = app.bocha_service
+    calls = []
+    monkeypatch.setattr(app, 'snapshot_store', store)
+    monkeypatch.setattr(service, 'get_ai_news', lambda force_refresh=False, wait=True: calls.append(force_refresh))
+    store.request_refresh('r1')
+    store.request_refresh('r2')
+    service._serve_refresh_requests()
+    assert service._wait_until(lambda: store.refresh_request_finished('r1'), 2)
+    assert store.refresh_request_finished('r2')
+    assert calls == [True]
@@ -0,0 +1,98 @@
+"""异步刷新任务：非刷新 worker 提交的任务由刷新 worker 接手执行，进度经共享库转发给所有 worker"""
+import time
+
+import pytest
+
+from news_store import SnapshotStore
+from refresh_jobs import RefreshJobs
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / 'news.sqlite3'))
+
+
+def _follower(store, events, runs):
+    return RefreshJobs(lambda: runs.append('follower'), store=store,
+                       on_change=lambda kind, job: events.append((kind, job['id'], job['state'], job['stage'])),
+                       delegate=lambda: True)
+
+
+def test_follower_job_is_run_by_leader(store):
+    runs, follower_events, leader_events = [], [], []
+    follower = _follower(store, follower_events, runs)
+    leader = RefreshJobs(lambda: runs.append('leader'), store=store,
+                         on_change=lambda kind, job: leader_events.append((kind, job['id'], job['state'])),
+                         delegate=lambda: False)
+
+    job, created = follower.start()
+    assert created and job['state'] == 'queued'
+    # 任务在共享库中排队时，再次提交（任意 worker）返回同一个任务
+    assert follower.start() == (job, False)
+    assert leader.start()[0]['id'] == job['id']
+
+    request_ids = store.claim_refresh_requests('leader', 60)
+    assert request_ids == [job['id']]
+    assert leader.adopt(request_ids) == job['id']
+    leader.progress('searching', queries=3)
+    leader.progress('enriching', chunks=2)
+    leader.progress('done', status='ok', count=5)
+    leader.settle(job['id'])
+
+    assert runs == []
+    assert follower.get(job['id'])['state'] == 'done'
+    assert follower.get(job['id'])['result']['count'] == 5
+    assert [kind for kind, *_ in leader_events] == ['refresh_progress', 'refresh_progress', 'refresh_complete']
+
+    follower.relay()
+    assert follower_events == [('refresh_complete', job['id'], 'done', 'enriching')]
+    # 同一状态不重复推送
+    follower.relay()
+    assert len(follower_events) == 1
+
+
+def test_relay_forwards_each_stage(store):
+    events = []
+    follower = _follower(store, events, [])
+    leader = RefreshJobs(lambda: None, store=store)
+    job, _ = follower.start()
+    leader.adopt([job['id']])
+    leader.progress('searching')
+    follower.relay()
+    leader.progress('enriching')
+    follower.relay()
+    leader.progress('done', status='ok')
+    follower.relay()
+    assert [(kind, stage) for kind, _, _, stage in events] == [
+        ('refresh_progress', 'searching'), ('refresh_progress', 'enriching'), ('refresh_complete', 'enriching')]
+
+
+def test_adopt_merges_concurrent_jobs(store):
+    leader = RefreshJobs(lambda: None, store=store)
+    first = RefreshJobs(lambda: None, store=store, delegate=lambda: True)
+    job_a, _ = first.start()
+    # 两个 worker 同时提交：第二个任务没有看到第一个，直接写入共享库
+    job_b = dict(job_a, id='b' * 12)
+    store.save_job(job_b['id'], job_b)
+    assert leader.adopt([job_a['id'], job_b['id']]) == job_a['id']
+    leader.progress('done', status='ok')
+    assert store.load_job(job_a['id'])['state'] == 'done'
+    assert store.load_job(job_b['id'])['state'] == 'done'
+
+
+def test_adopt_ignores_plain_refresh_requests(store):
+    leader = RefreshJobs(lambda: None, store=store)
+    assert leader.adopt(['not-a-job']) is None
+
+
+def test_local_job_runs_without_delegate(store):
+    runs = []
+    jobs = RefreshJobs(lambda: runs.append(1), store=store)
+    job, created = jobs.start()
+    assert created
+    for _ in range(100):
+        if jobs.get(job['id'])['state'] == 'done':
+            break
+        time.sleep(0.01)
+    assert runs == [1]
+    assert jobs.get(job['id'])['result'] == {'status': 'skipped'}
@@ -0,0 +1,57 @@
+"""相关文章：小样本下的近邻计算与无近邻时的同分类退化"""
+import json
+
+import pytest
+
+import app
+import related
+from news_snapshot import NewsSnapshot
+from related import RelatedIndex
+
+
+def _article(i, title, summary, category='技术突破'):
+    return {'id': f'a{i}', 'title': title, 'summary': summary, 'category': category,
+            'created_at': f'2026-01-01 00:00:{i:02d}'}
+
+
+ARTICLES = [
+    _article(1, 'OpenAI 发布 GPT-5 大模型', 'OpenAI 今日发布 GPT-5 大模型，推理能力大幅提升'),
+    _article(2, 'GPT-5 大模型评测', 'OpenAI 的 GPT-5 大模型在多项评测中领先'),
+    _article(3, 'OpenAI GPT-5 开放 API', '开发者可以通过 API 调用 OpenAI 的 GPT-5 大模型'),
+    _article(4, '自动驾驶公司完成融资', '一家自动驾驶初创公司完成新一轮融资', '投资融资'),
+    _article(5, '欧盟通过人工智能法案', '欧盟议会投票通过人工智能监管法案', '政策法规'),
+]
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_small_corpus_keeps_shared_terms(backend, monkeypatch):
+    if backend == 'python':
+        monkeypatch.setattr(related, 'numpy', None)
+    elif related.numpy is None:
+        pytest.skip('未安装 NumPy')
+    index = RelatedIndex(top_k=2, min_score=0.1)
+    neighbors = index.rebuild(ARTICLES)
+    # 三篇 GPT-5 文章共有的词出现在 3/5 篇文章中，小样本下不能被当作停用词删掉
+    assert {rid for rid, _ in neighbors['a1']} == {'a2', 'a3'}
+    assert {rid for rid, _ in neighbors['a3']} == {'a1', 'a2'}
+    assert index.stats()['backend'] == backend
+
+
+def test_max_df_applies_to_large_corpus():
+    common = '人工智能'
+    articles = [_article(i, f'{common} 新闻 {i}', f'独有词{i}') for i in range(related.MAX_DF_MIN_DOCS)]
+    vectors = related._tfidf_vectors(articles, 4096)
+    # 出现在全部文章中的词被截断后，每篇文章只剩下自己的特征，两两之间没有交集
+    assert not set(vectors[0]) & set(vectors[1])
+
+
+def test_single_article_has_no_neighbors():
+    assert RelatedIndex().rebuild(ARTICLES[:1]) == {'a1': []}
+
+
+def test_related_body_falls_back_to_category_when_no_neighbors(monkeypatch):
+    snapshot = NewsSnapshot(1, list(ARTICLES), '2026-01-01 00:00:00')
+    monkeypatch.setattr(app.related_index, 'neighbors', lambda article_id: [])
+    body = app._related_body(snapshot, ARTICLES[0])
+    data = json.loads(body.raw)['data']
+    assert [article['id'] for article in data] == ['a2', 'a3']
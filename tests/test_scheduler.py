@@ -0,0 +1,108 @@
+"""调度规则：cron 解析、跨月/跨年/夏令时的下一个时间点、日与周的组合规则、自适应节奏"""
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from scheduler import AdaptiveCadence, CronSpec, IntervalSpec, RefreshScheduler
+
+NEW_YORK = ZoneInfo('America/New_York')
+
+
+def test_parse_fields():
+    spec = CronSpec('*/15 9-17/4 1,15 * 1-5')
+    assert spec.minutes == {0, 15, 30, 45}
+    assert spec.hours == {9, 13, 17}
+    assert spec.days == {1, 15}
+    assert spec.months == set(range(1, 13))
+    assert spec.weekdays == {1, 2, 3, 4, 5}
+    # 周日写作 0 或 7；单值带步长表示从该值到上限
+    assert CronSpec('0 0 * * 7').weekdays == {0}
+    assert CronSpec('5/20 0 * * *').minutes == {5, 25, 45}
+
+
+@pytest.mark.parametrize('expr', ['* * * *', '60 * * * *', '* 24 * * *', '* * 0 * *', '* * * 13 *',
+                                  '* * * * 8', '*/0 * * * *', '5-1 * * * *', 'a * * * *'])
+def test_invalid_expressions(expr):
+    with pytest.raises(ValueError):
+        CronSpec(expr)
+
+
+def test_impossible_date_is_rejected_when_planning():
+    with pytest.raises(ValueError):
+        CronSpec('0 0 30 2 *').next_after(datetime(2026, 1, 1))
+
+
+@pytest.mark.parametrize('expr, now, expected', [
+    ('0 0 31 * *', datetime(2026, 1, 31, 0, 0), datetime(2026, 3, 31, 0, 0)),
+    ('0 0 1 * *', datetime(2026, 12, 15, 8, 0), datetime(2027, 1, 1, 0, 0)),
+    ('0 12 29 2 *', datetime(2026, 3, 1), datetime(2028, 2, 29, 12, 0)),
+    ('59 23 * * *', datetime(2026, 4, 30, 23, 59), datetime(2026, 5, 1, 23, 59)),
+    ('*/30 * * * *', datetime(2026, 6, 30, 23, 45, 10), datetime(2026, 7, 1, 0, 0)),
+])
+def test_next_after_crosses_month_and_year(expr, now, expected):
+    assert CronSpec(expr).next_after(now) == expected
+
+
+def test_next_after_across_dst_transitions():
+    spring = CronSpec('30 2 * * *')
+    # 2026-03-08 02:00 跳到 03:00：按墙上时间给出 02:30，换算成绝对时间落在跳变之后
+    due = spring.next_after(datetime(2026, 3, 8, 1, 0, tzinfo=NEW_YORK))
+    assert due == datetime(2026, 3, 8, 2, 30, tzinfo=NEW_YORK)
+    assert due.timestamp() >= datetime(2026, 3, 8, 3, 0, tzinfo=NEW_YORK).timestamp()
+    assert spring.next_after(due) == datetime(2026, 3, 9, 2, 30, tzinfo=NEW_YORK)
+    # 2026-11-01 01:00-02:00 重复一次：每天一次的时间点只触发一次
+    fall = CronSpec('30 1 * * *')
+    due = fall.next_after(datetime(2026, 11, 1, 0, 0, tzinfo=NEW_YORK))
+    assert due == datetime(2026, 11, 1, 1, 30, tzinfo=NEW_YORK) and due.fold == 0
+    assert fall.next_after(due) == datetime(2026, 11, 2, 1, 30, tzinfo=NEW_YORK)
+    # 按锚点的间隔规则按墙上时间对齐
+    hourly = IntervalSpec(3600)
+    assert hourly.next_after(datetime(2026, 3, 8, 1, 10, tzinfo=NEW_YORK)) == datetime(2026, 3, 8, 2, 0, tzinfo=NEW_YORK)
+
+
+@pytest.mark.parametrize('expr, now, expected', [
+    # 日与周都受限：满足其一即可（13 号或周五）
+    ('0 0 13 * 5', datetime(2026, 2, 1), datetime(2026, 2, 6)),
+    ('0 0 13 * 5', datetime(2026, 2, 12), datetime(2026, 2, 13)),
+    # 周不受限：只看日
+    ('0 0 13 * *', datetime(2026, 2, 1), datetime(2026, 2, 13)),
+    # 日不受限：只看周（2026-02-02 为周一）
+    ('0 0 * * 1', datetime(2026, 2, 1), datetime(2026, 2, 2)),
+    # 以 * 开头的步长按不受限处理：奇数日且为周一
+    ('0 0 */2 * 1', datetime(2026, 2, 1), datetime(2026, 2, 9)),
+    # 写满范围的 1-31 仍按受限处理：与周取并集，每天都满足
+    ('0 0 1-31 * 1', datetime(2026, 2, 3), datetime(2026, 2, 4)),
+])
+def test_day_of_month_and_weekday_combination(expr, now, expected):
+    assert CronSpec(expr).next_after(now) == expected
+
+
+def test_period_seconds():
+    assert CronSpec('0 */6 * * *').period_seconds(datetime(2026, 1, 1, 1, 0)) == 6 * 3600
+    assert IntervalSpec(10).period_seconds() == 60
+
+
+def test_adaptive_cadence():
+    cadence = AdaptiveCadence(min_factor=0.25, max_factor=4.0, busy_threshold=10)
+    assert [cadence.record(20) for _ in range(3)] == [0.5, 0.25, 0.25]
+    # 新文章不多不少时逐步回到 1
+    assert cadence.record(3) == 0.5
+    assert cadence.record(3) == pytest.approx(0.5 ** 0.5)
+    while cadence.factor != 1.0:
+        cadence.record(3)
+    assert [cadence.record(0) for _ in range(4)] == [2.0, 4.0, 4.0, 4.0]
+
+
+def _scheduler(factor, spec=None):
+    cadence = AdaptiveCadence()
+    cadence.factor = factor
+    return RefreshScheduler(spec or CronSpec('0 * * * *'), run=lambda: None, now=datetime.now, cadence=cadence)
+
+
+def test_plan_follows_cadence():
+    now = datetime(2026, 1, 1, 10, 0)
+    assert _scheduler(1.0)._plan(now) == (datetime(2026, 1, 1, 11, 0), 'schedule')
+    assert _scheduler(0.25)._plan(now) == (datetime(2026, 1, 1, 10, 15), 'adaptive')
+    # 退避时跳过时间点，落回调度规则的时间点上
+    assert _scheduler(2.5)._plan(now) == (datetime(2026, 1, 1, 13, 0), 'backoff')
@@ -0,0 +1,98 @@
+"""全文检索：增量同步后 impact 表、位图与倒排表一致，查询结果与逐篇计算的 BM25 一致"""
+import math
+import random
+
+import pytest
+
+import search_index
+from search_index import SearchIndex, _slots_of, tokenize
+
+CHARS = '人工智能大模型发布推出公司融资亿元技术突破芯片算力开源训练推理数据安全监管政策'
+
+
+def _article(rng, n):
+    title = ''.join(rng.choice(CHARS) for _ in range(rng.randint(6, 12)))
+    summary = ''.join(rng.choice(CHARS) for _ in range(rng.randint(20, 60)))
+    if rng.random() < 0.3:
+        summary += ' GPT agent'
+    return {'id': f'a{n}', 'title': title, 'summary': summary}
+
+
+def _brute_force(index, query, limit):
+    terms = list(dict.fromkeys(tokenize(query)))
+    n = len(index)
+    scores = {}
+    for doc_id, length in index._doc_len.items():
+        score = 0.0
+        for term in terms:
+            postings = index._postings.get(term, {})
+            if doc_id in postings:
+                df = len(postings)
+                score += math.log(1 + (n - df + 0.5) / (df + 0.5)) * index._weight(postings[doc_id], length)
+        if score:
+            scores[doc_id] = score
+    return sorted(((doc_id, score) for doc_id, score in scores.items()), key=lambda x: (x[1], x[0]),
+                  reverse=True)[:limit]
+
+
+def _check_impacts(index):
+    slots = index._slots
+    for term, impacts in index._impacts.items():
+        assert sorted(impacts.docs) == sorted(index._postings[term])
+        assert list(impacts.keys) == sorted(impacts.keys)
+        high = {slots[doc_id] for key, doc_id in zip(impacts.keys, impacts.docs) if key < impacts.split}
+        assert set(_slots_of(impacts.high)) == high
+    for term, bits in index._bitsets.items():
+        assert set(_slots_of(bits)) == {slots[doc_id] for doc_id in index._postings[term]}
+    assert all(index._slot_docs[slot] == doc_id for doc_id, slot in slots.items())
+
+
+# (逐词累加的倒排表总长上限, 分组剪枝的最多查询词数)：分别走分组剪枝、逐词累加与阈值算法
+@pytest.mark.parametrize('exhaustive, pruned', [(0, 8), (10 ** 9, 8), (0, 1)])
+def test_incremental_sync_matches_brute_force(exhaustive, pruned, monkeypatch):
+    monkeypatch.setattr(search_index, 'EXHAUSTIVE_MAX_POSTINGS', exhaustive)
+    monkeypatch.setattr(search_index, 'PRUNED_MAX_TERMS', pruned)
+    monkeypatch.setattr(search_index, 'PRECOMPUTE_MIN_DF', 50)
+    rng = random.Random(3)
+    pool = [_article(rng, n) for n in range(600)]
+    current = pool[:400]
+    index = SearchIndex()
+    index.sync(current)
+    for step in range(20):
+        # 每轮下线少量文章、追加 10 篇、改写 1 篇：都走增量路径
+        current = [a for a in current if rng.random() > 0.01] + pool[400 + step * 10:410 + step * 10]
+        current[0] = dict(current[0], summary=current[0]['summary'][::-1])
+        index.sync(current)
+        _check_impacts(index)
+        query = rng.choice(current)['title'][rng.randrange(4):][:rng.randint(2, 5)]
+        for q in (query, 'gpt', 'gpt ' + query):
+            got = index.search(q, 10)
+            expected = _brute_force(index, q, len(index))
+            # 同分文档在第 k 名处的取舍可能不同，只比较得分序列与每篇的得分
+            assert [s for _, s in got] == pytest.approx([s for _, s in expected[:10]])
+            exact = dict(expected)
+            assert all(exact[doc_id] == pytest.approx(score) for doc_id, score in got)
+
+
+def test_unchanged_articles_are_not_reindexed():
+    rng = random.Random(1)
+    articles = [_article(rng, n) for n in range(50)]
+    index = SearchIndex()
+    assert index.sync(articles) == (50, 0)
+    version = index._version
+    # 内容相同的新对象也不重建
+    assert index.sync([dict(a) for a in articles]) == (0, 0)
+    assert index._version == version
+    changed = dict(articles[0], title='全新的标题')
+    assert index.sync([changed] + articles[1:]) == (1, 0)
+    assert index.search('全新', 5)[0][0] == changed['id']
+    assert index.sync(articles[1:]) == (0, 1)
+    assert changed['id'] not in {doc_id for doc_id, _ in index.search('全新', 5)}
+
+
+def test_empty_index():
+    index = SearchIndex()
+    index.sync([{'id': 'a', 'title': '标题', 'summary': ''}])
+    index.sync([])
+    assert len(index) == 0
+    assert index.search('标题') == []
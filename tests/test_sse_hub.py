@@ -0,0 +1,142 @@
+"""SSE 广播中心：Last-Event-ID 补发、超出缓冲区时的 resync、慢消费者断开与连接数上限"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from sse_hub import HubFull, SSEHub
+
+
+def _events(chunk):
+    """一段输出中的 (事件ID, 消息) 列表；不带 ID 的一次性事件 ID 为 None"""
+    events = []
+    for frame in chunk.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in frame.split('\n') if ': ' in line)
+        if 'data' in fields:
+            events.append((fields.get('id'), json.loads(fields['data'])))
+    return events
+
+
+def _publish(hub, count):
+    for n in range(count):
+        hub.publish('news_updated', {'n': n})
+    return [f'{hub.hub_id}-{seq}' for seq in range(hub._seq - count + 1, hub._seq + 1)]
+
+
+def test_new_client_only_receives_later_events():
+    hub = SSEHub()
+    _publish(hub, 3)
+    events = hub.stream(hello={'type': 'heartbeat'})
+    assert _events(next(events)) == [(None, {'type': 'heartbeat'})]
+    ids = _publish(hub, 1)
+    assert _events(next(events)) == [(ids[0], {'type': 'news_updated', 'n': 0})]
+    events.close()
+
+
+def test_last_event_id_replays_missed_events():
+    hub = SSEHub(buffer_size=10)
+    ids = _publish(hub, 5)
+    events = hub.stream(last_event_id=ids[1])
+    assert _events(next(events)) == []
+    assert [(event_id, message['n']) for event_id, message in _events(next(events))] == \
+        [(ids[2], 2), (ids[3], 3), (ids[4], 4)]
+    events.close()
+
+
+@pytest.mark.parametrize('last_event_id', ['stale', 'other-3', 'HUB-99'])
+def test_resync_when_gap_exceeds_buffer_or_id_is_unknown(last_event_id):
+    hub = SSEHub(buffer_size=3)
+    ids = _publish(hub, 6)
+    if last_event_id == 'stale':
+        # 第 1 个事件之后错过的事件已被挤出缓冲区
+        last_event_id = ids[0]
+    last_event_id = last_event_id.replace('HUB', hub.hub_id)
+    events = hub.stream(last_event_id=last_event_id)
+    assert _events(next(events)) == [(None, {'type': 'resync'})]
+    # resync 后从当前位置继续，不再补发旧事件
+    new = _publish(hub, 1)
+    assert [event_id for event_id, _ in _events(next(events))] == new
+    events.close()
+
+
+def test_last_event_id_at_buffer_edge_is_still_replayed():
+    hub = SSEHub(buffer_size=3)
+    ids = _publish(hub, 6)
+    events = hub.stream(last_event_id=ids[2])
+    assert _events(next(events)) == []
+    assert [event_id for event_id, _ in _events(next(events))] == ids[3:]
+    events.close()
+
+
+def test_slow_consumer_is_evicted_with_resync():
+    hub = SSEHub(buffer_size=2)
+    events = hub.stream()
+    next(events)
+    _publish(hub, 5)
+    assert _events(next(events)) == [(None, {'type': 'resync'})]
+    with pytest.raises(StopIteration):
+        next(events)
+    assert hub.stats()['evicted'] == 1 and hub.clients == 0
+
+
+def test_capacity_limit_and_release():
+    hub = SSEHub(max_clients=2)
+    first, second = hub.stream(), hub.stream()
+    with pytest.raises(HubFull):
+        hub.stream()
+    assert hub.clients == 2 and hub.rejected == 1
+    # 从未迭代就关闭的连接同样归还名额
+    first.close()
+    third = hub.stream()
+    assert hub.clients == 2
+    second.close()
+    third.close()
+    assert hub.clients == 0
+
+
+def test_concurrent_connects_never_exceed_limit():
+    hub = SSEHub(max_clients=5)
+    barrier = threading.Barrier(20)
+    opened, rejected = [], []
+
+    def connect():
+        barrier.wait()
+        try:
+            opened.append(hub.stream())
+        except HubFull:
+            rejected.append(1)
+
+    threads = [threading.Thread(target=connect) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(opened) == 5 and len(rejected) == 15
+    assert hub.clients == 5 and hub.rejected == 15
+    for events in opened:
+        events.close()
+    assert hub.clients == 0
+
+
+def test_async_stream_replays_and_respects_capacity():
+    hub = SSEHub(buffer_size=10, max_clients=1)
+    ids = _publish(hub, 3)
+
+    async def main():
+        events = await hub.astream(last_event_id=ids[0])
+        with pytest.raises(HubFull):
+            await hub.astream()
+        assert _events(await events.__anext__()) == []
+        replayed = [event_id for event_id, _ in _events(await events.__anext__())]
+        # 空闲时等待下一次发布（从另一个线程）被唤醒
+        pending = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0.01)
+        new = await asyncio.get_running_loop().run_in_executor(None, _publish, hub, 1)
+        woken = [event_id for event_id, _ in _events(await asyncio.wait_for(pending, 5))]
+        await events.aclose()
+        return replayed, new, woken
+
+    replayed, new, woken = asyncio.run(main())
+    assert replayed == ids[1:] and woken == new
+    assert hub.clients == 0 and hub.rejected == 1
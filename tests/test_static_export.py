@@ -0,0 +1,70 @@
+"""静态导出：卡片列表按分类导出整条翻页链，与在线路径式分页和查询串分页结果一致"""
+import json
+
+import pytest
+
+import app
+from llm_output import CATEGORIES
+from news_snapshot import NewsSnapshot
+
+
+def _articles(n):
+    return [{'id': f'a{i:03d}', 'title': f'标题 {i}', 'summary': f'摘要 {i}', 'source': '来源',
+             'category': CATEGORIES[i % 3], 'time': '1小时前', 'url': f'https://example.com/{i}',
+             'content': '正文' * 20, 'created_at': f'2026-01-01 {i // 60:02d}:{i % 60:02d}:00'}
+            for i in range(n)]
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    articles = _articles(150)
+    snapshot = NewsSnapshot(1, articles, '2026-01-01 03:00:00')
+    monkeypatch.setattr(app, 'current_articles', articles)
+    monkeypatch.setattr(app, 'current_snapshot', snapshot)
+    return snapshot
+
+
+def _chain(files, category):
+    ids, page = [], 'first'
+    while page:
+        result = json.loads(files[f'api/news/{category}/{page}.json'].raw)
+        assert all(set(item) == set(app.INDEX_CARD_FIELDS) for item in result['data'])
+        ids += [item['id'] for item in result['data']]
+        page = result['next_cursor']
+    return ids
+
+
+def test_export_contains_every_card_page(snapshot):
+    with app.app.test_request_context('/'):
+        files = dict(app._static_export_files(snapshot))
+    newest_first = [a['id'] for a in reversed(snapshot.articles)]
+    assert _chain(files, 'all') == newest_first
+    for category in CATEGORIES:
+        expected = [a['id'] for a in reversed(snapshot.articles) if a['category'] == category]
+        assert _chain(files, category) == expected
+    # 首页内嵌的首屏数据与导出的第一页衔接同一条翻页链
+    first = json.loads(files['api/news/all/first.json'].raw)
+    assert f"api/news/all/{first['next_cursor']}.json" in files
+
+
+def test_card_pages_match_query_string_pages(snapshot):
+    client = app.app.test_client()
+    fields = ','.join(app.INDEX_CARD_FIELDS)
+    category = CATEGORIES[1]
+    path = client.get(f'/api/news/{category}/first.json').get_json()
+    query = client.get('/api/news', query_string={'limit': 60, 'fields': fields, 'category': category}).get_json()
+    assert path == query
+    assert path['total'] == 50 and path['next_cursor'] is None
+    page = client.get('/api/news/all/first.json').get_json()
+    second = client.get(f"/api/news/all/{page['next_cursor']}.json").get_json()
+    query = client.get('/api/news', query_string={'limit': 60, 'fields': fields, 'cursor': page['next_cursor']}).get_json()
+    assert second == query and second['count'] == 60
+    assert client.get('/api/news/all/bad-cursor.json').status_code == 400
+
+
+def test_run_static_export_writes_card_pages(snapshot, tmp_path):
+    stats = app.run_static_export(str(tmp_path))
+    current = tmp_path / 'current'
+    assert stats['files'] > 0
+    assert json.loads((current / 'api' / 'news' / 'all' / 'first.json').read_text('utf-8'))['count'] == 60
+    assert (current / 'api' / 'news' / CATEGORIES[0] / 'first.json').exists()